@@ -6,7 +6,8 @@ Actualiza Release Tracker y pagina Data Normalization.
 import os
 import logging
 from dotenv import load_dotenv
-from notion_client import Client
+from notion_api import get_notion_client
+from notion_query import get_database_schema, find_property, build_title_filter, iter_database_pages
 
 
 logging.basicConfig(
@@ -20,7 +21,7 @@ logging.basicConfig(
 
 
 load_dotenv()
-notion = Client(auth=os.getenv("NOTION_API_KEY"))
+notion = get_notion_client()
 
 RELEASE_TRACKER_DB_ID = os.getenv("NOTION_RELEASE_TRACKER_DB_ID")
 DATA_NORMALIZATION_PAGE_ID = os.getenv("NOTION_DATA_NORMALIZATION_PAGE_ID")
@@ -37,14 +38,25 @@ def get_e137_record():
     try:
         logging.info(f"Buscando registro {TARGET_FUNCTIONALITY}...")
         
-        # Consultar todos los registros (sin filtro porque 'pro' es title)
-        results = notion.databases.query(database_id=RELEASE_TRACKER_DB_ID)
+        # Filtrar por titulo en el servidor y descargar solo la columna title
+        schema = get_database_schema(notion, RELEASE_TRACKER_DB_ID)
+        title_name, title_data = find_property(schema, lambda name, data: data['type'] == 'title')
+        title_filter = None
+        if title_name:
+            title_filter = build_title_filter(title_name, [TARGET_FUNCTIONALITY])
+        else:
+            # Sin property title en el esquema: consulta sin filtro, el match se confirma abajo
+            logging.warning("No se encontro la property title en el esquema. Consultando sin filtro")
+        records = iter_database_pages(
+            notion, RELEASE_TRACKER_DB_ID,
+            filter=title_filter,
+            filter_properties=[title_data['id']] if title_data else None
+        )
         
-        # Buscar E137 iterando por todos los registros
-        for record in results['results']:
+        for record in records:
             properties = record.get('properties', {})
             
-            # Buscar en la propiedad title (que se llama 'pro')
+            # Confirmar el match en la propiedad title (que se llama 'pro')
             for prop_name, prop_data in properties.items():
                 if prop_data['type'] == 'title' and prop_data.get('title'):
                     title_text = ''.join([t['plain_text'] for t in prop_data['title']])
@@ -157,12 +169,15 @@ def append_pdf_to_page(page_id, pdf_url, pdf_name="E137_OnePager.pdf"):
         return False
 
 
-def update_notion_with_pdf(pdf_url):
+def update_notion_with_pdf(pdf_url, record_id=None, pdf_name="E137_OnePager.pdf"):
     """
     Actualiza tanto el Release Tracker como la pagina Data Normalization.
     
     Args:
         pdf_url (str): URL publica del PDF.
+        record_id (str): ID del registro en el Release Tracker. Si no se indica,
+            se busca el registro de E137.
+        pdf_name (str): Nombre del archivo para mostrar en la pagina.
         
     Returns:
         bool: True si ambas actualizaciones fueron exitosas.
@@ -172,16 +187,17 @@ def update_notion_with_pdf(pdf_url):
         logging.info("ACTUALIZANDO NOTION CON PDF")
         logging.info("="*80)
         
-        record = get_e137_record()
-        if not record:
-            logging.error("No se pudo obtener el registro E137")
-            return False
-        
-        record_id = record['id']
+        if not record_id:
+            record = get_e137_record()
+            if not record:
+                logging.error("No se pudo obtener el registro E137")
+                return False
+            
+            record_id = record['id']
         
         success_tracker = update_release_tracker(record_id, pdf_url)
         
-        success_page = append_pdf_to_page(DATA_NORMALIZATION_PAGE_ID, pdf_url)
+        success_page = append_pdf_to_page(DATA_NORMALIZATION_PAGE_ID, pdf_url, pdf_name)
         
         if success_tracker and success_page:
             logging.info("\n" + "="*80)
@@ -0,0 +1,120 @@
+"""
+Procesamiento en lote de varias funcionalidades.
+Cada etapa de I/O del pipeline (Notion y Gemini) tiene su propio pool de hilos
+con su propio límite de concurrencia; el render de ReportLab, que es CPU-bound,
+va al pool de procesos de render_service. Fuera de un lote (stage_pools), run_in
+ejecuta directamente en el hilo actual, así los pasos de pipeline.py sirven para ambos modos.
+"""
+
+import os
+import logging
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from notion_blocks import NOTION_MAX_CONCURRENCY
+
+
+BATCH_NOTION_WORKERS = int(os.getenv("BATCH_NOTION_WORKERS", NOTION_MAX_CONCURRENCY))
+BATCH_GEMINI_WORKERS = int(os.getenv("BATCH_GEMINI_WORKERS", 4))
+BATCH_MAX_FEATURES = int(os.getenv("BATCH_MAX_FEATURES", 10))
+
+# Pools activos durante un lote (None fuera de stage_pools)
+_pools = None
+
+
+@contextmanager
+def stage_pools():
+    """
+    Crea los pools por etapa mientras dura el bloque `with`.
+
+    Yields:
+        dict: etapa ("notion", "gemini") -> executor.
+    """
+    global _pools
+
+    pools = {
+        'notion': ThreadPoolExecutor(max_workers=BATCH_NOTION_WORKERS, thread_name_prefix="batch-notion"),
+        'gemini': ThreadPoolExecutor(max_workers=BATCH_GEMINI_WORKERS, thread_name_prefix="batch-gemini"),
+    }
+    logging.info(f"Pools del lote: notion={BATCH_NOTION_WORKERS}, gemini={BATCH_GEMINI_WORKERS}")
+
+    _pools = pools
+    try:
+        yield pools
+    finally:
+        _pools = None
+        for executor in pools.values():
+            executor.shutdown(wait=True)
+
+
+def pools_active():
+    """
+    Indica si hay un lote en curso.
+
+    Returns:
+        bool: True dentro de stage_pools.
+    """
+    return _pools is not None
+
+
+def run_in(stage, func, *args, **kwargs):
+    """
+    Ejecuta func en el pool de la etapa y espera el resultado.
+
+    Fuera de un lote se llama directamente. Se propaga el contexto (etapa de
+    notion_api para el conteo de requests).
+
+    Args:
+        stage (str): "notion" o "gemini".
+        func (callable): Función a ejecutar.
+
+    Returns:
+        Resultado de func.
+    """
+    pools = _pools
+    if pools is None:
+        return func(*args, **kwargs)
+
+    return pools[stage].submit(contextvars.copy_context().run, func, *args, **kwargs).result()
+
+
+def run_batch(events, flow):
+    """
+    Procesa varias transiciones a la vez.
+
+    Cada transición avanza por sus etapas en orden, pero las etapas de distintas
+    transiciones se solapan (una extrae mientras otra genera o renderiza).
+
+    Args:
+        events (list): Transiciones pendientes (ver state_store.get_pending_transitions).
+        flow (callable): Procesa una transición y devuelve True si se completó
+            (ej: pipeline.run_feature_flow); sus etapas deben usar run_in.
+
+    Returns:
+        dict: transition_id -> bool.
+    """
+    if not events:
+        return {}
+
+    logging.info(f"Procesando lote de {len(events)} transiciones")
+
+    def run_one(event):
+        try:
+            return flow(event)
+        except Exception as e:
+            logging.error(f"[{event['feature']}] Error en el lote: {str(e)}")
+            return False
+
+    with stage_pools():
+        workers = min(BATCH_MAX_FEATURES, len(events))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-feature") as coordinators:
+            futures = {
+                event['transition_id']: coordinators.submit(contextvars.copy_context().run, run_one, event)
+                for event in events
+            }
+            results = {transition_id: future.result() for transition_id, future in futures.items()}
+
+    completed = sum(1 for ok in results.values() if ok)
+    logging.info(f"Lote terminado: {completed}/{len(events)} transiciones completadas")
+    return results
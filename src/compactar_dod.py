@@ -0,0 +1,309 @@
+"""
+Compactación del Definition of Done antes de armar el prompt.
+Reduce los tokens que se envían a Gemini sin perder contenido útil: reemplaza
+las imágenes por su descripción, elimina bloques repetidos, recorta tablas
+grandes por regla y aplica un presupuesto de tokens configurable. Registra
+cuántos tokens se ahorraron por DoD y en total por ejecución.
+"""
+
+import os
+import re
+import sys
+import logging
+import threading
+
+
+DOD_COMPACTION = os.getenv("DOD_COMPACTION", "1").lower() not in ("0", "false", "no")
+DOD_TOKEN_BUDGET = int(os.getenv("DOD_TOKEN_BUDGET", 8000))
+DOD_TABLE_MAX_ROWS = int(os.getenv("DOD_TABLE_MAX_ROWS", 15))
+DOD_TABLE_MAX_CELL_CHARS = int(os.getenv("DOD_TABLE_MAX_CELL_CHARS", 200))
+
+# "gemini" cuenta con model.count_tokens (una llamada a la API); si no, estimación local
+DOD_TOKEN_COUNTER = os.getenv("DOD_TOKEN_COUNTER", "estimate")
+
+# Aproximación para español/Markdown: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+# Bloques más cortos que esto (separadores, headings breves) nunca se deduplican
+MIN_DEDUPE_CHARS = 40
+
+IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\([^)]*\)')
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Tokens ahorrados en la ejecución actual (ver log_compaction_totals)
+_totals = {"dods": 0, "original_tokens": 0, "saved_tokens": 0}
+_totals_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """
+    Estima la cantidad de tokens de un texto sin llamar a la API.
+
+    Args:
+        text (str): Texto a medir.
+
+    Returns:
+        int: Tokens estimados.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_tokens(text, model=None):
+    """
+    Cuenta los tokens de un texto.
+
+    Args:
+        text (str): Texto a medir.
+        model: Modelo de Gemini; si se indica y DOD_TOKEN_COUNTER=gemini,
+            se usa model.count_tokens.
+
+    Returns:
+        int: Cantidad de tokens.
+    """
+    if model is not None and DOD_TOKEN_COUNTER == "gemini":
+        try:
+            return model.count_tokens(text).total_tokens
+        except Exception as e:
+            logging.warning(f"No se pudieron contar tokens con Gemini, se estiman: {str(e)}")
+    return estimate_tokens(text)
+
+
+def replace_images(content):
+    """
+    Reemplaza los links de imágenes por su descripción (el modelo no las ve).
+
+    Returns:
+        tuple: (contenido, cantidad de imágenes reemplazadas).
+    """
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        count += 1
+        caption = match.group(1).strip()
+        return f"[Imagen: {caption}]" if caption else "[Imagen]"
+
+    return IMAGE_PATTERN.sub(replace, content), count
+
+
+def _truncate_cell(cell):
+    """Recorta una celda de tabla demasiado larga."""
+    cell = cell.strip()
+    if len(cell) <= DOD_TABLE_MAX_CELL_CHARS:
+        return cell
+    return cell[:DOD_TABLE_MAX_CELL_CHARS].rstrip() + "…"
+
+
+def compact_table(lines):
+    """
+    Aplica las reglas de tablas: celdas recortadas y como máximo
+    DOD_TABLE_MAX_ROWS filas de datos (el header siempre se conserva).
+
+    Args:
+        lines (list): Líneas de una tabla Markdown ("| a | b |").
+
+    Returns:
+        tuple: (líneas compactadas, True si se omitieron filas).
+    """
+    rows = [
+        "| " + " | ".join(_truncate_cell(cell) for cell in line.strip().strip('|').split('|')) + " |"
+        for line in lines
+    ]
+
+    # Header + separador + filas de datos
+    header, data = rows[:2], rows[2:]
+    if len(data) <= DOD_TABLE_MAX_ROWS:
+        return header + data, False
+
+    omitted = len(data) - DOD_TABLE_MAX_ROWS
+    columns = max(1, header[0].count('|') - 1)
+    note = "| " + " | ".join([f"… {omitted} filas omitidas"] + [""] * (columns - 1)) + " |"
+    return header + data[:DOD_TABLE_MAX_ROWS] + [note], True
+
+
+def compact_tables(content):
+    """
+    Recorre el Markdown aplicando compact_table a cada tabla.
+
+    Returns:
+        tuple: (contenido, cantidad de tablas con filas omitidas).
+    """
+    output = []
+    table = []
+    truncated = 0
+
+    def flush():
+        nonlocal truncated
+        if table:
+            lines, rows_omitted = compact_table(table)
+            output.extend(lines)
+            truncated += int(rows_omitted)
+            table.clear()
+
+    for line in content.split('\n'):
+        if line.lstrip().startswith('|'):
+            table.append(line)
+        else:
+            flush()
+            output.append(line)
+    flush()
+
+    return '\n'.join(output), truncated
+
+
+def split_blocks(content):
+    """Separa el Markdown en bloques (párrafos, listas, tablas) por líneas en blanco."""
+    return [block for block in BLANK_LINES_PATTERN.sub('\n\n', content).split('\n\n') if block.strip()]
+
+
+def dedupe_blocks(blocks):
+    """
+    Elimina bloques repetidos (misma normalización de espacios), conservando
+    la primera aparición. Los headings y bloques cortos no se tocan.
+
+    Returns:
+        tuple: (bloques, cantidad eliminada).
+    """
+    seen = set()
+    unique = []
+    for block in blocks:
+        key = WHITESPACE_PATTERN.sub(' ', block).strip().lower()
+        if len(key) >= MIN_DEDUPE_CHARS and not block.lstrip().startswith('#'):
+            if key in seen:
+                continue
+            seen.add(key)
+        unique.append(block)
+    return unique, len(blocks) - len(unique)
+
+
+def apply_budget(blocks, budget, model=None):
+    """
+    Conserva los bloques en orden hasta agotar el presupuesto de tokens.
+
+    Cada bloque se mide con estimate_tokens. Con DOD_TOKEN_COUNTER=gemini la
+    estimación se calibra con una sola llamada a count_tokens sobre todos los
+    bloques, así el presupuesto se aplica en tokens de Gemini sin una llamada
+    por bloque.
+
+    Args:
+        blocks (list): Bloques del DoD (ver split_blocks).
+        budget (int): Máximo de tokens.
+        model: Modelo de Gemini para contar tokens (ver count_tokens).
+
+    Returns:
+        tuple: (bloques, tokens omitidos).
+    """
+    sizes = [estimate_tokens(block) + 1 for block in blocks]
+    estimated = sum(sizes)
+    if estimated and model is not None and DOD_TOKEN_COUNTER == "gemini":
+        ratio = count_tokens('\n\n'.join(blocks), model) / estimated
+        sizes = [size * ratio for size in sizes]
+
+    kept = []
+    used = 0
+    for i, block in enumerate(blocks):
+        if used + sizes[i] > budget:
+            omitted = round(sum(sizes[i:]))
+            kept.append(f"[... contenido del DoD truncado: ~{omitted} tokens omitidos por presupuesto]")
+            return kept, omitted
+        kept.append(block)
+        used += sizes[i]
+    return kept, 0
+
+
+def compact_dod(content, budget=None, model=None):
+    """
+    Compacta el DoD para el prompt.
+
+    Args:
+        content (str): Markdown extraído (ver extraer_dod.extract_dod_content).
+        budget (int): Máximo de tokens (default: DOD_TOKEN_BUDGET).
+        model: Modelo de Gemini para contar tokens (ver count_tokens).
+
+    Returns:
+        tuple: (Markdown compactado, reporte como dict).
+    """
+    budget = budget or DOD_TOKEN_BUDGET
+    original_tokens = count_tokens(content, model)
+
+    compacted, images = replace_images(content)
+    compacted, tables = compact_tables(compacted)
+    blocks, duplicates = dedupe_blocks(split_blocks(compacted))
+    blocks, omitted = apply_budget(blocks, budget, model)
+    compacted = '\n\n'.join(block.rstrip() for block in blocks) + '\n'
+
+    compacted_tokens = count_tokens(compacted, model)
+    report = {
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "saved_tokens": max(0, original_tokens - compacted_tokens),
+        "images_replaced": images,
+        "tables_truncated": tables,
+        "duplicates_removed": duplicates,
+        "budget_tokens_omitted": omitted,
+    }
+
+    with _totals_lock:
+        _totals["dods"] += 1
+        _totals["original_tokens"] += original_tokens
+        _totals["saved_tokens"] += report["saved_tokens"]
+
+    logging.info(
+        f"DoD compactado: {original_tokens} -> {compacted_tokens} tokens "
+        f"(ahorro {report['saved_tokens']}; imágenes={images}, tablas={tables}, "
+        f"duplicados={duplicates}, omitidos por presupuesto={omitted})"
+    )
+    return compacted, report
+
+
+def compact_for_prompt(content, model=None):
+    """
+    Devuelve el DoD listo para el prompt (compactado salvo DOD_COMPACTION=0).
+
+    Args:
+        content (str): Markdown extraído.
+        model: Modelo de Gemini para contar tokens (opcional).
+
+    Returns:
+        str: Markdown para el prompt.
+    """
+    if not DOD_COMPACTION:
+        return content
+    return compact_dod(content, model=model)[0]
+
+
+def reset_compaction_totals():
+    """Reinicia el acumulado de tokens ahorrados."""
+    with _totals_lock:
+        for key in _totals:
+            _totals[key] = 0
+
+
+def log_compaction_totals():
+    """Registra los tokens ahorrados por la compactación en la ejecución."""
+    with _totals_lock:
+        totals = dict(_totals)
+    if totals["dods"]:
+        logging.info(
+            f"Compactación de DoDs: {totals['saved_tokens']} tokens ahorrados "
+            f"de {totals['original_tokens']} ({totals['dods']} DoDs)"
+        )
+
+
+if __name__ == "__main__":
+    """Compacta un DoD y muestra el ahorro: python compactar_dod.py [ruta]"""
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "output/dod_content.md"
+    with open(path, 'r', encoding='utf-8') as f:
+        compacted, report = compact_dod(f.read())
+
+    output_path = os.path.splitext(path)[0] + "_compacto.md"
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(compacted)
+
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    print(f"DoD compactado guardado en: {output_path}")
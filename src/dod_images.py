@@ -0,0 +1,123 @@
+"""
+Imágenes del Definition of Done para el PDF del One Pager.
+Las referencias a imágenes del DoD extraído (![descripción](ruta)) se
+convierten en datos estructurados: ruta, descripción, heading del DoD bajo el
+que aparecen y sección del One Pager donde van, según IMAGE_SECTION_RULES.
+No depende de ReportLab: el render de las imágenes está en generar_pdf.
+"""
+
+import os
+import re
+import json
+import logging
+
+
+DOD_IMAGES_PATH = "output/dod_images.json"
+
+# Sección del One Pager para las imágenes que no coinciden con ninguna regla
+DOD_IMAGE_DEFAULT_SECTION = int(os.getenv("DOD_IMAGE_DEFAULT_SECTION", 6))
+DOD_IMAGES_PER_SECTION = int(os.getenv("DOD_IMAGES_PER_SECTION", 2))
+
+# Heading o descripción de la imagen en el DoD -> sección del One Pager
+IMAGE_SECTION_RULES = [
+    (re.compile(r'c[oó]mo se usa|d[oó]nde|pasos|acceso|navegaci[oó]n|men[uú]', re.IGNORECASE), 8),
+    (re.compile(r'caracter[ií]sticas', re.IGNORECASE), 7),
+    (re.compile(r'beneficio', re.IGNORECASE), 5),
+    (re.compile(r'problema', re.IGNORECASE), 4),
+]
+
+IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)\s]+)\)')
+HEADING_PATTERN = re.compile(r'^\s*#{1,6}\s+(.*)$')
+
+
+def section_for_image(heading, caption):
+    """
+    Sección del One Pager para una imagen del DoD.
+
+    Args:
+        heading (str): Heading del DoD bajo el que aparece la imagen.
+        caption (str): Descripción de la imagen.
+
+    Returns:
+        int: Número de sección.
+    """
+    text = f"{heading} {caption}"
+    for pattern, section in IMAGE_SECTION_RULES:
+        if pattern.search(text):
+            return section
+    return DOD_IMAGE_DEFAULT_SECTION
+
+
+def extract_image_refs(dod_content):
+    """
+    Obtiene las imágenes locales del DoD con la sección donde van.
+
+    Args:
+        dod_content (str): Markdown del DoD (ver extraer_dod.extract_dod_content).
+
+    Returns:
+        list: Dicts con path, caption, heading y section, en orden de aparición.
+            Cada sección recibe como máximo DOD_IMAGES_PER_SECTION imágenes.
+    """
+    refs = []
+    per_section = {}
+    heading = ""
+
+    for line in dod_content.split('\n'):
+        match = HEADING_PATTERN.match(line)
+        if match:
+            heading = match.group(1).strip()
+            continue
+
+        for caption, path in IMAGE_PATTERN.findall(line):
+            # Las URLs remotas no se descargaron: no hay archivo para el PDF
+            if '://' in path:
+                continue
+            section = section_for_image(heading, caption)
+            if per_section.get(section, 0) >= DOD_IMAGES_PER_SECTION:
+                continue
+            per_section[section] = per_section.get(section, 0) + 1
+            refs.append({"path": path, "caption": caption.strip(), "heading": heading, "section": section})
+
+    return refs
+
+
+def save_image_refs(refs, output_path=DOD_IMAGES_PATH):
+    """
+    Guarda las referencias de imágenes junto al DoD extraído.
+
+    Args:
+        refs (list): Salida de extract_image_refs.
+        output_path (str): Ruta del JSON.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(refs, f, ensure_ascii=False, indent=2)
+    logging.info(f"Referencias de imagenes guardadas en: {output_path} ({len(refs)})")
+
+
+def load_image_refs(path=DOD_IMAGES_PATH):
+    """
+    Lee las referencias guardadas por save_image_refs.
+
+    Returns:
+        list: Referencias de imágenes, o lista vacía si no hay archivo.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def images_by_section(refs):
+    """
+    Agrupa las referencias por sección del One Pager.
+
+    Returns:
+        dict: número de sección -> lista de referencias.
+    """
+    sections = {}
+    for ref in refs or []:
+        sections.setdefault(ref['section'], []).append(ref)
+    return sections
@@ -4,10 +4,15 @@ Lee todos los bloques y estructura el contenido en formato Markdown.
 """
 
 import os
+import re
 import logging
-import requests
 from dotenv import load_dotenv
-from notion_client import Client
+from notion_api import get_notion_client
+from notion_blocks import iter_block_tree, iter_block_children_pages
+from notion_markdown import extract_rich_text, render_block
+from page_cache import get_cached_page, store_page, page_version
+from image_store import store_image, submit_image
+from dod_images import extract_image_refs, save_image_refs, DOD_IMAGES_PATH
 
 
 logging.basicConfig(
@@ -20,240 +25,100 @@ logging.basicConfig(
 )
 
 load_dotenv()
-notion = Client(auth=os.getenv("NOTION_API_KEY"))
+notion = get_notion_client()
 
 DOD_PAGE_ID = os.getenv("NOTION_DOD_PAGE_ID")
 
+# Referencias a imágenes locales dentro del Markdown: ![caption](ruta)
+IMAGE_LINK_PATTERN = re.compile(r'!\[[^\]]*\]\(([^)]+)\)')
 
-def extract_rich_text(rich_text_array):
+# Imágenes cuya descarga sigue en curso mientras se renderiza el texto
+PENDING_IMAGE_PREFIX = "pending-image://"
+PENDING_IMAGE_PATTERN = re.compile(r'!\[(.*?)\]\(pending-image://(\d+)\)')
+
+
+def cached_images_available(markdown_content):
     """
-    Extrae texto plano de un array de rich_text de Notion.
+    Verifica que las imágenes referenciadas por un Markdown cacheado sigan en disco.
     
     Args:
-        rich_text_array (list): Array de objetos rich_text de Notion.
+        markdown_content (str): Markdown del DoD.
         
     Returns:
-        str: Texto plano concatenado.
+        bool: True si todas las imágenes locales existen.
     """
-    if not rich_text_array:
-        return ""
-    return ''.join([text['plain_text'] for text in rich_text_array])
+    return all(os.path.exists(path) for path in IMAGE_LINK_PATTERN.findall(markdown_content))
 
 
-def download_image(image_url, output_dir="output/images/", filename=None):
+def download_image(image_url):
     """
-    Descarga una imagen desde una URL y la guarda localmente.
+    Descarga una imagen al almacén local (ver image_store).
+    El archivo se nombra por el hash de su contenido y no se vuelve a
+    descargar si ya está presente.
     
     Args:
         image_url (str): URL de la imagen a descargar.
-        output_dir (str): Directorio donde guardar la imagen.
-        filename (str): Nombre del archivo (opcional, se genera automáticamente).
         
     Returns:
         str: Ruta local de la imagen descargada o None si falla.
     """
-    try:
-        # Crear directorio si no existe
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Generar nombre de archivo si no se proporciona
-        if not filename:
-            # Usar timestamp para nombres únicos
-            import time
-            timestamp = int(time.time())
-            extension = image_url.split('.')[-1].split('?')[0]  # Extraer extensión
-            if extension not in ['png', 'jpg', 'jpeg', 'gif', 'webp']:
-                extension = 'png'  # Default
-            filename = f"dod_image_{timestamp}.{extension}"
-        
-        # Ruta completa del archivo
-        filepath = os.path.join(output_dir, filename)
-        
-        # Descargar imagen
-        logging.info(f"Descargando imagen: {filename}")
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
-        
-        # Guardar imagen
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        
-        logging.info(f"Imagen guardada en: {filepath}")
-        return filepath
-        
-    except Exception as e:
-        logging.error(f"Error al descargar imagen: {str(e)}")
-        return None
+    return store_image(image_url)
 
 
-def extract_table_content(table_block_id):
+def resolve_pending_images(markdown_content, pending_images):
     """
-    Extrae el contenido de una tabla de Notion.
+    Reemplaza las imágenes pendientes por su ruta local una vez descargadas.
     
     Args:
-        table_block_id (str): ID del bloque de tabla.
+        markdown_content (str): Markdown con referencias pending-image://N.
+        pending_images (list): Futures de image_store.submit_image, por índice.
         
     Returns:
-        str: Contenido de la tabla en formato Markdown.
+        str: Markdown con las rutas finales (o la descripción si la descarga falló).
     """
-    try:
-        # Obtener las filas de la tabla (son bloques hijos)
-        table_rows = notion.blocks.children.list(block_id=table_block_id)
-        
-        markdown_table = []
-        
-        for row_index, row_block in enumerate(table_rows['results']):
-            if row_block['type'] == 'table_row':
-                cells = row_block['table_row']['cells']
-                
-                # Extraer texto de cada celda
-                row_content = []
-                for cell in cells:
-                    cell_text = extract_rich_text(cell)
-                    row_content.append(cell_text)
-                
-                # Formatear como fila de Markdown
-                markdown_table.append("| " + " | ".join(row_content) + " |")
-                
-                # Agregar separador después de la primera fila (header)
-                if row_index == 0:
-                    separator = "| " + " | ".join(["---"] * len(row_content)) + " |"
-                    markdown_table.append(separator)
-        
-        return "\n".join(markdown_table)
-        
-    except Exception as e:
-        logging.error(f"Error al extraer tabla: {str(e)}")
-        return "[Error al extraer tabla]"
+    def replace(match):
+        caption = match.group(1)
+        local_path = pending_images[int(match.group(2))].result()
+        if local_path:
+            return f"![{caption}]({local_path})"
+        return f"[Imagen: {caption if caption else 'sin descripción'}]"
+    
+    return PENDING_IMAGE_PATTERN.sub(replace, markdown_content)
 
 
-def extract_block_content(block, indent_level=0):
+def extract_block_content(block, indent_level=0, pending_images=None):
     """
     Extrae el contenido de un bloque de Notion y lo convierte a Markdown.
     
     Args:
-        block (dict): Bloque de Notion.
+        block (dict): Bloque de Notion (con sus hijos en 'children').
         indent_level (int): Nivel de indentación para bloques anidados.
+        pending_images (list): Si se indica, las imágenes se descargan en segundo
+            plano y se agregan aquí sus futures; el Markdown queda con referencias
+            pending-image://N para resolve_pending_images. Si no, se descargan
+            en el momento.
         
     Returns:
         str: Contenido del bloque en formato Markdown.
     """
-    block_type = block['type']
-    content = ""
-    indent = "  " * indent_level
+    if pending_images is None:
+        def image_handler(image_url, caption, image_block):
+            return download_image(image_url)
+    else:
+        def image_handler(image_url, caption, image_block):
+            pending_images.append(submit_image(image_url))
+            return f"{PENDING_IMAGE_PREFIX}{len(pending_images) - 1}"
     
-    try:
-        if block_type == 'paragraph':
-            text = extract_rich_text(block['paragraph'].get('rich_text', []))
-            if text:
-                content = f"{indent}{text}\n\n"
-        
-        elif block_type == 'heading_1':
-            text = extract_rich_text(block['heading_1'].get('rich_text', []))
-            content = f"{indent}# {text}\n\n"
-        
-        elif block_type == 'heading_2':
-            text = extract_rich_text(block['heading_2'].get('rich_text', []))
-            content = f"{indent}## {text}\n\n"
-        
-        elif block_type == 'heading_3':
-            text = extract_rich_text(block['heading_3'].get('rich_text', []))
-            content = f"{indent}### {text}\n\n"
-        
-        elif block_type == 'bulleted_list_item':
-            text = extract_rich_text(block['bulleted_list_item'].get('rich_text', []))
-            content = f"{indent}- {text}\n"
-        
-        elif block_type == 'numbered_list_item':
-            text = extract_rich_text(block['numbered_list_item'].get('rich_text', []))
-            content = f"{indent}1. {text}\n"
-        
-        elif block_type == 'quote':
-            text = extract_rich_text(block['quote'].get('rich_text', []))
-            content = f"{indent}> {text}\n\n"
-        
-        elif block_type == 'code':
-            text = extract_rich_text(block['code'].get('rich_text', []))
-            language = block['code'].get('language', '')
-            content = f"{indent}```{language}\n{text}\n```\n\n"
-        
-        elif block_type == 'divider':
-            content = f"{indent}---\n\n"
-        
-        elif block_type == 'table':
-            table_content = extract_table_content(block['id'])
-            content = f"{indent}{table_content}\n\n"
-        
-        elif block_type == 'image':
-            # Intentar obtener URL de la imagen
-            image_data = block['image']
-            if image_data['type'] == 'external':
-                image_url = image_data['external']['url']
-            elif image_data['type'] == 'file':
-                image_url = image_data['file']['url']
-            else:
-                image_url = ''
-            
-            caption = extract_rich_text(image_data.get('caption', []))
-            
-            # Descargar imagen localmente
-            if image_url:
-                local_path = download_image(image_url)
-                if local_path:
-                    content = f"{indent}![{caption}]({local_path})\n\n"
-                else:
-                    # Si falla la descarga, usar descripción solamente
-                    content = f"{indent}[Imagen: {caption if caption else 'sin descripción'}]\n\n"
-            else:
-                content = f"{indent}[Imagen sin URL disponible]\n\n"
-        
-        elif block_type == 'file':
-            file_data = block['file']
-            file_name = file_data.get('name', 'archivo')
-            
-            if file_data['type'] == 'external':
-                file_url = file_data['external']['url']
-            elif file_data['type'] == 'file':
-                file_url = file_data['file']['url']
-            else:
-                file_url = ''
-            
-            content = f"{indent}[📎 {file_name}]({file_url})\n\n"
-        
-        elif block_type == 'pdf':
-            pdf_data = block['pdf']
-            
-            if pdf_data['type'] == 'external':
-                pdf_url = pdf_data['external']['url']
-            elif pdf_data['type'] == 'file':
-                pdf_url = pdf_data['file']['url']
-            else:
-                pdf_url = ''
-            
-            content = f"{indent}[📄 PDF]({pdf_url})\n\n"
-        
-        # Procesar bloques hijos si existen
-        if block.get('has_children', False):
-            try:
-                children = notion.blocks.children.list(block_id=block['id'])
-                for child in children['results']:
-                    content += extract_block_content(child, indent_level + 1)
-            except Exception as e:
-                logging.warning(f"Error al leer bloques hijos de {block_type}: {str(e)}")
-        
-    except Exception as e:
-        logging.error(f"Error al procesar bloque tipo {block_type}: {str(e)}")
-        content = f"{indent}[Error al extraer contenido de tipo {block_type}]\n\n"
-    
-    return content
+    return render_block(block, indent_level, image_handler=image_handler)
 
 
-def extract_dod_content(page_id):
+def extract_dod_content(page_id, use_cache=True):
     """
     Extrae todo el contenido del Definition of Done.
     
     Args:
         page_id (str): ID de la página del DoD.
+        use_cache (bool): Reutilizar el Markdown cacheado si la página no cambió.
         
     Returns:
         str: Contenido completo en formato Markdown.
@@ -266,6 +131,20 @@ def extract_dod_content(page_id):
         # Obtener información de la página
         page = notion.pages.retrieve(page_id=page_id)
         
+        # Los bloques de primer nivel se leen antes de consultar el caché: su
+        # last_edited_time refleja ediciones que no cambian el de la página (ver page_version)
+        top_level_pages = list(iter_block_children_pages(notion, page_id))
+        version = page_version(
+            page.get('last_edited_time'), [block for blocks in top_level_pages for block in blocks]
+        )
+        
+        # Si la página no cambió desde la última extracción, no recorrer los bloques
+        if use_cache:
+            cached_content = get_cached_page(page_id, version)
+            if cached_content is not None and cached_images_available(cached_content):
+                logging.info("Pagina sin cambios: usando contenido en cache")
+                return cached_content
+        
         # Extraer título
         title = "Definition of Done"
         if 'properties' in page:
@@ -279,18 +158,30 @@ def extract_dod_content(page_id):
         # Iniciar con el título en Markdown
         markdown_content = f"# {title}\n\n"
         
-        # Obtener todos los bloques de la página
-        blocks = notion.blocks.children.list(block_id=page_id)
+        # Los bloques llegan página por página (con sus subárboles ya
+        # descargados), así el render empieza antes de la última página
+        parts = [markdown_content]
+        total_blocks = 0
+        pending_images = []  # Las imágenes se descargan mientras sigue la extracción
+        
+        for block in iter_block_tree(notion, page_id, pages=top_level_pages):
+            total_blocks += 1
+            logging.info(f"Procesando bloque {total_blocks}: {block['type']}")
+            parts.append(extract_block_content(block, pending_images=pending_images))
         
-        logging.info(f"Total de bloques a procesar: {len(blocks['results'])}")
+        logging.info(f"Total de bloques procesados: {total_blocks}")
         
-        # Procesar cada bloque
-        for i, block in enumerate(blocks['results'], 1):
-            block_type = block['type']
-            logging.info(f"Procesando bloque {i}/{len(blocks['results'])}: {block_type}")
-            
-            block_content = extract_block_content(block)
-            markdown_content += block_content
+        # Esperar las descargas y reemplazar las referencias pendientes
+        markdown_content = resolve_pending_images("".join(parts), pending_images)
+        logging.info(f"Imagenes procesadas: {len(pending_images)}")
+        
+        # Un fallo del árbol de bloques ya cortó la extracción; una imagen que no se
+        # pudo descargar tampoco se cachea, para reintentarla en la próxima ejecución
+        failed_images = sum(1 for future in pending_images if not future.result())
+        if failed_images:
+            logging.warning(f"{failed_images} imagenes no descargadas: el contenido no se guarda en cache")
+        else:
+            store_page(page_id, version, markdown_content)
         
         logging.info("Extraccion completada exitosamente")
         logging.info("="*80)
@@ -304,7 +195,8 @@ def extract_dod_content(page_id):
 
 def save_dod_to_file(content, output_path="output/dod_content.md"):
     """
-    Guarda el contenido extraído en un archivo.
+    Guarda el contenido extraído en un archivo, junto con las referencias a
+    sus imágenes (dod_images.json en el mismo directorio) para el PDF.
     
     Args:
         content (str): Contenido a guardar.
@@ -320,6 +212,11 @@ def save_dod_to_file(content, output_path="output/dod_content.md"):
         logging.info(f"Contenido guardado en: {output_path}")
         logging.info(f"Tamano del contenido: {len(content)} caracteres")
         
+        save_image_refs(
+            extract_image_refs(content),
+            os.path.join(os.path.dirname(output_path), os.path.basename(DOD_IMAGES_PATH))
+        )
+        
     except Exception as e:
         logging.error(f"Error al guardar archivo: {str(e)}")
         raise
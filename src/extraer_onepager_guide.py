@@ -7,7 +7,10 @@ import os
 import logging
 import requests
 from dotenv import load_dotenv
-from notion_client import Client
+from notion_api import get_notion_client
+from notion_blocks import iter_block_tree, iter_block_children_pages
+from notion_markdown import extract_rich_text, render_block
+from page_cache import get_cached_page, store_page, page_version
 
 
 logging.basicConfig(
@@ -20,150 +23,32 @@ logging.basicConfig(
 )
 
 load_dotenv()
-notion = Client(auth=os.getenv("NOTION_API_KEY"))
+notion = get_notion_client()
 
 ONEPAGER_GUIDE_ID = os.getenv("NOTION_ONEPAGER_GUIDE_ID")
 
 
-def extract_rich_text(rich_text_array):
-    """
-    Extrae texto plano de un array de rich_text de Notion.
-    
-    Args:
-        rich_text_array (list): Array de objetos rich_text de Notion.
-        
-    Returns:
-        str: Texto plano concatenado.
-    """
-    if not rich_text_array:
-        return ""
-    return ''.join([text['plain_text'] for text in rich_text_array])
-
-
-def extract_table_content(table_block_id):
-    """
-    Extrae el contenido de una tabla de Notion.
-    
-    Args:
-        table_block_id (str): ID del bloque de tabla.
-        
-    Returns:
-        str: Contenido de la tabla en formato Markdown.
-    """
-    try:
-        table_rows = notion.blocks.children.list(block_id=table_block_id)
-        
-        markdown_table = []
-        
-        for row_index, row_block in enumerate(table_rows['results']):
-            if row_block['type'] == 'table_row':
-                cells = row_block['table_row']['cells']
-                
-                row_content = []
-                for cell in cells:
-                    cell_text = extract_rich_text(cell)
-                    row_content.append(cell_text)
-                
-                markdown_table.append("| " + " | ".join(row_content) + " |")
-                
-                if row_index == 0:
-                    separator = "| " + " | ".join(["---"] * len(row_content)) + " |"
-                    markdown_table.append(separator)
-        
-        return "\n".join(markdown_table)
-        
-    except Exception as e:
-        logging.error(f"Error al extraer tabla: {str(e)}")
-        return "[Error al extraer tabla]"
-
-
 def extract_block_content(block, indent_level=0):
     """
     Extrae el contenido de un bloque de Notion y lo convierte a Markdown.
     
     Args:
-        block (dict): Bloque de Notion.
+        block (dict): Bloque de Notion (con sus hijos en 'children').
         indent_level (int): Nivel de indentación para bloques anidados.
         
     Returns:
         str: Contenido del bloque en formato Markdown.
     """
-    block_type = block['type']
-    content = ""
-    indent = "  " * indent_level
-    
-    try:
-        if block_type == 'paragraph':
-            text = extract_rich_text(block['paragraph'].get('rich_text', []))
-            if text:
-                content = f"{indent}{text}\n\n"
-        
-        elif block_type == 'heading_1':
-            text = extract_rich_text(block['heading_1'].get('rich_text', []))
-            content = f"{indent}# {text}\n\n"
-        
-        elif block_type == 'heading_2':
-            text = extract_rich_text(block['heading_2'].get('rich_text', []))
-            content = f"{indent}## {text}\n\n"
-        
-        elif block_type == 'heading_3':
-            text = extract_rich_text(block['heading_3'].get('rich_text', []))
-            content = f"{indent}### {text}\n\n"
-        
-        elif block_type == 'bulleted_list_item':
-            text = extract_rich_text(block['bulleted_list_item'].get('rich_text', []))
-            content = f"{indent}- {text}\n"
-        
-        elif block_type == 'numbered_list_item':
-            text = extract_rich_text(block['numbered_list_item'].get('rich_text', []))
-            content = f"{indent}1. {text}\n"
-        
-        elif block_type == 'quote':
-            text = extract_rich_text(block['quote'].get('rich_text', []))
-            content = f"{indent}> {text}\n\n"
-        
-        elif block_type == 'callout':
-            text = extract_rich_text(block['callout'].get('rich_text', []))
-            content = f"{indent}💡 {text}\n\n"
-        
-        elif block_type == 'code':
-            text = extract_rich_text(block['code'].get('rich_text', []))
-            language = block['code'].get('language', '')
-            content = f"{indent}```{language}\n{text}\n```\n\n"
-        
-        elif block_type == 'divider':
-            content = f"{indent}---\n\n"
-        
-        elif block_type == 'table':
-            table_content = extract_table_content(block['id'])
-            content = f"{indent}{table_content}\n\n"
-        
-        elif block_type == 'file':
-            file_data = block['file']
-            file_name = file_data.get('name', 'archivo')
-            content = f"{indent}[📎 Archivo: {file_name}]\n\n"
-        
-        if block.get('has_children', False):
-            try:
-                children = notion.blocks.children.list(block_id=block['id'])
-                for child in children['results']:
-                    content += extract_block_content(child, indent_level + 1)
-            except Exception as e:
-                logging.warning(f"Error al leer bloques hijos de {block_type}: {str(e)}")
-        
-    except Exception as e:
-        logging.error(f"Error al procesar bloque tipo {block_type}: {str(e)}")
-        content = f"{indent}[Error al extraer contenido de tipo {block_type}]\n\n"
-    
-    return content
+    return render_block(block, indent_level)
 
 
-def extract_onepager_guide(page_id):
+def extract_onepager_guide(page_id, use_cache=True):
     """
     Extrae todo el contenido del One Pager Guide.
     
     Args:
         page_id (str): ID de la página del One Pager Guide.
+        use_cache (bool): Reutilizar el Markdown cacheado si la página no cambió.
         
     Returns:
         str: Contenido completo en formato Markdown.
@@ -175,6 +60,20 @@ def extract_onepager_guide(page_id):
         
         page = notion.pages.retrieve(page_id=page_id)
         
+        # Los bloques de primer nivel se leen antes de consultar el caché: su
+        # last_edited_time refleja ediciones que no cambian el de la página (ver page_version)
+        top_level_pages = list(iter_block_children_pages(notion, page_id))
+        version = page_version(
+            page.get('last_edited_time'), [block for blocks in top_level_pages for block in blocks]
+        )
+        
+        # Si la página no cambió desde la última extracción, no recorrer los bloques
+        if use_cache:
+            cached_content = get_cached_page(page_id, version)
+            if cached_content is not None:
+                logging.info("Pagina sin cambios: usando contenido en cache")
+                return cached_content
+        
         title = "One Pager Guide"
         if 'properties' in page:
             for prop_name, prop_data in page['properties'].items():
@@ -186,16 +85,20 @@ def extract_onepager_guide(page_id):
         
         markdown_content = f"# {title}\n\n"
         
-        blocks = notion.blocks.children.list(block_id=page_id)
+        # Los bloques llegan página por página (con sus subárboles ya
+        # descargados), así el render empieza antes de la última página
+        parts = [markdown_content]
+        total_blocks = 0
+        
+        for block in iter_block_tree(notion, page_id, pages=top_level_pages):
+            total_blocks += 1
+            logging.info(f"Procesando bloque {total_blocks}: {block['type']}")
+            parts.append(extract_block_content(block))
         
-        logging.info(f"Total de bloques a procesar: {len(blocks['results'])}")
+        markdown_content = "".join(parts)
+        logging.info(f"Total de bloques procesados: {total_blocks}")
         
-        for i, block in enumerate(blocks['results'], 1):
-            block_type = block['type']
-            logging.info(f"Procesando bloque {i}/{len(blocks['results'])}: {block_type}")
-            
-            block_content = extract_block_content(block)
-            markdown_content += block_content
+        store_page(page_id, version, markdown_content)
         
         logging.info("Extraccion completada exitosamente")
         logging.info("="*80)
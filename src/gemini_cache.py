@@ -0,0 +1,165 @@
+"""
+Caché persistente de respuestas de Gemini.
+La clave combina el modelo, la configuración de generación y el hash del prompt:
+si las entradas (DoD + guía) no cambiaron, el One Pager se devuelve desde disco
+sin volver a llamar a la API. Las entradas vencen por TTL y el caché se acota
+por cantidad, eliminando primero las menos usadas (LRU).
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+
+GEMINI_CACHE_DIR = os.getenv("GEMINI_CACHE_DIR", "cache/gemini")
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", 7 * 24 * 3600))  # segundos
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", 200))
+
+# GEMINI_CACHE_BYPASS=1 fuerza la regeneración (equivale a --force-regenerate)
+GEMINI_CACHE_BYPASS = os.getenv("GEMINI_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+# Serializa la eviction entre los hilos que guardan respuestas a la vez
+_evict_lock = threading.Lock()
+
+
+def get_model_signature(model):
+    """
+    Obtiene nombre y configuración de generación de un modelo de Gemini.
+
+    Args:
+        model (genai.GenerativeModel): Modelo configurado.
+
+    Returns:
+        tuple: (model_name, generation_config como dict).
+    """
+    model_name = getattr(model, 'model_name', str(model))
+    generation_config = getattr(model, '_generation_config', None) or {}
+    return model_name, dict(generation_config)
+
+
+def response_cache_key(model_name, generation_config, prompt):
+    """
+    Calcula la clave de caché de una generación.
+
+    Args:
+        model_name (str): Nombre del modelo (ej: "models/gemini-2.0-flash-exp").
+        generation_config (dict): Parámetros de generación (temperature, etc.).
+        prompt (str): Prompt completo (salida de build_prompt).
+
+    Returns:
+        str: Hash SHA-256 hexadecimal.
+    """
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    payload = json.dumps(
+        {"model": model_name, "config": generation_config or {}, "prompt": prompt_hash},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _entry_path(key):
+    """Ruta del archivo de una entrada del caché."""
+    return os.path.join(GEMINI_CACHE_DIR, f"{key}.json")
+
+
+def get_cached_response(key, ttl=GEMINI_CACHE_TTL):
+    """
+    Devuelve una respuesta cacheada si existe y no venció.
+
+    Args:
+        key (str): Clave de response_cache_key.
+        ttl (int): Vigencia máxima en segundos.
+
+    Returns:
+        str: Markdown generado, o None si no hay entrada vigente.
+    """
+    path = _entry_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Entrada de caché de Gemini ilegible, se ignora: {str(e)}")
+        return None
+
+    if time.time() - entry.get('created_at', 0) > ttl:
+        logging.info("Caché de Gemini: entrada vencida")
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+
+    # Actualizar la fecha de acceso para la eviction LRU (puede haberse eliminado recién)
+    try:
+        os.utime(path, None)
+    except FileNotFoundError:
+        pass
+    logging.info(f"Caché de Gemini: HIT ({entry.get('model')})")
+    return entry['text']
+
+
+def store_response(key, text, model_name=None):
+    """
+    Guarda una respuesta generada y aplica el límite de entradas.
+
+    Args:
+        key (str): Clave de response_cache_key.
+        text (str): Markdown generado por Gemini.
+        model_name (str): Modelo que generó la respuesta (informativo).
+    """
+    os.makedirs(GEMINI_CACHE_DIR, exist_ok=True)
+
+    path = _entry_path(key)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"model": model_name, "created_at": time.time(), "text": text}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    evict(GEMINI_CACHE_MAX_ENTRIES)
+
+
+def evict(max_entries=GEMINI_CACHE_MAX_ENTRIES):
+    """
+    Elimina las entradas menos usadas hasta dejar como máximo max_entries.
+
+    Args:
+        max_entries (int): Cantidad máxima de respuestas en caché.
+
+    Returns:
+        int: Cantidad de entradas eliminadas.
+    """
+    if not os.path.isdir(GEMINI_CACHE_DIR):
+        return 0
+
+    with _evict_lock:
+        entries = []
+        for name in os.listdir(GEMINI_CACHE_DIR):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(GEMINI_CACHE_DIR, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                # Ya eliminada (vencida, o eviction de otro proceso)
+                continue
+
+        excess = len(entries) - max_entries
+        if excess <= 0:
+            return 0
+
+        removed = 0
+        for _, path in sorted(entries)[:excess]:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+
+    if removed:
+        logging.info(f"Caché de Gemini: {removed} entradas eliminadas (LRU)")
+    return removed
@@ -0,0 +1,151 @@
+"""
+Caché de contexto de Gemini para la parte estática de los prompts.
+El rol, el One Pager Guide y las instrucciones son iguales para todas las
+funcionalidades: se suben una vez como CachedContent y cada request envía solo
+el DoD. Si el modelo o la cuenta no admiten context caching (por ejemplo, si el
+prefijo no llega al mínimo de tokens), se usa un modelo local con el prefijo
+como system_instruction.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+
+import google.generativeai as genai
+from google.generativeai import caching
+
+from gemini_cache import get_model_signature
+
+
+# GEMINI_CONTEXT_CACHE=1 separa el prompt en prefijo cacheado + DoD
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "").lower() in ("1", "true", "yes")
+GEMINI_CONTEXT_TTL = int(os.getenv("GEMINI_CONTEXT_TTL", 3600))  # segundos
+GEMINI_CONTEXT_INDEX_PATH = os.getenv("GEMINI_CONTEXT_INDEX_PATH", "cache/gemini_context/index.json")
+
+# Margen para no usar un contexto remoto que está por vencer
+EXPIRY_MARGIN_SECONDS = 60
+
+# clave -> (modelo, vence_en) de los contextos ya resueltos en este proceso
+_models = {}
+_lock = threading.Lock()
+
+
+def context_key(model_name, prefix):
+    """
+    Calcula la clave de un contexto.
+
+    Args:
+        model_name (str): Nombre del modelo.
+        prefix (str): Parte estática del prompt.
+
+    Returns:
+        str: Hash SHA-256 hexadecimal.
+    """
+    return hashlib.sha256(f"{model_name}\n{prefix}".encode('utf-8')).hexdigest()
+
+
+def _load_index():
+    """Índice clave -> {name, expires_at} de los contextos subidos a Gemini."""
+    try:
+        with open(GEMINI_CONTEXT_INDEX_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"No se pudo leer el indice de contextos de Gemini: {str(e)}")
+        return {}
+
+
+def _save_index(index):
+    """Persiste el índice de contextos, descartando los vencidos."""
+    now = time.time()
+    index = {key: entry for key, entry in index.items() if entry['expires_at'] > now}
+
+    os.makedirs(os.path.dirname(GEMINI_CONTEXT_INDEX_PATH), exist_ok=True)
+    tmp_path = f"{GEMINI_CONTEXT_INDEX_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, GEMINI_CONTEXT_INDEX_PATH)
+
+
+def _remote_context_model(key, model_name, prefix, generation_config):
+    """
+    Obtiene (o crea) el CachedContent del prefijo y un modelo que lo usa.
+
+    Returns:
+        tuple: (modelo, vence_en), o (None, None) si no se pudo usar el caché remoto.
+    """
+    index = _load_index()
+    entry = index.get(key)
+
+    if entry and entry['expires_at'] - EXPIRY_MARGIN_SECONDS > time.time():
+        try:
+            model = genai.GenerativeModel.from_cached_content(entry['name'], generation_config=generation_config)
+            logging.info(f"Contexto de Gemini reutilizado: {entry['name']}")
+            return model, entry['expires_at']
+        except Exception as e:
+            logging.info(f"Contexto de Gemini {entry['name']} no disponible, se vuelve a crear: {str(e)}")
+
+    try:
+        cached = caching.CachedContent.create(
+            model=model_name,
+            display_name=f"onepager-{key[:12]}",
+            system_instruction=prefix,
+            ttl=timedelta(seconds=GEMINI_CONTEXT_TTL),
+        )
+    except Exception as e:
+        logging.warning(f"Context caching no disponible para {model_name}, se usa el prefijo local: {str(e)}")
+        return None, None
+
+    expires_at = time.time() + GEMINI_CONTEXT_TTL
+    index[key] = {"name": cached.name, "model": model_name, "expires_at": expires_at}
+    _save_index(index)
+
+    logging.info(f"Contexto de Gemini creado: {cached.name} (TTL {GEMINI_CONTEXT_TTL}s)")
+    return genai.GenerativeModel.from_cached_content(cached, generation_config=generation_config), expires_at
+
+
+def get_context_model(model, prefix):
+    """
+    Devuelve un modelo con el prefijo ya cargado, de modo que cada request
+    envíe solo la parte variable (el DoD).
+
+    Args:
+        model (genai.GenerativeModel): Modelo base configurado.
+        prefix (str): Parte estática del prompt (rol + guía + instrucciones).
+
+    Returns:
+        genai.GenerativeModel: Modelo sobre el CachedContent del prefijo o,
+            si no está disponible, con el prefijo como system_instruction.
+    """
+    model_name, generation_config = get_model_signature(model)
+    key = context_key(model_name, prefix)
+
+    # Un solo hilo sube el contexto; el resto espera y lo reutiliza
+    with _lock:
+        entry = _models.get(key)
+        if entry and entry[1] - EXPIRY_MARGIN_SECONDS > time.time():
+            return entry[0]
+
+        context_model, expires_at = _remote_context_model(key, model_name, prefix, generation_config)
+        if context_model is None:
+            context_model = genai.GenerativeModel(
+                model_name, generation_config=generation_config, system_instruction=prefix
+            )
+            expires_at = time.time() + GEMINI_CONTEXT_TTL
+
+        _models[key] = (context_model, expires_at)
+        return context_model
+
+
+def log_context_usage(response):
+    """Registra cuántos tokens de entrada salieron del caché de contexto."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    cached_tokens = getattr(usage, 'cached_content_token_count', 0) or 0
+    logging.info(f"Tokens de entrada: {usage.prompt_token_count} ({cached_tokens} desde el contexto cacheado)")
@@ -0,0 +1,133 @@
+"""
+Registro de modelos de Gemini de larga vida.
+La API se configura una sola vez por proceso (el cliente y su canal HTTP/gRPC
+quedan abiertos) y cada combinación de modelo + configuración de generación se
+crea la primera vez que se pide y se reutiliza en las siguientes ejecuciones
+(modo monitoreo, lote o async). El modelo, los modelos de respaldo (ver
+gemini_scheduler) y la configuración de generación se toman del entorno.
+"""
+
+import os
+import json
+import logging
+import threading
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from gemini_cache import get_model_signature
+
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+
+# Modelos a probar, en orden, si el principal no está disponible o agotó la cuota
+GEMINI_FALLBACK_MODELS = [
+    name.strip() for name in os.getenv("GEMINI_FALLBACK_MODELS", "").split(",") if name.strip()
+]
+
+# Configuración de generación; las variables vacías usan el default del modelo
+GENERATION_CONFIG_ENV = {
+    "temperature": ("GEMINI_TEMPERATURE", float),
+    "top_p": ("GEMINI_TOP_P", float),
+    "top_k": ("GEMINI_TOP_K", int),
+    "max_output_tokens": ("GEMINI_MAX_OUTPUT_TOKENS", int),
+}
+
+# Errores que justifican probar el siguiente modelo (no los de prompt inválido)
+FALLBACK_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.NotFound,
+)
+
+_configured = False
+# (nombre, configuración serializada) -> modelo
+_models = {}
+_lock = threading.Lock()
+
+
+def load_generation_config():
+    """
+    Lee la configuración de generación del entorno.
+
+    Returns:
+        dict: Parámetros definidos (temperature, top_p, top_k, max_output_tokens).
+    """
+    config = {}
+    for key, (env_name, cast) in GENERATION_CONFIG_ENV.items():
+        value = os.getenv(env_name)
+        if value:
+            config[key] = cast(value)
+    return config
+
+
+def configure_api():
+    """
+    Configura la API de Gemini una sola vez por proceso.
+
+    Raises:
+        ValueError: Si falta GEMINI_API_KEY.
+    """
+    global _configured
+
+    with _lock:
+        if _configured:
+            return
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY no configurado en .env")
+
+        genai.configure(api_key=api_key)
+        _configured = True
+        logging.info("Gemini API configurada correctamente")
+
+
+def get_model(model_name=None, generation_config=None):
+    """
+    Devuelve el modelo pedido, creándolo solo la primera vez.
+
+    Args:
+        model_name (str): Nombre del modelo (default: GEMINI_MODEL).
+        generation_config (dict): Configuración de generación (default: la del entorno).
+
+    Returns:
+        genai.GenerativeModel: Modelo compartido por todas las ejecuciones del proceso.
+    """
+    configure_api()
+
+    model_name = model_name or GEMINI_MODEL
+    if generation_config is None:
+        generation_config = load_generation_config()
+    # "gemini-x" y "models/gemini-x" son el mismo modelo
+    full_name = model_name if '/' in model_name else f"models/{model_name}"
+    key = (full_name, json.dumps(generation_config, sort_keys=True, default=str))
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, generation_config=generation_config or None)
+            _models[key] = model
+            logging.info(f"Modelo de Gemini inicializado: {model_name}")
+        return model
+
+
+def get_fallback_models(model):
+    """
+    Modelos de respaldo con la misma configuración de generación que model.
+
+    Args:
+        model (genai.GenerativeModel): Modelo principal.
+
+    Returns:
+        list: Modelos de GEMINI_FALLBACK_MODELS (sin repetir el principal).
+    """
+    model_name, generation_config = get_model_signature(model)
+    return [
+        get_model(name, generation_config)
+        for name in GEMINI_FALLBACK_MODELS
+        if name not in (model_name, model_name.split('/', 1)[-1])
+    ]
+
@@ -0,0 +1,299 @@
+"""
+Scheduler de requests a Gemini.
+Todas las generaciones pasan por una cola con prioridad que respeta las cuotas
+por minuto (requests y tokens) de la cuenta. Los errores transitorios se
+reintentan con backoff exponencial con jitter y, si el modelo principal está
+limitado por cuota, la request pasa al siguiente modelo de GEMINI_FALLBACK_MODELS.
+Registra la profundidad de la cola y el tiempo de espera como métricas.
+"""
+
+import os
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+import threading
+from collections import deque
+
+from google.api_core import exceptions as google_exceptions
+
+from gemini_registry import get_fallback_models, FALLBACK_ERRORS
+from compactar_dod import estimate_tokens
+
+
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", 15))  # requests por minuto
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", 1000000))  # tokens por minuto
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 4))
+
+# Tokens de salida que se reservan por request hasta conocer el uso real
+GEMINI_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("GEMINI_OUTPUT_TOKENS_ESTIMATE", 2048))
+
+# Prioridades (menor = antes)
+PRIORITY_HIGH = 0    # reintentos que bloquean un One Pager casi completo
+PRIORITY_NORMAL = 1
+
+WINDOW_SECONDS = 60
+MAX_BACKOFF_SECONDS = 30
+
+# Solo estos errores justifican cambiar de modelo; el resto se reintenta con el mismo
+SWITCH_MODEL_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.NotFound)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class GeminiScheduler:
+    """
+    Cola con prioridad frente a Gemini: una request sale cuando es la primera
+    de la cola y entra en las cuotas de la ventana del último minuto.
+    """
+
+    def __init__(self, rpm=GEMINI_RPM, tpm=GEMINI_TPM, max_retries=GEMINI_MAX_RETRIES):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.queue = []
+        self.sequence = itertools.count()
+        # [enviada_en, tokens] de las requests del último minuto
+        self.window = deque()
+        self.condition = threading.Condition()
+        self.metrics = {}
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        """Reinicia las métricas de la cola."""
+        with self.condition:
+            self.metrics = {
+                "requests": 0, "retries": 0, "fallbacks": 0,
+                "max_queue_depth": 0, "total_wait": 0.0, "max_wait": 0.0,
+            }
+
+    def _window_usage(self, now):
+        """Requests y tokens usados en el último minuto."""
+        while self.window and now - self.window[0][0] >= WINDOW_SECONDS:
+            self.window.popleft()
+        return len(self.window), sum(tokens for _, tokens in self.window)
+
+    def acquire(self, tokens, priority=PRIORITY_NORMAL):
+        """
+        Espera el turno de una request en la cola.
+
+        Args:
+            tokens (int): Tokens estimados (entrada + salida).
+            priority (int): PRIORITY_HIGH o PRIORITY_NORMAL.
+
+        Returns:
+            tuple: (entrada de la ventana, segundos esperados).
+        """
+        ticket = (priority, next(self.sequence))
+        start = time.monotonic()
+
+        with self.condition:
+            heapq.heappush(self.queue, ticket)
+            self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], len(self.queue))
+
+            while True:
+                now = time.monotonic()
+                timeout = None
+
+                if self.queue[0] == ticket:
+                    requests, used = self._window_usage(now)
+                    # Una request más grande que la cuota sale sola con la ventana vacía
+                    if requests < self.rpm and (used + tokens <= self.tpm or not self.window):
+                        heapq.heappop(self.queue)
+                        entry = [now, tokens]
+                        self.window.append(entry)
+
+                        waited = now - start
+                        self.metrics["requests"] += 1
+                        self.metrics["total_wait"] += waited
+                        self.metrics["max_wait"] = max(self.metrics["max_wait"], waited)
+
+                        # El siguiente de la cola pasa a evaluar las cuotas
+                        self.condition.notify_all()
+                        return entry, waited
+
+                    timeout = max(0.01, WINDOW_SECONDS - (now - self.window[0][0]))
+
+                self.condition.wait(timeout)
+
+    def record_usage(self, entry, response):
+        """Reemplaza la estimación de tokens por el uso real informado por Gemini."""
+        try:
+            total = response.usage_metadata.total_token_count
+        except Exception:
+            return
+        if total:
+            with self.condition:
+                entry[1] = total
+                self.condition.notify_all()
+
+    def _count(self, metric):
+        with self.condition:
+            self.metrics[metric] += 1
+
+    def _next_attempt(self, error, attempt, index, candidates):
+        """
+        Decide cómo seguir tras un error: otro modelo o el mismo con backoff.
+
+        Returns:
+            tuple: (índice del modelo a usar, segundos a esperar).
+        """
+        switch = isinstance(error, SWITCH_MODEL_ERRORS) and index + 1 < len(candidates)
+        if attempt >= self.max_retries or (isinstance(error, google_exceptions.NotFound) and not switch):
+            raise error
+
+        self._count("retries")
+        if switch:
+            self._count("fallbacks")
+            logging.warning(
+                f"Gemini {candidates[index].model_name} limitado ({type(error).__name__}), "
+                f"se usa {candidates[index + 1].model_name}"
+            )
+            return index + 1, random.uniform(0, 0.5)
+
+        delay = min(MAX_BACKOFF_SECONDS, 2 ** attempt) + random.uniform(0, 0.5)
+        logging.warning(
+            f"Gemini {candidates[index].model_name}: {type(error).__name__}. "
+            f"Reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s"
+        )
+        return index, delay
+
+    def _log_wait(self, waited):
+        if waited >= 1:
+            logging.info(f"Request a Gemini en cola {waited:.1f}s (pendientes: {len(self.queue)})")
+
+    def run(self, model, call, prompt_text, priority=PRIORITY_NORMAL):
+        """
+        Ejecuta una request respetando cuotas, con reintentos y fallback de modelo.
+
+        Args:
+            model (genai.GenerativeModel): Modelo principal.
+            call (callable): Recibe un modelo y hace la request a Gemini.
+            prompt_text (str): Texto enviado (para estimar los tokens).
+            priority (int): Prioridad en la cola.
+
+        Returns:
+            tuple: (respuesta de call, modelo que respondió: el principal o un fallback).
+        """
+        candidates = [model] + get_fallback_models(model)
+        tokens = estimate_tokens(prompt_text) + GEMINI_OUTPUT_TOKENS_ESTIMATE
+        index = 0
+
+        for attempt in itertools.count():
+            entry, waited = self.acquire(tokens, priority)
+            self._log_wait(waited)
+            try:
+                response = call(candidates[index])
+            except FALLBACK_ERRORS as e:
+                index, delay = self._next_attempt(e, attempt, index, candidates)
+                time.sleep(delay)
+                continue
+
+            self.record_usage(entry, response)
+            return response, candidates[index]
+
+    async def run_async(self, model, call, prompt_text, priority=PRIORITY_NORMAL):
+        """
+        Versión async de run (call devuelve un awaitable).
+
+        Returns:
+            tuple: (respuesta de call, modelo que respondió).
+        """
+        candidates = [model] + get_fallback_models(model)
+        tokens = estimate_tokens(prompt_text) + GEMINI_OUTPUT_TOKENS_ESTIMATE
+        index = 0
+
+        for attempt in itertools.count():
+            entry, waited = await asyncio.to_thread(self.acquire, tokens, priority)
+            self._log_wait(waited)
+            try:
+                response = await call(candidates[index])
+            except FALLBACK_ERRORS as e:
+                index, delay = self._next_attempt(e, attempt, index, candidates)
+                await asyncio.sleep(delay)
+                continue
+
+            self.record_usage(entry, response)
+            return response, candidates[index]
+
+    def stream(self, model, call, prompt_text, priority=PRIORITY_NORMAL):
+        """
+        Versión streaming de run (call devuelve un stream de Gemini).
+        El stream es perezoso: la request falla recién al pedir el primer
+        fragmento, así que los errores hasta ese punto se reintentan como en run.
+        Después ya hay texto entregado y el error se propaga.
+
+        Yields:
+            tuple: (modelo que respondió, fragmento del stream).
+        """
+        candidates = [model] + get_fallback_models(model)
+        tokens = estimate_tokens(prompt_text) + GEMINI_OUTPUT_TOKENS_ESTIMATE
+        index = 0
+
+        for attempt in itertools.count():
+            entry, waited = self.acquire(tokens, priority)
+            self._log_wait(waited)
+            try:
+                response = call(candidates[index])
+                chunks = iter(response)
+                first = next(chunks, None)
+            except FALLBACK_ERRORS as e:
+                index, delay = self._next_attempt(e, attempt, index, candidates)
+                time.sleep(delay)
+                continue
+            break
+
+        if first is not None:
+            yield candidates[index], first
+            for chunk in chunks:
+                yield candidates[index], chunk
+
+        # El uso real se conoce recién con el stream consumido
+        self.record_usage(entry, response)
+
+    def get_metrics(self):
+        """
+        Devuelve las métricas de la cola desde el último reset.
+
+        Returns:
+            dict: requests, retries, fallbacks, queue_depth, max_queue_depth,
+                total_wait, max_wait y avg_wait (segundos).
+        """
+        with self.condition:
+            metrics = dict(self.metrics, queue_depth=len(self.queue))
+        metrics["avg_wait"] = metrics["total_wait"] / metrics["requests"] if metrics["requests"] else 0.0
+        return metrics
+
+
+def get_scheduler():
+    """
+    Devuelve el scheduler compartido (se crea la primera vez).
+
+    Returns:
+        GeminiScheduler: Scheduler con GEMINI_RPM, GEMINI_TPM y GEMINI_MAX_RETRIES.
+    """
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GeminiScheduler()
+    return _scheduler
+
+
+def reset_scheduler_metrics():
+    """Reinicia las métricas del scheduler."""
+    get_scheduler().reset_metrics()
+
+
+def log_scheduler_metrics():
+    """Registra en el log la cola de Gemini de la ejecución."""
+    metrics = get_scheduler().get_metrics()
+    if metrics["requests"]:
+        logging.info(
+            f"Requests a Gemini: {metrics['requests']} (cola máx {metrics['max_queue_depth']}, "
+            f"espera prom {metrics['avg_wait']:.1f}s, máx {metrics['max_wait']:.1f}s, "
+            f"reintentos={metrics['retries']}, fallback={metrics['fallbacks']})"
+        )
@@ -4,9 +4,24 @@ Procesa el Definition of Done y genera un One Pager educativo siguiendo la plant
 """
 
 import os
+import re
+import sys
+import json
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import google.generativeai as genai
+from gemini_cache import (
+    get_model_signature, response_cache_key, get_cached_response, store_response,
+    GEMINI_CACHE_BYPASS
+)
+from gemini_context import get_context_model, log_context_usage, GEMINI_CONTEXT_CACHE
+from gemini_registry import get_model
+from gemini_scheduler import get_scheduler, PRIORITY_HIGH, PRIORITY_NORMAL
+from compactar_dod import compact_for_prompt
+from onepager_schema import (
+    SECTIONS, ONEPAGER_SCHEMA, parse_onepager_json, load_onepager_data, onepager_to_markdown
+)
 
 
 logging.basicConfig(
@@ -23,21 +38,15 @@ load_dotenv()
 
 def configure_gemini():
     """
-    Configura la API de Gemini con la clave del entorno.
+    Devuelve el modelo de Gemini configurado (GEMINI_MODEL y la configuración
+    de generación del entorno). La API se configura y el modelo se crea solo la
+    primera vez; las siguientes llamadas reutilizan el mismo (ver gemini_registry).
     
     Returns:
         genai.GenerativeModel: Modelo configurado.
     """
     try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY no configurado en .env")
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
-        logging.info("Gemini API configurada correctamente")
-        return model
+        return get_model()
         
     except Exception as e:
         logging.error(f"Error al configurar Gemini: {str(e)}")
@@ -64,93 +73,332 @@ def read_file_content(file_path):
         raise
 
 
-def build_prompt(dod_content, guide_content):
+# Heading numerado de una sección (ej: "### 6. ⚙️ ...")
+SECTION_HEADING_PATTERN = re.compile(r'^###\s*(\d+)\.', re.MULTILINE)
+
+# Modo por secciones: prompts en paralelo y reintentos solo de las secciones fallidas
+GEMINI_SECTION_WORKERS = int(os.getenv("GEMINI_SECTION_WORKERS", len(SECTIONS)))
+GEMINI_SECTION_RETRIES = int(os.getenv("GEMINI_SECTION_RETRIES", 2))
+
+
+# Rol del modelo, común a todos los prompts
+PROMPT_ROLE = """Eres un experto en comunicación de producto para Simetrik, una plataforma de conciliación financiera. 
+
+Tu tarea es crear un ONE PAGER educativo basado en el Definition of Done (DoD) de una funcionalidad"""
+
+DOD_HEADING = "## CONTENIDO TÉCNICO A PROCESAR (Definition of Done):"
+
+# Instrucciones que cambian según qué se genera: (estructura, formato de salida, longitud)
+ONEPAGER_INSTRUCTIONS = (
+    "**Estructura**: Genera EXACTAMENTE las siguientes 8 secciones:",
+    "Markdown claro con headings, bullets y párrafos bien estructurados.",
+    "Conciso pero completo. Cada sección debe tener información útil sin ser exhaustiva.",
+)
+SECTION_INSTRUCTIONS = (
+    "**Sección a generar**: Genera SOLO la siguiente sección del One Pager, comenzando exactamente con su heading:",
+    "Markdown claro con bullets y párrafos bien estructurados. Sin otras secciones ni texto introductorio.",
+    "Conciso pero completo. La sección debe tener información útil sin ser exhaustiva.",
+)
+# El prefijo cacheado describe el One Pager; qué generar llega con el DoD (build_dod_prompt)
+PREFIX_INSTRUCTIONS = (
+    "**Estructura**: El One Pager tiene EXACTAMENTE las siguientes 8 secciones:",
+) + ONEPAGER_INSTRUCTIONS[1:]
+
+
+def format_sections(sections):
+    """Lista de secciones con su instrucción, con el formato del prompt."""
+    return "".join(f"   ### {title}\n   {instruction}\n\n" for title, instruction in sections)
+
+
+def format_instructions(instructions, sections):
     """
-    Construye el prompt completo para Gemini.
+    Bloque de instrucciones numeradas, compartido por todos los prompts.
+    
+    Args:
+        instructions (tuple): (estructura, formato de salida, longitud), ver
+            ONEPAGER_INSTRUCTIONS, SECTION_INSTRUCTIONS y PREFIX_INSTRUCTIONS.
+        sections (list): Secciones a listar bajo la estructura.
+        
+    Returns:
+        str: Instrucciones en Markdown.
+    """
+    structure, output_format, length = instructions
+    return f"""## INSTRUCCIONES ESPECÍFICAS:
+
+1. **Tono**: Profesional, claro, cercano y confiable. Usa lenguaje del cliente, evita tecnicismos innecesarios.
+
+2. {structure}
+
+{format_sections(sections)}3. **Formato de salida**: {output_format}
+
+4. **Longitud**: {length}
+
+5. **Basándote en el DoD**: Extrae la información técnica del Definition of Done y transfórmala en lenguaje educativo y accesible.
+"""
+
+
+def build_prompt_context(dod_content, guide_content):
+    """
+    Construye el contexto común a los prompts sin caché de contexto: rol, guía y DoD.
     
     Args:
         dod_content (str): Contenido del Definition of Done.
         guide_content (str): Contenido del One Pager Guide.
         
     Returns:
-        str: Prompt estructurado para Gemini.
+        str: Encabezado del prompt (sin instrucciones).
     """
-    prompt = f"""Eres un experto en comunicación de producto para Simetrik, una plataforma de conciliación financiera. 
-
-Tu tarea es crear un ONE PAGER educativo basado en el Definition of Done (DoD) de una funcionalidad.
+    return f"""{PROMPT_ROLE}.
 
 ## GUÍA DE REFERENCIA:
 
 {guide_content}
 
-## CONTENIDO TÉCNICO A PROCESAR (Definition of Done):
+{DOD_HEADING}
 
 {dod_content}
 
-## INSTRUCCIONES ESPECÍFICAS:
-
-1. **Tono**: Profesional, claro, cercano y confiable. Usa lenguaje del cliente, evita tecnicismos innecesarios.
+"""
 
-2. **Estructura**: Genera EXACTAMENTE las siguientes 8 secciones:
 
-   ### 1. 🏷 Tipo de comunicación
-   Identifica si es un lanzamiento, una mejora o una profundización de funcionalidad existente.
+def build_prompt(dod_content, guide_content):
+    """
+    Construye el prompt completo para Gemini.
+    
+    Args:
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Contenido del One Pager Guide.
+        
+    Returns:
+        str: Prompt estructurado para Gemini.
+    """
+    return (
+        build_prompt_context(dod_content, guide_content)
+        + format_instructions(ONEPAGER_INSTRUCTIONS, SECTIONS)
+        + "\n## GENERA EL ONE PAGER:\n"
+    )
 
-   ### 2. ✨ Nombre de la funcionalidad
-   Nombre claro y directo (ejemplo: "Gestión de Inconsistencias en Uniones")
 
-   ### 3. 👥 ¿A quién está dirigido?
-   Describe el público objetivo (equipos, roles, casos de uso).
+def build_section_prompt(dod_content, guide_content, number):
+    """
+    Construye el prompt de una sola sección del One Pager.
+    Comparte el contexto (guía + DoD) con el prompt completo.
+    
+    Args:
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Contenido del One Pager Guide.
+        number (int): Número de la sección (1 a 8).
+        
+    Returns:
+        str: Prompt de la sección.
+    """
+    return (
+        build_prompt_context(dod_content, guide_content)
+        + format_instructions(SECTION_INSTRUCTIONS, [SECTIONS[number - 1]])
+        + "\n## GENERA LA SECCIÓN:\n"
+    )
 
-   ### 4. 🎯 ¿Qué problema resuelve?
-   Explica la necesidad o fricción que se resuelve con lenguaje del cliente.
 
-   ### 5. 💡 Beneficio principal
-   El valor más claro y tangible (ahorro de tiempo, automatización, reducción de errores, etc.).
+def build_prompt_prefix(guide_content):
+    """
+    Construye la parte estática del prompt: rol, guía e instrucciones.
+    Es igual para todas las funcionalidades (ver gemini_context).
+    
+    Args:
+        guide_content (str): Contenido del One Pager Guide.
+        
+    Returns:
+        str: Prefijo del prompt (el DoD llega aparte, en build_dod_prompt).
+    """
+    return f"""{PROMPT_ROLE}, que recibirás en cada mensaje.
 
-   ### 6. ⚙️ ¿En qué consiste la funcionalidad?
-   Descripción simple de cómo funciona, con ejemplos si ayuda.
+## GUÍA DE REFERENCIA:
 
-   ### 7. 🧩 Características clave
-   Lista (bullets) de los aspectos más diferenciadores o útiles.
+{guide_content}
 
-   ### 8. 🔎 ¿Cómo se usa y dónde se encuentra?
-   Pasos para acceder y utilizar la funcionalidad.
+""" + format_instructions(PREFIX_INSTRUCTIONS, SECTIONS)
 
-3. **Formato de salida**: Markdown claro con headings, bullets y párrafos bien estructurados.
 
-4. **Longitud**: Conciso pero completo. Cada sección debe tener información útil sin ser exhaustiva.
+def build_dod_prompt(dod_content, number=None):
+    """
+    Construye la parte variable del prompt: el DoD y qué generar.
+    
+    Args:
+        dod_content (str): Contenido del Definition of Done.
+        number (int): Si se indica, pedir solo esa sección.
+        
+    Returns:
+        str: Mensaje a enviar junto con el prefijo cacheado.
+    """
+    if number is None:
+        request = "## GENERA EL ONE PAGER:"
+    else:
+        request = (
+            "## GENERA SOLO LA SIGUIENTE SECCIÓN, comenzando exactamente con su heading "
+            f"y sin otras secciones ni texto introductorio:\n\n### {SECTIONS[number - 1][0]}"
+        )
+    
+    return f"""{DOD_HEADING}
 
-5. **Basándote en el DoD**: Extrae la información técnica del Definition of Done y transfórmala en lenguaje educativo y accesible.
+{dod_content}
 
-## GENERA EL ONE PAGER:
+{request}
 """
+
+
+def build_request(dod_content, guide_content, number=None):
+    """
+    Arma el prompt de una generación según el modo configurado.
     
-    return prompt
+    Con GEMINI_CONTEXT_CACHE=1 el prompt es solo el DoD y el prefijo estático
+    se devuelve como contexto, para reutilizarlo entre requests.
+    
+    Args:
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Contenido del One Pager Guide.
+        number (int): Si se indica, pedir solo esa sección.
+        
+    Returns:
+        tuple: (prompt, context); context es None sin caché de contexto.
+    """
+    if GEMINI_CONTEXT_CACHE:
+        return build_dod_prompt(dod_content, number), build_prompt_prefix(guide_content)
+    
+    if number is None:
+        return build_prompt(dod_content, guide_content), None
+    return build_section_prompt(dod_content, guide_content, number), None
+
+
+def _response_cache_key(model, prompt, context):
+    """Clave del caché de respuestas; con contexto cubre prefijo + prompt."""
+    model_name, generation_config = get_model_signature(model)
+    return response_cache_key(model_name, generation_config, (context or "") + prompt), model_name
 
 
-def generate_onepager(model, prompt):
+def finish_reason(response):
+    """
+    Motivo de fin de una respuesta de Gemini (en streaming, del último fragmento).
+    
+    Returns:
+        str: Nombre del motivo (ej: "STOP", "SAFETY", "MAX_TOKENS"), o None si no lo informa.
+    """
+    try:
+        return response.candidates[0].finish_reason.name
+    except (AttributeError, IndexError):
+        return None
+
+
+def _store_response(model, prompt, context, text, response=None):
+    """
+    Guarda una respuesta bajo la clave del modelo que la generó: si respondió
+    un fallback, no queda registrada como respuesta del modelo principal.
+    Las respuestas vacías o cortadas (safety, límite de tokens) no se guardan,
+    para no repetirlas hasta que venza el TTL.
+    """
+    reason = finish_reason(response) if response is not None else None
+    if not text.strip() or reason not in (None, "STOP"):
+        logging.warning(f"Respuesta de Gemini incompleta (finish_reason={reason}): no se guarda en cache")
+        return
+    
+    cache_key, model_name = _response_cache_key(model, prompt, context)
+    store_response(cache_key, text, model_name)
+
+
+def generate_onepager(model, prompt, use_cache=True, context=None, priority=PRIORITY_NORMAL):
     """
     Genera el One Pager usando Gemini.
+    Si el mismo modelo, configuración y prompt ya se generaron, devuelve la
+    respuesta guardada en el caché sin llamar a la API. La request pasa por el
+    scheduler (cuotas, reintentos y fallback de modelo).
     
     Args:
         model: Modelo de Gemini configurado.
-        prompt (str): Prompt completo.
+        prompt (str): Prompt completo (o solo el DoD si se indica context).
+        use_cache (bool): False fuerza la regeneración (también GEMINI_CACHE_BYPASS=1).
+        context (str): Prefijo estático cacheado en Gemini (ver build_request).
+        priority (int): Prioridad en la cola del scheduler.
         
     Returns:
         str: One Pager generado por Gemini.
     """
     try:
+        cache_key, _ = _response_cache_key(model, prompt, context)
+        
+        if use_cache and not GEMINI_CACHE_BYPASS:
+            cached = get_cached_response(cache_key)
+            if cached is not None:
+                logging.info("One Pager obtenido del cache (sin llamar a Gemini)")
+                return cached
+        
         logging.info("Enviando prompt a Gemini...")
         logging.info(f"Tamano del prompt: {len(prompt)} caracteres")
         
-        response = model.generate_content(prompt)
+        if context:
+            response, answered_by = get_scheduler().run(
+                model, lambda m: get_context_model(m, context).generate_content(prompt), prompt, priority
+            )
+            log_context_usage(response)
+        else:
+            response, answered_by = get_scheduler().run(model, lambda m: m.generate_content(prompt), prompt, priority)
         
         onepager = response.text
         
         logging.info("One Pager generado exitosamente")
         logging.info(f"Tamano de la respuesta: {len(onepager)} caracteres")
         
+        _store_response(answered_by, prompt, context, onepager, response)
+        
+        return onepager
+        
+    except Exception as e:
+        logging.error(f"Error al generar con Gemini: {str(e)}")
+        raise
+
+
+async def generate_onepager_async(model, prompt, use_cache=True, context=None, priority=PRIORITY_NORMAL):
+    """
+    Versión async de generate_onepager (usa generate_content_async de Gemini).
+    
+    Args:
+        model: Modelo de Gemini configurado.
+        prompt (str): Prompt completo (o solo el DoD si se indica context).
+        use_cache (bool): False fuerza la regeneración (también GEMINI_CACHE_BYPASS=1).
+        context (str): Prefijo estático cacheado en Gemini (ver build_request).
+        priority (int): Prioridad en la cola del scheduler.
+        
+    Returns:
+        str: One Pager generado por Gemini.
+    """
+    try:
+        cache_key, _ = _response_cache_key(model, prompt, context)
+        
+        if use_cache and not GEMINI_CACHE_BYPASS:
+            cached = get_cached_response(cache_key)
+            if cached is not None:
+                logging.info("One Pager obtenido del cache (sin llamar a Gemini)")
+                return cached
+        
+        logging.info("Enviando prompt a Gemini (async)...")
+        logging.info(f"Tamano del prompt: {len(prompt)} caracteres")
+        
+        if context:
+            async def call(m):
+                # Crear o recuperar el contexto puede requerir una llamada bloqueante
+                context_model = await asyncio.to_thread(get_context_model, m, context)
+                return await context_model.generate_content_async(prompt)
+            
+            response, answered_by = await get_scheduler().run_async(model, call, prompt, priority)
+            log_context_usage(response)
+        else:
+            response, answered_by = await get_scheduler().run_async(
+                model, lambda m: m.generate_content_async(prompt), prompt, priority
+            )
+        onepager = response.text
+        
+        logging.info(f"One Pager generado exitosamente: {len(onepager)} caracteres")
+        
+        _store_response(answered_by, prompt, context, onepager, response)
+        
         return onepager
         
     except Exception as e:
@@ -158,9 +406,293 @@ def generate_onepager(model, prompt):
         raise
 
 
+def stream_onepager(model, prompt, use_cache=True, context=None, priority=PRIORITY_NORMAL):
+    """
+    Genera el One Pager en modo streaming, entregando el texto a medida que llega.
+    Con un hit del caché se entrega la respuesta guardada de una sola vez.
+    
+    Args:
+        model: Modelo de Gemini configurado.
+        prompt (str): Prompt completo (o solo el DoD si se indica context).
+        use_cache (bool): False fuerza la regeneración (también GEMINI_CACHE_BYPASS=1).
+        context (str): Prefijo estático cacheado en Gemini (ver build_request).
+        priority (int): Prioridad en la cola del scheduler.
+        
+    Yields:
+        str: Fragmentos de texto del One Pager.
+    """
+    cache_key, _ = _response_cache_key(model, prompt, context)
+    
+    if use_cache and not GEMINI_CACHE_BYPASS:
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            logging.info("One Pager obtenido del cache (sin llamar a Gemini)")
+            yield cached
+            return
+    
+    logging.info("Enviando prompt a Gemini (streaming)...")
+    logging.info(f"Tamano del prompt: {len(prompt)} caracteres")
+    
+    chunks = []
+    answered_by, last_chunk = model, None
+    try:
+        # Los errores antes del primer fragmento se reintentan en el scheduler
+        for answered_by, chunk in get_scheduler().stream(
+            model,
+            lambda m: (get_context_model(m, context) if context else m).generate_content(prompt, stream=True),
+            prompt, priority
+        ):
+            last_chunk = chunk
+            text = chunk.text
+            chunks.append(text)
+            yield text
+    except Exception as e:
+        logging.error(f"Error al generar con Gemini (streaming): {str(e)}")
+        raise
+    
+    onepager = "".join(chunks)
+    logging.info(f"One Pager recibido por streaming: {len(onepager)} caracteres")
+    _store_response(answered_by, prompt, context, onepager, last_chunk)
+
+
+def iter_sections(chunks):
+    """
+    Agrupa un stream de texto en secciones completas del One Pager.
+    
+    Una sección termina cuando empieza el siguiente heading '### ', así cada
+    sección se entrega apenas está completa, sin esperar el resto de la respuesta.
+    
+    Args:
+        chunks (iterable): Fragmentos de texto (ver stream_onepager).
+        
+    Yields:
+        str: Markdown de cada sección (el texto previo al primer heading incluido).
+    """
+    current = []
+    pending = ""
+    
+    for chunk in chunks:
+        pending += chunk
+        # Procesar solo líneas completas; la última puede seguir llegando
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            if line.lstrip().startswith('### ') and any(l.strip() for l in current):
+                yield '\n'.join(current)
+                current = []
+            current.append(line)
+    
+    if pending:
+        current.append(pending)
+    if any(l.strip() for l in current):
+        yield '\n'.join(current)
+
+
+def configure_json_model(model):
+    """
+    Crea una variante del modelo que responde JSON con el esquema del One Pager.
+    
+    Args:
+        model: Modelo de Gemini configurado.
+        
+    Returns:
+        genai.GenerativeModel: Mismo modelo y configuración, con response_schema.
+    """
+    model_name, generation_config = get_model_signature(model)
+    generation_config.update(response_mime_type="application/json", response_schema=ONEPAGER_SCHEMA)
+    return get_model(model_name, generation_config)
+
+
+def generate_onepager_json(model, dod_content, guide_content, use_cache=True):
+    """
+    Genera el One Pager como JSON estructurado (una entrada por sección).
+    El PDF se arma directamente desde esa estructura, sin re-parsear Markdown.
+    
+    Args:
+        model: Modelo de Gemini configurado.
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Contenido del One Pager Guide.
+        use_cache (bool): False fuerza la regeneración.
+        
+    Returns:
+        str: JSON normalizado (ver onepager_schema.parse_onepager_json).
+        
+    Raises:
+        ValueError: Si la respuesta no tiene las 8 secciones.
+    """
+    prompt, context = build_request(dod_content, guide_content)
+    prompt += (
+        "\nResponde en JSON con el esquema indicado: una entrada por sección, en orden, "
+        "con su número, su título, párrafos y bullets como texto plano (se permite **negrita**).\n"
+    )
+    
+    response = generate_onepager(configure_json_model(model), prompt, use_cache=use_cache, context=context)
+    data = parse_onepager_json(response)
+    
+    logging.info(f"One Pager estructurado: {len(data['sections'])} secciones")
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def split_sections(onepager):
+    """
+    Separa un One Pager en sus secciones numeradas.
+    
+    Args:
+        onepager (str): One Pager en Markdown.
+        
+    Returns:
+        dict: número de sección -> Markdown de la sección (con su heading).
+    """
+    matches = list(SECTION_HEADING_PATTERN.finditer(onepager))
+    sections = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(onepager)
+        sections.setdefault(int(match.group(1)), onepager[match.start():end].strip())
+    return sections
+
+
+def validate_section(number, text):
+    """
+    Valida la respuesta de una sección y normaliza su heading.
+    
+    Args:
+        number (int): Número de la sección esperada.
+        text (str): Respuesta de Gemini.
+        
+    Returns:
+        str: Markdown de la sección, o None si la respuesta no es válida.
+    """
+    if not text or not text.strip():
+        return None
+    
+    found = split_sections(text)
+    if found:
+        # Si respondió otra sección (o varias), quedarse solo con la pedida
+        return found.get(number)
+    
+    # Sin heading: se antepone el esperado
+    return f"### {SECTIONS[number - 1][0]}\n\n{text.strip()}"
+
+
+def assemble_sections(sections):
+    """
+    Une las secciones en orden y verifica que estén todas.
+    
+    Args:
+        sections (dict): número de sección -> Markdown.
+        
+    Returns:
+        str: One Pager completo.
+        
+    Raises:
+        ValueError: Si falta alguna sección.
+    """
+    missing = [number for number in range(1, len(SECTIONS) + 1) if not sections.get(number)]
+    if missing:
+        raise ValueError(f"Secciones faltantes en el One Pager: {', '.join(map(str, missing))}")
+    
+    return "\n\n".join(sections[number] for number in range(1, len(SECTIONS) + 1)) + "\n"
+
+
+def generate_sections(model, dod_content, guide_content, numbers, use_cache=True, priority=PRIORITY_NORMAL):
+    """
+    Genera varias secciones en paralelo (una llamada a Gemini por sección).
+    
+    Args:
+        model: Modelo de Gemini configurado.
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Contenido del One Pager Guide.
+        numbers (list): Números de las secciones a generar.
+        use_cache (bool): False fuerza la regeneración.
+        priority (int): Prioridad en la cola del scheduler.
+        
+    Returns:
+        dict: número de sección -> Markdown validado, o None si falló.
+    """
+    def generate_one(number):
+        try:
+            prompt, context = build_request(dod_content, guide_content, number)
+            onepager = generate_onepager(model, prompt, use_cache=use_cache, context=context, priority=priority)
+            return validate_section(number, onepager)
+        except Exception as e:
+            logging.error(f"Error al generar la sección {number}: {str(e)}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(GEMINI_SECTION_WORKERS, len(numbers)))) as executor:
+        return dict(zip(numbers, executor.map(generate_one, numbers)))
+
+
+def generate_onepager_by_sections(model, dod_content, guide_content, use_cache=True,
+                                  retries=GEMINI_SECTION_RETRIES):
+    """
+    Genera el One Pager con un prompt por sección, en paralelo.
+    Las secciones fallidas o inválidas se regeneran solas (sin caché), sin
+    repetir las que ya están bien.
+    
+    Args:
+        model: Modelo de Gemini configurado.
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Contenido del One Pager Guide.
+        use_cache (bool): False fuerza la regeneración.
+        retries (int): Reintentos para las secciones fallidas.
+        
+    Returns:
+        str: One Pager completo, con las secciones en orden.
+        
+    Raises:
+        ValueError: Si alguna sección sigue fallando tras los reintentos.
+    """
+    logging.info(f"Generando One Pager por secciones ({len(SECTIONS)} prompts en paralelo)...")
+    
+    numbers = list(range(1, len(SECTIONS) + 1))
+    sections = generate_sections(model, dod_content, guide_content, numbers, use_cache)
+    
+    for attempt in range(1, retries + 1):
+        failed = [number for number in numbers if not sections.get(number)]
+        if not failed:
+            break
+        logging.warning(f"Regenerando secciones {failed} (intento {attempt}/{retries})")
+        # Las secciones que faltan bloquean el One Pager: pasan primero en la cola
+        sections.update(generate_sections(
+            model, dod_content, guide_content, failed, use_cache=False, priority=PRIORITY_HIGH
+        ))
+    
+    onepager = assemble_sections(sections)
+    logging.info(f"One Pager por secciones completo: {len(onepager)} caracteres")
+    return onepager
+
+
+def regenerate_section(model, onepager, dod_content, guide_content, number):
+    """
+    Regenera una sola sección de un One Pager existente.
+    
+    Args:
+        model: Modelo de Gemini configurado.
+        onepager (str): One Pager actual.
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Contenido del One Pager Guide.
+        number (int): Número de la sección a regenerar.
+        
+    Returns:
+        str: One Pager con la sección reemplazada.
+    """
+    logging.info(f"Regenerando sección {number}: {SECTIONS[number - 1][0]}")
+    
+    sections = split_sections(onepager)
+    section = generate_sections(
+        model, dod_content, guide_content, [number], use_cache=False, priority=PRIORITY_HIGH
+    )[number]
+    if not section:
+        raise ValueError(f"No se pudo regenerar la sección {number}")
+    
+    sections[number] = section
+    return assemble_sections(sections)
+
+
 def save_onepager(content, output_path="output/onepager_generado.md"):
     """
     Guarda el One Pager generado en un archivo.
+    Un One Pager estructurado (JSON) se guarda como Markdown legible y, junto
+    a él, el JSON original (misma ruta con extensión .json).
     
     Args:
         content (str): Contenido del One Pager.
@@ -169,6 +701,12 @@ def save_onepager(content, output_path="output/onepager_generado.md"):
     try:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
+        data = load_onepager_data(content)
+        if data:
+            with open(os.path.splitext(output_path)[0] + ".json", 'w', encoding='utf-8') as f:
+                f.write(content)
+            content = onepager_to_markdown(data)
+        
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
@@ -193,15 +731,30 @@ if __name__ == "__main__":
         model = configure_gemini()
         
         # Paso 2: Leer archivos de entrada
-        dod_content = read_file_content("output/dod_content.md")
+        dod_content = compact_for_prompt(read_file_content("output/dod_content.md"), model)
         guide_content = read_file_content("output/onepager_guide.md")
         
-        # Paso 3: Construir prompt
-        logging.info("Construyendo prompt...")
-        prompt = build_prompt(dod_content, guide_content)
+        use_cache = "--force-regenerate" not in sys.argv
         
-        # Paso 4: Generar One Pager con Gemini
-        onepager = generate_onepager(model, prompt)
+        if "--section" in sys.argv:
+            # Regenerar solo una sección del One Pager ya generado: --section 6
+            number = int(sys.argv[sys.argv.index("--section") + 1])
+            onepager = regenerate_section(
+                model, read_file_content("output/onepager_generado.md"), dod_content, guide_content, number
+            )
+        elif "--json" in sys.argv:
+            # Paso 3-4: Respuesta JSON estructurada
+            onepager = generate_onepager_json(model, dod_content, guide_content, use_cache)
+        elif "--by-section" in sys.argv:
+            # Paso 3-4: Un prompt por sección, en paralelo
+            onepager = generate_onepager_by_sections(model, dod_content, guide_content, use_cache)
+        else:
+            # Paso 3: Construir prompt (solo el DoD si hay caché de contexto)
+            logging.info("Construyendo prompt...")
+            prompt, context = build_request(dod_content, guide_content)
+            
+            # Paso 4: Generar One Pager con Gemini (--force-regenerate ignora el cache)
+            onepager = generate_onepager(model, prompt, use_cache=use_cache, context=context)
         
         # Paso 5: Guardar resultado
         save_onepager(onepager)
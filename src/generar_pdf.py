@@ -3,14 +3,24 @@ Generador de PDF del One Pager usando ReportLab.
 Convierte Markdown a PDF profesional con imágenes integradas.
 """
 
+import io
 import os
+import re
 import logging
+import threading
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus.flowables import Flowable
+from reportlab.lib.utils import ImageReader
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.colors import HexColor
+from onepager_schema import load_onepager_data
+from markdown_pdf import compile_markdown, format_inline
+from dod_images import images_by_section, load_image_refs
+from image_pipeline import read_image_size, optimize_image
 
 
 logging.basicConfig(
@@ -23,6 +33,32 @@ logging.basicConfig(
 )
 
 
+# Número de sección al inicio de un heading: "6. ⚙️ ¿En qué consiste...?"
+SECTION_NUMBER_PATTERN = re.compile(r'^(\d+)\.\s')
+
+# Caja máxima de una imagen; nunca se agranda más allá de su tamaño a 96 dpi
+MAX_IMAGE_WIDTH = 15*cm
+MAX_IMAGE_HEIGHT = 10*cm
+POINTS_PER_PIXEL = 72 / 96
+
+# (ruta, mtime) -> ImageReader ya decodificado, compartido por los PDFs del proceso
+_image_readers = {}
+_image_readers_lock = threading.Lock()
+
+# Estilos creados una vez por proceso (ver get_styles)
+_styles = None
+_styles_lock = threading.Lock()
+
+# Documento mínimo para cargar fuentes, parser y plantilla antes del primer render
+WARM_UP_CONTENT = """### 1. Warm up
+Texto con **negrita**, *itálica* y `código`.
+- Item
+| A | B |
+|---|---|
+| 1 | 2 |
+"""
+
+
 def read_markdown(file_path):
     """
     Lee el contenido del archivo Markdown.
@@ -96,6 +132,21 @@ def create_styles():
             fontSize=11,
             spaceAfter=8,
             alignment=TA_LEFT
+        ),
+        'CustomCode': ParagraphStyle(
+            'CustomCode',
+            parent=styles['Code'],
+            fontSize=9,
+            leading=11,
+            spaceAfter=8,
+            backColor=HexColor('#F4F4F4'),
+            borderPadding=4
+        ),
+        'CustomTableCell': ParagraphStyle(
+            'CustomTableCell',
+            parent=styles['Normal'],
+            fontSize=9,
+            leading=11
         )
     }
     
@@ -103,140 +154,295 @@ def create_styles():
     return custom_styles
 
 
-def convert_bold_formatting(text):
+def get_image_reader(path):
+    """
+    Devuelve la imagen decodificada, compartida por todos los PDFs del proceso.
+    
+    Args:
+        path (str): Ruta local de la imagen.
+    
+    Returns:
+        ImageReader: Imagen lista para dibujar (se invalida si el archivo cambia).
+    """
+    key = (path, os.path.getmtime(path))
+    with _image_readers_lock:
+        reader = _image_readers.get(key)
+        if reader is None:
+            reader = ImageReader(path)
+            _image_readers[key] = reader
+    return reader
+
+
+def get_styles():
+    """
+    Devuelve los estilos del PDF, creados solo la primera vez en el proceso.
+    
+    Returns:
+        dict: Estilos de create_styles (más los derivados que agrega markdown_pdf).
+    """
+    global _styles
+    
+    with _styles_lock:
+        if _styles is None:
+            _styles = create_styles()
+    return _styles
+
+
+def warm_up():
+    """
+    Carga estilos, métricas de fuentes y parser de ReportLab renderizando un
+    documento mínimo en memoria (ver render_service).
+    """
+    get_styles()
+    generate_pdf(WARM_UP_CONTENT, None, "Warm up")
+
+
+def image_size(pixel_size):
+    """
+    Tamaño de dibujo de una imagen: el de sus píxeles a 96 dpi, reducido
+    proporcionalmente hasta entrar en MAX_IMAGE_WIDTH x MAX_IMAGE_HEIGHT.
+    
+    Args:
+        pixel_size (tuple): (ancho, alto) en píxeles de la imagen original.
+    
+    Returns:
+        tuple: (ancho, alto) en puntos.
+    """
+    width, height = pixel_size
+    width, height = width * POINTS_PER_PIXEL, height * POINTS_PER_PIXEL
+    scale = min(1.0, MAX_IMAGE_WIDTH / width, MAX_IMAGE_HEIGHT / height)
+    return width * scale, height * scale
+
+
+class SharedImage(Flowable):
+    """Imagen centrada que se dibuja desde un ImageReader compartido."""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = 'CENTER'
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+def image_elements(ref):
+    """
+    Elementos del PDF para una imagen del DoD.
+    
+    Args:
+        ref (dict): Referencia de extract_image_refs.
+    
+    Returns:
+        list: Imagen con sus espaciados, o lista vacía si el archivo no existe.
+    """
+    path = ref['path']
+    if not os.path.exists(path):
+        logging.warning(f"Imagen del DoD no encontrada, se omite: {path}")
+        return []
+
+    try:
+        # El tamaño sale del original; se incrusta la versión reducida y recomprimida
+        width, height = image_size(read_image_size(path))
+        reader = get_image_reader(optimize_image(path, width, height))
+    except Exception as e:
+        logging.warning(f"No se pudo leer la imagen {path}: {str(e)}")
+        return []
+
+    return [Spacer(1, 0.3*cm), SharedImage(reader, width, height), Spacer(1, 0.3*cm)]
+
+
+def section_image_elements(number, section_images):
     """
-    Convierte **texto** a <b>texto</b> de forma segura.
+    Elementos de las imágenes del DoD asignadas a una sección.
     
     Args:
-        text (str): Texto con formato **bold**.
+        number (int): Número de la sección.
+        section_images (dict): Salida de dod_images.images_by_section.
         
     Returns:
-        str: Texto con formato HTML <b>bold</b>.
+        list: Imágenes con sus espaciados, o lista vacía si no hay imágenes.
     """
-    import re
+    elements = []
+    for ref in section_images.get(number, []):
+        image = image_elements(ref)
+        if image:
+            logging.info(f"Imagen insertada en sección {number}: {ref['path']}")
+        elements.extend(image)
+    return elements
+
+
+def section_to_elements(section, styles, section_images):
+    """
+    Convierte una sección estructurada (ver onepager_schema) a elementos de ReportLab.
     
-    # Usar regex para encontrar **texto** y reemplazarlo correctamente
-    def replace_bold(match):
-        content = match.group(1)
-        return f"<b>{content}</b>"
+    Args:
+        section (dict): number, title, paragraphs y bullets.
+        styles (dict): Estilos personalizados.
+        section_images (dict): Salida de dod_images.images_by_section.
+        
+    Returns:
+        list: Elementos de la sección.
+    """
+    elements = [Paragraph(escape(section['title']), styles['CustomHeading'])]
+    elements.extend(section_image_elements(section['number'], section_images))
     
-    # Patrón para encontrar **texto** (no anidado)
-    pattern = r'\*\*(.*?)\*\*'
-    result = re.sub(pattern, replace_bold, text)
+    for paragraph in section['paragraphs']:
+        elements.append(Paragraph(format_inline(paragraph), styles['CustomNormal']))
+    for bullet in section['bullets']:
+        elements.append(Paragraph(format_inline(bullet), styles['CustomBullet'], bulletText='•'))
     
-    return result
+    return elements
 
 
-def parse_markdown_to_elements(markdown_content, styles):
+def parse_markdown_to_elements(markdown_content, styles, section_images=None):
     """
-    Parsea el contenido Markdown y lo convierte a elementos de ReportLab.
+    Parsea el contenido Markdown y lo convierte a elementos de ReportLab
+    (ver markdown_pdf.compile_markdown).
     
     Args:
         markdown_content (str): Contenido Markdown.
         styles (dict): Estilos personalizados.
+        section_images (dict): Salida de dod_images.images_by_section; las
+            imágenes van después del heading que empieza con su número ("6. ...").
         
     Returns:
         list: Lista de elementos para el PDF.
     """
-    elements = []
-    lines = markdown_content.split('\n')
+    def heading_images(title):
+        match = SECTION_NUMBER_PATTERN.match(title)
+        return section_image_elements(int(match.group(1)), section_images) if match else []
     
-    image_count = 0
+    elements = compile_markdown(markdown_content, styles, heading_images if section_images else None)
+    logging.info(f"{len(elements)} elementos creados para el PDF")
+    return elements
+
+
+def generate_pdf(markdown_content, output_path="output/E137_OnePager.pdf",
+                 subtitle="E137 - Data Normalization in Unions", images=None):
+    """
+    Genera el PDF desde el contenido Markdown.
+    Si el contenido es un One Pager estructurado (JSON), se arma directamente
+    desde sus secciones, sin parsear Markdown.
     
-    for line in lines:
-        line = line.strip()
-        
-        if not line:
-            continue
-            
-        # Headings (###)
-        if line.startswith('### '):
-            title = line[4:].strip()
-            elements.append(Paragraph(title, styles['CustomHeading']))
-            
-            # Insertar imagen después de sección 6
-            if "6" in title and "En qué consiste" in title:
-                image_count += 1
-                image_path = f"output/images/dod_image_1760820189.png"
-                if os.path.exists(image_path):
-                    elements.append(Spacer(1, 0.3*cm))
-                    elements.append(Image(image_path, width=15*cm, height=10*cm))
-                    elements.append(Spacer(1, 0.3*cm))
-                    logging.info(f"Imagen {image_count} insertada después de sección 6")
-            
-            # Insertar imagen en sección 8
-            elif "8" in title and "Cómo se usa" in title:
-                image_count += 1
-                image_path = f"output/images/dod_image_1760820190.png"
-                if os.path.exists(image_path):
-                    elements.append(Spacer(1, 0.3*cm))
-                    elements.append(Image(image_path, width=15*cm, height=10*cm))
-                    elements.append(Spacer(1, 0.3*cm))
-                    logging.info(f"Imagen {image_count} insertada en sección 8")
-        
-        # Bullet points
-        elif line.startswith('* ') or line.startswith('- '):
-            text = line[2:].strip()
-            # Convertir **texto** a <b>texto</b> correctamente
-            text = convert_bold_formatting(text)
-            elements.append(Paragraph(f"• {text}", styles['CustomBullet']))
+    Args:
+        markdown_content (str): Contenido Markdown o JSON (ver onepager_schema).
+        output_path (str): Ruta del archivo PDF de salida; None para generarlo en memoria.
+        subtitle (str): Subtítulo del encabezado (funcionalidad documentada).
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
         
-        # Lista numerada
-        elif line[0].isdigit() and '. ' in line:
-            text = line.split('. ', 1)[1].strip()
-            text = convert_bold_formatting(text)
-            elements.append(Paragraph(f"• {text}", styles['CustomBullet']))
+    Returns:
+        str: Ruta del archivo PDF generado, o sus bytes si output_path es None.
+    """
+    data = load_onepager_data(markdown_content)
+    if data:
+        return generate_pdf_from_data(data, output_path, subtitle, images)
+    return generate_pdf_from_sections([markdown_content], output_path, subtitle, images)
+
+
+def generate_pdf_from_data(data, output_path="output/E137_OnePager.pdf",
+                           subtitle="E137 - Data Normalization in Unions", images=None):
+    """
+    Genera el PDF desde un One Pager estructurado.
+    
+    Args:
+        data (dict): Salida de onepager_schema.parse_onepager_json.
+        output_path (str): Ruta del archivo PDF de salida; None para generarlo en memoria.
+        subtitle (str): Subtítulo del encabezado (funcionalidad documentada).
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
         
-        # Párrafos normales
-        else:
-            if line:
-                text = convert_bold_formatting(line)
-                elements.append(Paragraph(text, styles['CustomNormal']))
+    Returns:
+        str: Ruta del archivo PDF generado, o sus bytes si output_path es None.
+    """
+    section_images = images_by_section(images)
+    return build_pdf(
+        lambda styles: (section_to_elements(section, styles, section_images) for section in data['sections']),
+        output_path, subtitle
+    )
+
+
+def generate_pdf_from_sections(sections, output_path="output/E137_OnePager.pdf",
+                               subtitle="E137 - Data Normalization in Unions", images=None):
+    """
+    Genera el PDF a partir de secciones de Markdown que pueden ir llegando.
     
-    logging.info(f"{len(elements)} elementos creados para el PDF")
-    return elements
+    Cada sección se convierte a elementos de ReportLab apenas se recibe (por
+    ejemplo, mientras Gemini sigue generando las siguientes); al agotarse el
+    iterable solo queda maquetar el documento.
+    
+    Args:
+        sections (iterable): Secciones de Markdown (lista o generador).
+        output_path (str): Ruta del archivo PDF de salida; None para generarlo en memoria.
+        subtitle (str): Subtítulo del encabezado (funcionalidad documentada).
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
+        
+    Returns:
+        str: Ruta del archivo PDF generado, o sus bytes si output_path es None.
+    """
+    section_images = images_by_section(images)
+    return build_pdf(
+        lambda styles: (parse_markdown_to_elements(section, styles, section_images) for section in sections),
+        output_path, subtitle
+    )
 
 
-def generate_pdf(markdown_content, output_path="output/E137_OnePager.pdf"):
+def build_pdf(section_elements, output_path, subtitle):
     """
-    Genera el PDF desde el contenido Markdown.
+    Maqueta el PDF: encabezado, contenido y footer.
     
     Args:
-        markdown_content (str): Contenido Markdown.
-        output_path (str): Ruta del archivo PDF de salida.
+        section_elements (callable): Recibe los estilos y devuelve un iterable
+            con los elementos de cada sección.
+        output_path (str): Ruta del archivo PDF de salida; None para generarlo en memoria.
+        subtitle (str): Subtítulo del encabezado (funcionalidad documentada).
         
     Returns:
-        str: Ruta del archivo PDF generado.
+        str: Ruta del archivo PDF generado, o sus bytes si output_path es None.
     """
     try:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if output_path:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            target = output_path
+        else:
+            target = io.BytesIO()
         
         logging.info("Generando PDF con ReportLab...")
         
         # Crear documento
         doc = SimpleDocTemplate(
-            output_path,
+            target,
             pagesize=A4,
             rightMargin=2*cm,
             leftMargin=2*cm,
             topMargin=2*cm,
-            bottomMargin=2*cm
+            bottomMargin=2*cm,
+            # Sin fecha ni ID aleatorio: el mismo contenido da los mismos bytes
+            invariant=True
         )
         
-        # Crear estilos
-        styles = create_styles()
+        # Estilos (creados una vez por proceso)
+        styles = get_styles()
         
         # Construir elementos
         elements = []
         
         # Header
         elements.append(Paragraph("One Pager", styles['CustomTitle']))
-        elements.append(Paragraph("E137 - Data Normalization in Unions", styles['CustomSubtitle']))
+        elements.append(Paragraph(escape(subtitle), styles['CustomSubtitle']))
         elements.append(Spacer(1, 0.5*cm))
         
-        # Contenido
-        content_elements = parse_markdown_to_elements(markdown_content, styles)
-        elements.extend(content_elements)
+        # Contenido, sección por sección a medida que llega
+        section_count = 0
+        for content_elements in section_elements(styles):
+            section_count += 1
+            elements.extend(content_elements)
+        
+        logging.info(f"Secciones procesadas: {section_count}")
         
         # Footer
         elements.append(Spacer(1, 1*cm))
@@ -248,6 +454,11 @@ def generate_pdf(markdown_content, output_path="output/E137_OnePager.pdf"):
         # Generar PDF
         doc.build(elements)
         
+        if not output_path:
+            pdf_bytes = target.getvalue()
+            logging.info(f"PDF generado en memoria: {len(pdf_bytes) / 1024:.2f} KB")
+            return pdf_bytes
+        
         logging.info(f"PDF generado exitosamente: {output_path}")
         
         # Verificar tamaño del archivo
@@ -261,6 +472,30 @@ def generate_pdf(markdown_content, output_path="output/E137_OnePager.pdf"):
         raise
 
 
+def save_pdf(pdf_bytes, output_path):
+    """
+    Guarda en disco un PDF generado en memoria.
+    
+    Se escribe en un archivo temporal y se renombra, así nadie lee un PDF a
+    medio escribir.
+    
+    Args:
+        pdf_bytes (bytes): Contenido del PDF.
+        output_path (str): Ruta del archivo PDF.
+    
+    Returns:
+        str: Ruta del archivo PDF guardado.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, output_path)
+    
+    logging.info(f"PDF guardado en: {output_path} ({len(pdf_bytes) / 1024:.2f} KB)")
+    return output_path
+
+
 if __name__ == "__main__":
     """Genera el PDF del One Pager con imágenes."""
     
@@ -274,8 +509,9 @@ if __name__ == "__main__":
         # Paso 1: Leer Markdown
         markdown_content = read_markdown("output/onepager_generado.md")
         
-        # Paso 2: Generar PDF con imágenes integradas
-        generate_pdf(markdown_content)
+        # Paso 2: Generar PDF con las imágenes del DoD (ver extraer_dod.py)
+        images = load_image_refs()
+        generate_pdf(markdown_content, images=images)
         
         logging.info("\n" + "="*80)
         logging.info("PDF GENERADO EXITOSAMENTE")
@@ -283,7 +519,7 @@ if __name__ == "__main__":
         logging.info("Archivo: output/E137_OnePager.pdf")
         logging.info("Contenido:")
         logging.info("  - Texto del One Pager generado por Gemini")
-        logging.info("  - 2 imagenes del Definition of Done")
+        logging.info(f"  - {len(images)} imagenes del Definition of Done")
         logging.info("  - Formato profesional con ReportLab")
         logging.info("="*80)
         
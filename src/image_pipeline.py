@@ -0,0 +1,139 @@
+"""
+Preprocesamiento de imágenes antes de incrustarlas en el PDF.
+Las capturas del DoD se reducen a la resolución que necesita su tamaño de
+impresión (PDF_IMAGE_DPI), se recomprimen en el formato más liviano (JPEG o
+PNG optimizado) y pierden sus metadatos (EXIF, perfiles, textos). El resultado
+se guarda en disco por hash del contenido y de los parámetros, así un render
+repetido no vuelve a procesar la misma imagen.
+"""
+
+import io
+import os
+import hashlib
+import logging
+
+from PIL import Image, ImageOps
+
+
+PDF_IMAGE_OPTIMIZE = os.getenv("PDF_IMAGE_OPTIMIZE", "1").lower() not in ("0", "false", "no")
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", 150))
+PDF_IMAGE_JPEG_QUALITY = int(os.getenv("PDF_IMAGE_JPEG_QUALITY", 85))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "cache/images")
+
+POINTS_PER_INCH = 72
+
+# Modos con transparencia: JPEG no la soporta, quedan en PNG
+ALPHA_MODES = ('RGBA', 'LA', 'PA')
+
+
+def read_image_size(path):
+    """
+    Lee el tamaño de una imagen desde su header (sin decodificar los píxeles).
+
+    Args:
+        path (str): Ruta de la imagen.
+
+    Returns:
+        tuple: (ancho, alto) en píxeles.
+    """
+    with Image.open(path) as image:
+        return image.size
+
+
+def target_pixels(width, height, dpi=PDF_IMAGE_DPI):
+    """
+    Píxeles necesarios para imprimir un tamaño a la resolución indicada.
+
+    Args:
+        width (float): Ancho de dibujo en puntos.
+        height (float): Alto de dibujo en puntos.
+        dpi (int): Resolución objetivo.
+
+    Returns:
+        tuple: (ancho, alto) en píxeles.
+    """
+    return (
+        max(1, round(width * dpi / POINTS_PER_INCH)),
+        max(1, round(height * dpi / POINTS_PER_INCH)),
+    )
+
+
+def _encode(image, image_format):
+    """Codifica la imagen en memoria sin metadatos."""
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=PDF_IMAGE_JPEG_QUALITY, optimize=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _cache_path(content, size):
+    """Ruta del resultado en el caché: hash del archivo original + parámetros."""
+    digest = hashlib.sha256(content)
+    digest.update(f"{size[0]}x{size[1]}:{PDF_IMAGE_DPI}:{PDF_IMAGE_JPEG_QUALITY}".encode('utf-8'))
+    return os.path.join(IMAGE_CACHE_DIR, digest.hexdigest())
+
+
+def optimize_image(path, width, height):
+    """
+    Prepara una imagen para el PDF: la reduce a los píxeles que necesita su
+    tamaño de dibujo a PDF_IMAGE_DPI (nunca la agranda), la recomprime en el
+    formato más liviano y le quita los metadatos.
+
+    Args:
+        path (str): Ruta de la imagen original.
+        width (float): Ancho de dibujo en puntos.
+        height (float): Alto de dibujo en puntos.
+
+    Returns:
+        str: Ruta de la imagen optimizada (cacheada), o la original si la
+            optimización está desactivada o falla.
+    """
+    if not PDF_IMAGE_OPTIMIZE:
+        return path
+
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        size = target_pixels(width, height)
+        cache_path = _cache_path(content, size)
+        for extension in ('.jpg', '.png'):
+            if os.path.exists(cache_path + extension):
+                return cache_path + extension
+
+        with Image.open(io.BytesIO(content)) as original:
+            original_size = original.size
+            image = ImageOps.exif_transpose(original)
+            if image.mode == 'P' and 'transparency' in image.info:
+                image = image.convert('RGBA')
+            elif image.mode not in ALPHA_MODES + ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            if image.width > size[0] or image.height > size[1]:
+                image = image.resize(size, Image.LANCZOS)
+
+            # Capturas con colores planos comprimen mejor en PNG, fotos en JPEG
+            candidates = {'.png': _encode(image, 'PNG')}
+            if image.mode not in ALPHA_MODES:
+                candidates['.jpg'] = _encode(image, 'JPEG')
+        extension, data = min(candidates.items(), key=lambda item: len(item[1]))
+
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        # Temporal propio del proceso: los workers de render pueden optimizar la misma imagen a la vez
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path + extension)
+
+        logging.info(
+            f"Imagen optimizada: {os.path.basename(path)} {original_size[0]}x{original_size[1]} -> "
+            f"{image.width}x{image.height} {extension[1:].upper()} "
+            f"({len(content) / 1024:.1f} KB -> {len(data) / 1024:.1f} KB)"
+        )
+        return cache_path + extension
+
+    except Exception as e:
+        logging.warning(f"No se pudo optimizar la imagen {path}, se usa la original: {str(e)}")
+        return path
@@ -0,0 +1,189 @@
+"""
+Almacén local de imágenes descargadas desde Notion.
+Descarga en paralelo sobre una requests.Session con pool de conexiones y nombra
+cada archivo por el hash de su contenido, así dos imágenes nunca se pisan y una
+imagen ya descargada (mismo archivo de Notion o mismo contenido) no se vuelve a bajar.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+IMAGE_DIR = os.getenv("IMAGE_DIR", "output/images")
+IMAGE_INDEX_PATH = os.path.join(IMAGE_DIR, "index.json")
+IMAGE_DOWNLOAD_WORKERS = int(os.getenv("IMAGE_DOWNLOAD_WORKERS", 4))
+
+VALID_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif', 'webp')
+CONTENT_TYPE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+_session = None
+_executor = None
+_index = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Devuelve la sesión HTTP compartida (se crea la primera vez).
+
+    Returns:
+        requests.Session: Sesión con pool de conexiones del tamaño del pool de descargas.
+    """
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=IMAGE_DOWNLOAD_WORKERS, pool_maxsize=IMAGE_DOWNLOAD_WORKERS)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+    return _session
+
+
+def _get_executor():
+    """Pool de hilos compartido para las descargas."""
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_DOWNLOAD_WORKERS, thread_name_prefix="image")
+    return _executor
+
+
+def _load_index():
+    """Carga (una vez) el índice clave de archivo de Notion -> nombre de archivo local."""
+    global _index
+
+    if _index is None:
+        try:
+            with open(IMAGE_INDEX_PATH, 'r', encoding='utf-8') as f:
+                _index = json.load(f)
+        except FileNotFoundError:
+            _index = {}
+        except Exception as e:
+            logging.warning(f"No se pudo leer el indice de imagenes: {str(e)}")
+            _index = {}
+    return _index
+
+
+def _save_index():
+    """Persiste el índice de imágenes (se llama con _lock tomado)."""
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    tmp_path = f"{IMAGE_INDEX_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_index, f, indent=2)
+    os.replace(tmp_path, IMAGE_INDEX_PATH)
+
+
+def notion_file_key(image_url):
+    """
+    Obtiene una clave estable para un archivo de Notion.
+
+    Las URLs de archivos subidos a Notion están firmadas y cambian en cada
+    consulta, pero la ruta (que incluye el ID del archivo) se mantiene.
+
+    Args:
+        image_url (str): URL de la imagen.
+
+    Returns:
+        str: host + ruta de la URL, sin parámetros de firma.
+    """
+    parts = urlsplit(image_url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def _guess_extension(image_url, content_type):
+    """Extensión a partir del Content-Type o, si no, de la URL (png por defecto)."""
+    extension = CONTENT_TYPE_EXTENSIONS.get((content_type or '').split(';')[0].strip())
+    if extension:
+        return extension
+
+    extension = urlsplit(image_url).path.rsplit('.', 1)[-1].lower()
+    return extension if extension in VALID_EXTENSIONS else 'png'
+
+
+def store_image(image_url):
+    """
+    Descarga una imagen al almacén, salvo que ya esté presente.
+
+    Args:
+        image_url (str): URL de la imagen.
+
+    Returns:
+        str: Ruta local de la imagen o None si falla.
+    """
+    key = notion_file_key(image_url)
+
+    with _lock:
+        filename = _load_index().get(key)
+    if filename and os.path.exists(os.path.join(IMAGE_DIR, filename)):
+        logging.info(f"Imagen ya descargada: {filename}")
+        return os.path.join(IMAGE_DIR, filename)
+
+    try:
+        response = get_session().get(image_url, timeout=30)
+        response.raise_for_status()
+        content = response.content
+
+        digest = hashlib.sha256(content).hexdigest()
+        extension = _guess_extension(image_url, response.headers.get('Content-Type'))
+        filename = f"dod_image_{digest[:16]}.{extension}"
+        filepath = os.path.join(IMAGE_DIR, filename)
+
+        os.makedirs(IMAGE_DIR, exist_ok=True)
+        if os.path.exists(filepath):
+            logging.info(f"Imagen con el mismo contenido ya existe: {filename}")
+        else:
+            with open(filepath, 'wb') as f:
+                f.write(content)
+            logging.info(f"Imagen guardada en: {filepath}")
+
+        with _lock:
+            _load_index()[key] = filename
+            _save_index()
+
+        return filepath
+
+    except Exception as e:
+        logging.error(f"Error al descargar imagen: {str(e)}")
+        return None
+
+
+def submit_image(image_url):
+    """
+    Programa la descarga de una imagen en segundo plano.
+
+    Args:
+        image_url (str): URL de la imagen.
+
+    Returns:
+        Future: Resultado de store_image (ruta local o None).
+    """
+    return _get_executor().submit(store_image, image_url)
+
+
+def download_images(image_urls):
+    """
+    Descarga varias imágenes en paralelo.
+
+    Args:
+        image_urls (list): URLs de las imágenes.
+
+    Returns:
+        dict: URL -> ruta local (o None si falló).
+    """
+    futures = {url: submit_image(url) for url in dict.fromkeys(image_urls)}
+    return {url: future.result() for url, future in futures.items()}
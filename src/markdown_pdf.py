@@ -0,0 +1,305 @@
+"""
+Compilador de Markdown a flowables de ReportLab.
+Un tokenizador de una sola pasada agrupa las líneas en bloques (headings,
+párrafos, listas anidadas, tablas, código, citas, separadores) y cada tipo de
+bloque se compila con una tabla de despacho (BLOCK_COMPILERS). El formato
+inline (negrita, itálica, código, links, tachado) se resuelve con un único
+patrón precompilado y el texto se escapa antes de llegar al parser de
+Paragraph. Solo depende de ReportLab.
+"""
+
+import re
+from xml.sax.saxutils import escape, quoteattr
+
+from reportlab.lib.units import cm
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.colors import HexColor
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, XPreformatted
+from reportlab.platypus.flowables import HRFlowable
+
+
+# Bloques
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+LIST_ITEM_PATTERN = re.compile(r'^(\s*)([-*+]|\d+[.)])\s+(.*)$')
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+RULE_PATTERN = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+QUOTE_PATTERN = re.compile(r'^\s*>\s?(.*)$')
+
+# Inline: un solo patrón, las alternativas se prueban en orden de precedencia
+INLINE_PATTERN = re.compile(
+    r'`(?P<code>[^`]+)`'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)\s]+)\)'
+    r'|\*\*(?P<bold>.+?)\*\*'
+    r'|__(?P<bold_alt>.+?)__'
+    r'|~~(?P<strike>.+?)~~'
+    r'|(?<![\w*])\*(?![\s*])(?P<italic>.+?)(?<![\s*])\*(?![\w*])'
+    r'|(?<![\w_])_(?![\s_])(?P<italic_alt>.+?)(?<![\s_])_(?![\w_])'
+)
+
+TAB_WIDTH = 4
+
+# Viñetas por nivel de lista (caracteres presentes en las fuentes base de ReportLab)
+BULLETS = ('•', '–', '·')
+
+LINK_COLOR = "#2E86AB"
+CODE_FONT = "Courier"
+TABLE_HEADER_COLOR = HexColor('#2E86AB')
+TABLE_GRID_COLOR = HexColor('#BFBFBF')
+
+# Ancho útil de A4 con márgenes de 2 cm
+CONTENT_WIDTH = 17*cm
+
+
+def format_inline(text):
+    """
+    Convierte el formato inline de Markdown a markup de Paragraph.
+    Todo el texto se escapa (<, >, &), así que nunca rompe el parser de ReportLab.
+
+    Args:
+        text (str): Texto Markdown de una línea.
+
+    Returns:
+        str: Markup seguro para ReportLab.
+    """
+    parts = []
+    position = 0
+
+    for match in INLINE_PATTERN.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        position = match.end()
+        kind = match.lastgroup
+
+        if kind == 'code':
+            parts.append(f'<font face="{CODE_FONT}">{escape(match.group("code"))}</font>')
+        elif kind == 'link_url':
+            url = quoteattr(match.group('link_url'))
+            parts.append(f'<a href={url} color="{LINK_COLOR}"><u>{format_inline(match.group("link_text"))}</u></a>')
+        elif kind in ('bold', 'bold_alt'):
+            parts.append(f'<b>{format_inline(match.group(kind))}</b>')
+        elif kind == 'strike':
+            parts.append(f'<strike>{format_inline(match.group(kind))}</strike>')
+        else:
+            parts.append(f'<i>{format_inline(match.group(kind))}</i>')
+
+    parts.append(escape(text[position:]))
+    return ''.join(parts)
+
+
+def _indent_width(whitespace):
+    """Ancho de una indentación contando los tabs como TAB_WIDTH espacios."""
+    return len(whitespace.expandtabs(TAB_WIDTH))
+
+
+def tokenize(markdown_content):
+    """
+    Agrupa las líneas del Markdown en bloques, en una sola pasada.
+    Cada línea de texto es su propio párrafo (así escribe Gemini los One Pagers).
+
+    Args:
+        markdown_content (str): Contenido Markdown.
+
+    Yields:
+        tuple: (tipo, datos) con tipo "heading", "paragraph", "list_item",
+            "table", "code", "quote" o "rule".
+    """
+    lines = markdown_content.split('\n')
+    # Indentaciones de los items abiertos: el nivel de un item es su posición en la pila
+    list_indents = []
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        i += 1
+
+        if not stripped:
+            continue
+
+        item = LIST_ITEM_PATTERN.match(line)
+        if not item or RULE_PATTERN.match(line):
+            list_indents.clear()
+
+        # Código: hasta el cierre de la misma valla (o el final)
+        fence = FENCE_PATTERN.match(line)
+        if fence:
+            code = []
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                code.append(lines[i])
+                i += 1
+            i += 1
+            yield 'code', '\n'.join(code)
+            continue
+
+        heading = HEADING_PATTERN.match(stripped)
+        if heading:
+            yield 'heading', (len(heading.group(1)), heading.group(2))
+            continue
+
+        if RULE_PATTERN.match(line):
+            yield 'rule', None
+            continue
+
+        # Tabla: filas consecutivas que empiezan con |
+        if stripped.startswith('|'):
+            rows = [stripped]
+            while i < len(lines) and lines[i].strip().startswith('|'):
+                rows.append(lines[i].strip())
+                i += 1
+            yield 'table', rows
+            continue
+
+        if item:
+            width = _indent_width(item.group(1))
+            while list_indents and list_indents[-1] > width:
+                list_indents.pop()
+            if not list_indents or list_indents[-1] < width:
+                list_indents.append(width)
+            level = len(list_indents) - 1
+            marker = item.group(2)
+            text = item.group(3)
+            # Líneas de continuación: indentadas y sin marcador propio
+            while (i < len(lines) and lines[i].strip() and lines[i][:1].isspace()
+                   and not LIST_ITEM_PATTERN.match(lines[i])):
+                text += ' ' + lines[i].strip()
+                i += 1
+            yield 'list_item', (level, marker, text)
+            continue
+
+        quote = QUOTE_PATTERN.match(line)
+        if quote:
+            quoted = [quote.group(1)]
+            while i < len(lines) and QUOTE_PATTERN.match(lines[i]):
+                quoted.append(QUOTE_PATTERN.match(lines[i]).group(1))
+                i += 1
+            yield 'quote', ' '.join(part.strip() for part in quoted if part.strip())
+            continue
+
+        yield 'paragraph', stripped
+
+
+def _split_row(row):
+    """Celdas de una fila de tabla Markdown."""
+    row = row.strip()
+    if row.startswith('|'):
+        row = row[1:]
+    if row.endswith('|'):
+        row = row[:-1]
+    return [cell.strip() for cell in row.split('|')]
+
+
+def _derived_style(styles, name, base, **overrides):
+    """Estilo derivado de otro, creado una sola vez por hoja de estilos."""
+    style = styles.get(name)
+    if style is None:
+        style = ParagraphStyle(name, parent=styles[base], **overrides)
+        styles[name] = style
+    return style
+
+
+def _compile_heading(data, styles, heading_elements):
+    """Heading y los elementos que lo acompañan (heading_elements)."""
+    level, title = data
+    elements = [Paragraph(format_inline(title), styles['CustomHeading'])]
+    if heading_elements:
+        elements.extend(heading_elements(title))
+    return elements
+
+
+def _compile_paragraph(text, styles, heading_elements):
+    """Párrafo de texto."""
+    return [Paragraph(format_inline(text), styles['CustomNormal'])]
+
+
+def _compile_list_item(data, styles, heading_elements):
+    """Item de lista con su viñeta o número, indentado según su nivel."""
+    level, marker, text = data
+    base = styles['CustomBullet']
+    style = _derived_style(
+        styles, f'CustomBullet{level}', 'CustomBullet',
+        leftIndent=base.leftIndent + level * 0.6*cm,
+        bulletIndent=base.bulletIndent + level * 0.6*cm,
+    )
+    bullet = marker if marker[0].isdigit() else BULLETS[level % len(BULLETS)]
+    return [Paragraph(format_inline(text), style, bulletText=bullet)]
+
+
+def _compile_table(rows, styles, heading_elements):
+    """Tabla con header (si tiene fila separadora) y columnas de igual ancho."""
+    cells = [_split_row(row) for row in rows]
+    # Sin la fila separadora, todas las filas son datos
+    has_header = len(rows) > 1 and TABLE_SEPARATOR_PATTERN.match(rows[1]) is not None
+    if has_header:
+        cells = [cells[0]] + cells[2:]
+
+    columns = max(len(row) for row in cells)
+    header_style = _derived_style(
+        styles, 'CustomTableHeader', 'CustomTableCell', fontName='Helvetica-Bold', textColor=HexColor('#FFFFFF')
+    )
+    data = [
+        [
+            Paragraph(format_inline(cell), header_style if has_header and r == 0 else styles['CustomTableCell'])
+            for cell in row + [''] * (columns - len(row))
+        ]
+        for r, row in enumerate(cells)
+    ]
+
+    table = Table(data, colWidths=[CONTENT_WIDTH / columns] * columns, repeatRows=1 if has_header else 0)
+    commands = [
+        ('GRID', (0, 0), (-1, -1), 0.5, TABLE_GRID_COLOR),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]
+    if has_header:
+        commands.append(('BACKGROUND', (0, 0), (-1, 0), TABLE_HEADER_COLOR))
+    table.setStyle(TableStyle(commands))
+    return [Spacer(1, 0.2*cm), table, Spacer(1, 0.3*cm)]
+
+
+def _compile_code(code, styles, heading_elements):
+    """Bloque de código en fuente monoespaciada."""
+    return [XPreformatted(escape(code), styles['CustomCode'])]
+
+
+def _compile_quote(text, styles, heading_elements):
+    """Cita indentada en itálica."""
+    style = _derived_style(
+        styles, 'CustomQuote', 'CustomNormal', leftIndent=0.8*cm, textColor=HexColor('#555555')
+    )
+    return [Paragraph(f'<i>{format_inline(text)}</i>', style)]
+
+
+def _compile_rule(data, styles, heading_elements):
+    """Separador horizontal."""
+    return [HRFlowable(width="100%", thickness=0.5, color=TABLE_GRID_COLOR, spaceBefore=4, spaceAfter=8)]
+
+
+# Tabla de despacho: tipo de bloque -> compilador
+BLOCK_COMPILERS = {
+    'heading': _compile_heading,
+    'paragraph': _compile_paragraph,
+    'list_item': _compile_list_item,
+    'table': _compile_table,
+    'code': _compile_code,
+    'quote': _compile_quote,
+    'rule': _compile_rule,
+}
+
+
+def compile_markdown(markdown_content, styles, heading_elements=None):
+    """
+    Compila Markdown a flowables de ReportLab.
+
+    Args:
+        markdown_content (str): Contenido Markdown.
+        styles (dict): Estilos del PDF (ver generar_pdf.create_styles); los
+            estilos derivados (niveles de lista, citas) se agregan la primera vez.
+        heading_elements (callable): Recibe el título de cada heading y devuelve
+            elementos a insertar después (ej: la imagen de la sección).
+
+    Returns:
+        list: Flowables en orden.
+    """
+    elements = []
+    for kind, data in tokenize(markdown_content):
+        elements.extend(BLOCK_COMPILERS[kind](data, styles, heading_elements))
+    return elements
@@ -0,0 +1,187 @@
+"""
+Cliente de Notion compartido por todos los módulos.
+Envuelve notion_client.Client con un token bucket ajustado al límite de Notion
+(~3 requests por segundo), reintentos con backoff que respetan Retry-After ante
+429/5xx, un único pool de conexiones HTTP y conteo de requests por etapa del pipeline.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import httpx
+from notion_client import Client
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+
+NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", 3))  # requests por segundo
+NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", 4))
+NOTION_MAX_CONNECTIONS = int(os.getenv("NOTION_MAX_CONNECTIONS", 10))
+
+# Respuestas transitorias que vale la pena reintentar
+RETRYABLE_STATUS = {409, 429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 30
+
+# Etapa del pipeline a la que se atribuyen los requests (ver notion_stage)
+_current_stage = contextvars.ContextVar("notion_stage", default="sin_etapa")
+
+_request_counts = {}
+_counts_lock = threading.Lock()
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Limitador de tasa thread-safe: entrega como máximo `rate` tokens por segundo,
+    con ráfagas de hasta `capacity` tokens.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Bloquea hasta que haya un token disponible y lo consume.
+
+        Returns:
+            float: Segundos esperados.
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimitedClient(Client):
+    """
+    notion_client.Client con limitador de tasa, reintentos y conteo por etapa.
+    Todos los endpoints (databases, pages, blocks...) pasan por request().
+    """
+
+    def __init__(self, auth=None, rate=NOTION_RATE_LIMIT, max_retries=NOTION_MAX_RETRIES,
+                 max_connections=NOTION_MAX_CONNECTIONS):
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        super().__init__(auth=auth, client=httpx.Client(limits=limits))
+        self.bucket = TokenBucket(rate)
+        self.max_retries = max_retries
+
+    def request(self, path, method, query=None, body=None, form_data=None, auth=None):
+        """Envía un request respetando el límite de tasa y reintentando errores transitorios."""
+        attempt = 0
+
+        while True:
+            self.bucket.acquire()
+            count_request()
+
+            try:
+                return super().request(path, method, query, body, form_data, auth)
+
+            except (HTTPResponseError, RequestTimeoutError, httpx.TransportError) as e:
+                status = getattr(e, 'status', None)
+                retryable = status is None or status in RETRYABLE_STATUS
+                if not retryable or attempt >= self.max_retries:
+                    raise
+
+                delay = _retry_delay(e, attempt)
+                attempt += 1
+                logging.warning(
+                    f"Notion {method} {path}: {status or type(e).__name__}. "
+                    f"Reintento {attempt}/{self.max_retries} en {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+
+def _retry_delay(error, attempt):
+    """Segundos a esperar antes de reintentar: Retry-After si viene, o backoff exponencial con jitter."""
+    headers = getattr(error, 'headers', None)
+    retry_after = headers.get('Retry-After') if headers is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        except ValueError:
+            pass
+
+    return min(MAX_BACKOFF_SECONDS, 2 ** attempt) + random.uniform(0, 0.5)
+
+
+def get_notion_client():
+    """
+    Devuelve el cliente de Notion compartido (se crea la primera vez).
+
+    Returns:
+        RateLimitedClient: Cliente autenticado con NOTION_API_KEY.
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = RateLimitedClient(auth=os.getenv("NOTION_API_KEY"))
+    return _client
+
+
+@contextmanager
+def notion_stage(stage):
+    """
+    Atribuye a `stage` los requests hechos dentro del bloque `with`.
+
+    Args:
+        stage (str): Nombre de la etapa (ej: "tracker", "extract", "notion").
+    """
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+def count_request():
+    """Suma un request a la etapa actual."""
+    stage = _current_stage.get()
+    with _counts_lock:
+        _request_counts[stage] = _request_counts.get(stage, 0) + 1
+
+
+def get_request_counts():
+    """
+    Devuelve los requests hechos por etapa desde el último reset.
+
+    Returns:
+        dict: etapa -> cantidad de requests (incluye reintentos).
+    """
+    with _counts_lock:
+        return dict(_request_counts)
+
+
+def reset_request_counts():
+    """Reinicia los contadores de requests."""
+    with _counts_lock:
+        _request_counts.clear()
+
+
+def log_request_counts():
+    """Registra en el log el presupuesto de requests consumido por etapa."""
+    counts = get_request_counts()
+    total = sum(counts.values())
+    summary = ", ".join(f"{stage}={count}" for stage, count in sorted(counts.items()))
+    logging.info(f"Requests a Notion: {total} ({summary or 'ninguno'})")
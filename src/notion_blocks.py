@@ -0,0 +1,174 @@
+"""
+Lectura del árbol de bloques de una página de Notion.
+Recorre el árbol por niveles (breadth-first) y pide los hijos de cada nivel en
+paralelo con un pool de hilos acotado, para que el render a Markdown sea un paso
+puro en memoria sobre el árbol ya descargado. Los hijos se leen siguiendo el
+cursor de paginación, así páginas y tablas de más de 100 bloques llegan completas.
+"""
+
+import os
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Notion admite ~3 requests por segundo por integración: no tiene sentido
+# tener más requests simultáneos que eso
+NOTION_MAX_CONCURRENCY = int(os.getenv("NOTION_MAX_CONCURRENCY", 3))
+
+# Notion devuelve como máximo 100 bloques por página
+MAX_PAGE_SIZE = 100
+
+
+def iter_block_children_pages(notion, block_id):
+    """
+    Recorre los hijos de un bloque página por página, siguiendo next_cursor.
+
+    Args:
+        notion (Client): Cliente de Notion.
+        block_id (str): ID del bloque (o de la página).
+
+    Yields:
+        list: Bloques de cada página de resultados (hasta 100 por página).
+    """
+    cursor = None
+
+    while True:
+        kwargs = {"block_id": block_id, "page_size": MAX_PAGE_SIZE}
+        if cursor:
+            kwargs["start_cursor"] = cursor
+
+        response = notion.blocks.children.list(**kwargs)
+        yield response['results']
+
+        cursor = response.get('next_cursor')
+        if not response.get('has_more') or not cursor:
+            return
+
+
+def iter_block_children(notion, block_id):
+    """
+    Recorre los hijos de un bloque de forma perezosa, uno a uno.
+
+    Args:
+        notion (Client): Cliente de Notion.
+        block_id (str): ID del bloque (o de la página).
+
+    Yields:
+        dict: Cada bloque hijo.
+    """
+    for page in iter_block_children_pages(notion, block_id):
+        yield from page
+
+
+def list_block_children(notion, block_id):
+    """
+    Obtiene todos los hijos directos de un bloque (todas las páginas).
+
+    Args:
+        notion (Client): Cliente de Notion.
+        block_id (str): ID del bloque (o de la página).
+
+    Returns:
+        list: Bloques hijos.
+    """
+    return list(iter_block_children(notion, block_id))
+
+
+def _fetch_subtrees(notion, blocks, pool):
+    """
+    Completa, por niveles, los subárboles de una lista de bloques.
+
+    Args:
+        notion (Client): Cliente de Notion.
+        blocks (list): Bloques cuyos descendientes se deben descargar.
+        pool (ThreadPoolExecutor): Pool que acota los requests concurrentes.
+
+    Returns:
+        int: Cantidad de bloques cuyos hijos se consultaron.
+
+    Raises:
+        Exception: El error del primer bloque cuyos hijos no se pudieron leer
+            (un subárbol incompleto no se entrega como si estuviera completo).
+    """
+    level = [block for block in blocks if block.get('has_children', False)]
+    listed = 0
+
+    while level:
+        next_level = []
+
+        # Cada tarea corre en una copia del contexto actual para que los requests
+        # se atribuyan a la etapa del pipeline que los originó (ver notion_api)
+        futures = [
+            pool.submit(contextvars.copy_context().run, list_block_children, notion, block['id'])
+            for block in level
+        ]
+
+        # Los futures conservan el orden, así cada bloque recibe sus propios hijos
+        for block, future in zip(level, futures):
+            try:
+                children = future.result()
+            except Exception as e:
+                logging.error(f"Error al leer bloques hijos de {block['type']}: {str(e)}")
+                for pending in futures:
+                    pending.cancel()
+                raise
+            block['children'] = children
+            next_level.extend(child for child in children if child.get('has_children', False))
+
+        listed += len(level)
+        level = next_level
+
+    return listed
+
+
+def iter_block_tree(notion, root_id, max_workers=NOTION_MAX_CONCURRENCY, pages=None):
+    """
+    Recorre los bloques de primer nivel con sus subárboles ya descargados.
+
+    Cada página de resultados del primer nivel se completa (breadth-first y en
+    paralelo) y se entrega en cuanto está lista, de modo que el render puede
+    empezar antes de que llegue la última página.
+
+    Args:
+        notion (Client): Cliente de Notion.
+        root_id (str): ID de la página o bloque raíz.
+        max_workers (int): Límite de requests concurrentes.
+        pages (iterable): Páginas de resultados del primer nivel ya leídas
+            (default: se leen con iter_block_children_pages).
+
+    Yields:
+        dict: Cada bloque de primer nivel, con sus hijos en 'children'.
+
+    Raises:
+        Exception: Si falla la lectura de cualquier nivel del árbol.
+    """
+    listed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        if pages is None:
+            pages = iter_block_children_pages(notion, root_id)
+        for page in pages:
+            listed += _fetch_subtrees(notion, page, pool)
+            yield from page
+
+    logging.info(f"Árbol de bloques descargado: {listed} bloques con hijos consultados")
+
+
+def fetch_block_tree(notion, root_id, max_workers=NOTION_MAX_CONCURRENCY):
+    """
+    Descarga el árbol completo de bloques bajo una página o bloque.
+
+    Cada bloque con has_children recibe la clave 'children' con sus hijos.
+    Los hijos de todos los bloques de un mismo nivel se piden en paralelo,
+    con como máximo max_workers requests simultáneos.
+
+    Args:
+        notion (Client): Cliente de Notion.
+        root_id (str): ID de la página o bloque raíz.
+        max_workers (int): Límite de requests concurrentes.
+
+    Returns:
+        list: Bloques de primer nivel, con sus subárboles en 'children'.
+    """
+    return list(iter_block_tree(notion, root_id, max_workers))
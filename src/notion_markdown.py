@@ -0,0 +1,286 @@
+"""
+Render de bloques de Notion a Markdown.
+Módulo compartido por los extractores del DoD y del One Pager Guide: cada tipo
+de bloque se resuelve con una tabla de despacho (BLOCK_RENDERERS) y la salida
+se arma agregando partes a una lista en lugar de concatenar strings.
+"""
+
+import logging
+
+
+def extract_rich_text(rich_text_array):
+    """
+    Extrae texto plano de un array de rich_text de Notion.
+
+    Args:
+        rich_text_array (list): Array de objetos rich_text de Notion.
+
+    Returns:
+        str: Texto plano concatenado.
+    """
+    if not rich_text_array:
+        return ""
+    return ''.join([text['plain_text'] for text in rich_text_array])
+
+
+def get_file_url(file_data):
+    """
+    Obtiene la URL de un objeto de archivo de Notion (external o file).
+
+    Args:
+        file_data (dict): Datos del bloque (image, file, pdf, video...).
+
+    Returns:
+        str: URL del archivo o cadena vacía si no tiene.
+    """
+    file_type = file_data.get('type')
+    if file_type in ('external', 'file'):
+        return file_data[file_type].get('url', '')
+    return ''
+
+
+def extract_table_content(table_block):
+    """
+    Extrae el contenido de una tabla de Notion.
+
+    Args:
+        table_block (dict): Bloque de tabla con sus filas en 'children'
+            (ver notion_blocks.fetch_block_tree).
+
+    Returns:
+        str: Contenido de la tabla en formato Markdown.
+    """
+    try:
+        markdown_table = []
+        row_index = 0
+
+        for row_block in table_block.get('children', []):
+            if row_block['type'] != 'table_row':
+                continue
+
+            row_content = [extract_rich_text(cell) for cell in row_block['table_row']['cells']]
+            markdown_table.append("| " + " | ".join(row_content) + " |")
+
+            # Agregar separador después de la primera fila (header)
+            if row_index == 0:
+                markdown_table.append("| " + " | ".join(["---"] * len(row_content)) + " |")
+            row_index += 1
+
+        return "\n".join(markdown_table)
+
+    except Exception as e:
+        logging.error(f"Error al extraer tabla: {str(e)}")
+        return "[Error al extraer tabla]"
+
+
+# ============================================================================
+# RENDERERS POR TIPO DE BLOQUE
+# ============================================================================
+# Cada renderer recibe (block, indent, context) y devuelve el Markdown del
+# bloque sin sus hijos. context['image_handler'] es opcional: recibe
+# (url, caption, block) y devuelve la ruta local de la imagen o None.
+
+def _text(block):
+    """Texto plano del rich_text del bloque."""
+    return extract_rich_text(block[block['type']].get('rich_text', []))
+
+
+def _render_paragraph(block, indent, context):
+    """Párrafo (se omite si está vacío)."""
+    text = _text(block)
+    return f"{indent}{text}\n\n" if text else ""
+
+
+def _heading(level):
+    """Crea el renderer de un heading del nivel indicado."""
+    def render(block, indent, context):
+        return f"{indent}{'#' * level} {_text(block)}\n\n"
+    return render
+
+
+def _prefixed(prefix, suffix="\n"):
+    """Crea un renderer de texto con prefijo (listas, toggles, citas)."""
+    def render(block, indent, context):
+        return f"{indent}{prefix}{_text(block)}{suffix}"
+    return render
+
+
+def _render_to_do(block, indent, context):
+    """To-do como casilla de Markdown."""
+    mark = "x" if block['to_do'].get('checked') else " "
+    return f"{indent}- [{mark}] {_text(block)}\n"
+
+
+def _render_callout(block, indent, context):
+    """Callout con su emoji (💡 por defecto)."""
+    icon = block['callout'].get('icon') or {}
+    emoji = icon.get('emoji', '💡') if icon.get('type') == 'emoji' else '💡'
+    return f"{indent}{emoji} {_text(block)}\n\n"
+
+
+def _render_code(block, indent, context):
+    """Bloque de código con su lenguaje."""
+    language = block['code'].get('language', '')
+    return f"{indent}```{language}\n{_text(block)}\n```\n\n"
+
+
+def _render_divider(block, indent, context):
+    """Separador horizontal."""
+    return f"{indent}---\n\n"
+
+
+def _render_equation(block, indent, context):
+    """Ecuación en notación LaTeX."""
+    return f"{indent}$$ {block['equation'].get('expression', '')} $$\n\n"
+
+
+def _render_table(block, indent, context):
+    """Tabla completa (incluye sus filas)."""
+    return f"{indent}{extract_table_content(block)}\n\n"
+
+
+def _render_image(block, indent, context):
+    """Imagen: descargada con image_handler si existe, o solo su descripción."""
+    image_data = block['image']
+    image_url = get_file_url(image_data)
+    caption = extract_rich_text(image_data.get('caption', []))
+
+    if not image_url:
+        return f"{indent}[Imagen sin URL disponible]\n\n"
+
+    image_handler = context.get('image_handler')
+    local_path = image_handler(image_url, caption, block) if image_handler else None
+    if local_path:
+        return f"{indent}![{caption}]({local_path})\n\n"
+
+    # Sin descarga (o si falla), usar solo la descripción
+    return f"{indent}[Imagen: {caption if caption else 'sin descripción'}]\n\n"
+
+
+def _render_file(block, indent, context):
+    """Archivo adjunto con su nombre y URL."""
+    file_data = block['file']
+    file_name = file_data.get('name', 'archivo')
+    return f"{indent}[📎 {file_name}]({get_file_url(file_data)})\n\n"
+
+
+def _render_media(label):
+    """Crea el renderer de un bloque multimedia (pdf, video, audio) como enlace."""
+    def render(block, indent, context):
+        return f"{indent}[{label}]({get_file_url(block[block['type']])})\n\n"
+    return render
+
+
+def _render_link(block, indent, context):
+    """Bookmark, embed o link preview como enlace."""
+    url = block[block['type']].get('url', '')
+    return f"{indent}[{url}]({url})\n\n" if url else ""
+
+
+def _render_child_page(block, indent, context):
+    """Subpágina (solo el título)."""
+    return f"{indent}📄 {block['child_page'].get('title', '')}\n\n"
+
+
+def _render_child_database(block, indent, context):
+    """Database embebida (solo el título)."""
+    return f"{indent}🗂 {block['child_database'].get('title', '')}\n\n"
+
+
+def _render_container(block, indent, context):
+    """column_list, column y synced_block no tienen contenido propio."""
+    return ""
+
+
+BLOCK_RENDERERS = {
+    'paragraph': _render_paragraph,
+    'heading_1': _heading(1),
+    'heading_2': _heading(2),
+    'heading_3': _heading(3),
+    'bulleted_list_item': _prefixed("- "),
+    'numbered_list_item': _prefixed("1. "),
+    'to_do': _render_to_do,
+    'toggle': _prefixed("- ▸ "),
+    'quote': _prefixed("> ", "\n\n"),
+    'callout': _render_callout,
+    'code': _render_code,
+    'divider': _render_divider,
+    'equation': _render_equation,
+    'table': _render_table,
+    'image': _render_image,
+    'file': _render_file,
+    'pdf': _render_media("📄 PDF"),
+    'video': _render_media("🎬 Video"),
+    'audio': _render_media("🔊 Audio"),
+    'bookmark': _render_link,
+    'embed': _render_link,
+    'link_preview': _render_link,
+    'child_page': _render_child_page,
+    'child_database': _render_child_database,
+    'column_list': _render_container,
+    'column': _render_container,
+    'synced_block': _render_container,
+}
+
+# Bloques cuyos hijos se renderizan al mismo nivel (son solo contenedores)
+TRANSPARENT_BLOCKS = {'column_list', 'column', 'synced_block'}
+
+# Bloques que ya renderizan sus propios hijos
+SELF_RENDERED_BLOCKS = {'table'}
+
+
+def _render_into(parts, block, indent_level, context):
+    """Agrega a parts el Markdown de un bloque y de sus hijos."""
+    block_type = block['type']
+    indent = "  " * indent_level
+    renderer = BLOCK_RENDERERS.get(block_type)
+
+    try:
+        if renderer:
+            parts.append(renderer(block, indent, context))
+
+        if block_type not in SELF_RENDERED_BLOCKS:
+            child_level = indent_level if block_type in TRANSPARENT_BLOCKS else indent_level + 1
+            for child in block.get('children', []):
+                _render_into(parts, child, child_level, context)
+
+    except Exception as e:
+        logging.error(f"Error al procesar bloque tipo {block_type}: {str(e)}")
+        parts.append(f"{indent}[Error al extraer contenido de tipo {block_type}]\n\n")
+
+
+def render_block(block, indent_level=0, image_handler=None):
+    """
+    Convierte un bloque de Notion (con sus hijos en 'children') a Markdown.
+
+    Args:
+        block (dict): Bloque de Notion.
+        indent_level (int): Nivel de indentación para bloques anidados.
+        image_handler (callable): Opcional. Recibe (url, caption, block) y
+            devuelve la ruta local de la imagen o None.
+
+    Returns:
+        str: Contenido del bloque en formato Markdown.
+    """
+    parts = []
+    _render_into(parts, block, indent_level, {'image_handler': image_handler})
+    return "".join(parts)
+
+
+def render_blocks(blocks, indent_level=0, image_handler=None):
+    """
+    Convierte una secuencia de bloques de Notion a Markdown.
+
+    Args:
+        blocks (iterable): Bloques de Notion (puede ser un generador).
+        indent_level (int): Nivel de indentación inicial.
+        image_handler (callable): Ver render_block.
+
+    Returns:
+        str: Contenido en formato Markdown.
+    """
+    parts = []
+    context = {'image_handler': image_handler}
+    for block in blocks:
+        _render_into(parts, block, indent_level, context)
+    return "".join(parts)
@@ -0,0 +1,159 @@
+"""
+Capa de consultas paginadas a databases de Notion.
+Recorre todas las páginas de resultados con start_cursor y empuja los filtros
+de título/estado y filter_properties al servidor de Notion.
+"""
+
+import logging
+from notion_client.helpers import iterate_paginated_api
+
+
+# Notion devuelve como máximo 100 registros por página
+MAX_PAGE_SIZE = 100
+
+# Máximo de condiciones que se agrupan en un filtro compuesto ("or"/"and")
+MAX_COMPOUND_FILTERS = 100
+
+# Esquemas de databases ya consultados (database_id -> properties)
+_schema_cache = {}
+
+
+def get_database_schema(notion, database_id):
+    """
+    Obtiene (y cachea) las properties de una database de Notion.
+
+    Args:
+        notion (Client): Cliente de Notion.
+        database_id (str): ID de la database.
+
+    Returns:
+        dict: nombre de property -> definición (id, type, ...).
+    """
+    if database_id not in _schema_cache:
+        database = notion.databases.retrieve(database_id=database_id)
+        _schema_cache[database_id] = database.get('properties', {})
+        logging.info(f"Esquema de la database cargado: {len(_schema_cache[database_id])} properties")
+    return _schema_cache[database_id]
+
+
+def find_property(schema, predicate):
+    """
+    Busca la primera property del esquema que cumpla una condición.
+
+    Args:
+        schema (dict): Esquema devuelto por get_database_schema.
+        predicate (callable): Función (nombre, definición) -> bool.
+
+    Returns:
+        tuple: (nombre, definición) o (None, None) si no existe.
+    """
+    for prop_name, prop_data in schema.items():
+        if predicate(prop_name, prop_data):
+            return prop_name, prop_data
+    return None, None
+
+
+def build_title_filter(property_name, values):
+    """
+    Construye un filtro "title contains" para uno o varios valores.
+
+    Args:
+        property_name (str): Nombre de la property de tipo title.
+        values (list): Textos a buscar (ej: ["E137", "E140"]).
+
+    Returns:
+        dict: Filtro de Notion o None si no se puede empujar al servidor.
+    """
+    values = list(values)
+    if not property_name or not values or len(values) > MAX_COMPOUND_FILTERS:
+        return None
+
+    conditions = [{"property": property_name, "title": {"contains": value}} for value in values]
+    return conditions[0] if len(conditions) == 1 else {"or": conditions}
+
+
+def build_status_filter(property_name, statuses, property_type="status"):
+    """
+    Construye un filtro "equals" sobre una property de estado.
+
+    Args:
+        property_name (str): Nombre de la property (ej: "Deployment Status").
+        statuses (list): Estados aceptados (ej: ["Regression"]).
+        property_type (str): Tipo de la property: status, select o rich_text.
+
+    Returns:
+        dict: Filtro de Notion o None si no se puede empujar al servidor.
+    """
+    statuses = list(statuses)
+    if (not property_name or not statuses or len(statuses) > MAX_COMPOUND_FILTERS
+            or property_type not in ("status", "select", "rich_text")):
+        return None
+
+    conditions = [{"property": property_name, property_type: {"equals": status}} for status in statuses]
+    return conditions[0] if len(conditions) == 1 else {"or": conditions}
+
+
+def build_edited_since_filter(watermark):
+    """
+    Construye un filtro de timestamp para registros editados desde un watermark.
+
+    Notion redondea last_edited_time al minuto, por eso se usa "on_or_after":
+    los registros del último minuto pueden repetirse, pero nunca se pierden.
+
+    Args:
+        watermark (str): Fecha ISO 8601 (ej: "2025-10-18T20:41:00.000Z").
+
+    Returns:
+        dict: Filtro de Notion o None si no hay watermark.
+    """
+    if not watermark:
+        return None
+    return {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": watermark}}
+
+
+def combine_filters(*filters):
+    """
+    Combina varios filtros con "and", ignorando los que sean None.
+
+    Args:
+        *filters (dict): Filtros de Notion.
+
+    Returns:
+        dict: Filtro combinado o None si no hay ninguno.
+    """
+    active = [f for f in filters if f]
+    if not active:
+        return None
+    return active[0] if len(active) == 1 else {"and": active}
+
+
+def iter_database_pages(notion, database_id, filter=None, sorts=None, filter_properties=None,
+                        page_size=MAX_PAGE_SIZE):
+    """
+    Recorre todos los registros de una database como generador, página por página.
+
+    Args:
+        notion (Client): Cliente de Notion.
+        database_id (str): ID de la database.
+        filter (dict): Filtro de Notion (se evalúa en el servidor).
+        sorts (list): Ordenamiento de Notion.
+        filter_properties (list): IDs de las properties a descargar.
+        page_size (int): Registros por request (máximo 100).
+
+    Yields:
+        dict: Cada registro de la database.
+    """
+    kwargs = {"database_id": database_id, "page_size": min(page_size, MAX_PAGE_SIZE)}
+    if filter:
+        kwargs["filter"] = filter
+    if sorts:
+        kwargs["sorts"] = sorts
+    if filter_properties:
+        kwargs["filter_properties"] = list(filter_properties)
+
+    count = 0
+    for record in iterate_paginated_api(notion.databases.query, **kwargs):
+        count += 1
+        yield record
+
+    logging.info(f"Registros recibidos de la database: {count}")
@@ -0,0 +1,124 @@
+"""
+Estructura del One Pager compartida por la generación y el PDF.
+Define las 8 secciones, el esquema JSON que se le pide a Gemini en modo
+estructurado y las funciones para validarlo y convertirlo a Markdown.
+No depende de Gemini ni de ReportLab.
+"""
+
+import json
+
+
+# Secciones del One Pager en orden: (heading sin "### ", instrucción)
+SECTIONS = [
+    ("1. 🏷 Tipo de comunicación",
+     "Identifica si es un lanzamiento, una mejora o una profundización de funcionalidad existente."),
+    ("2. ✨ Nombre de la funcionalidad",
+     "Nombre claro y directo (ejemplo: \"Gestión de Inconsistencias en Uniones\")"),
+    ("3. 👥 ¿A quién está dirigido?",
+     "Describe el público objetivo (equipos, roles, casos de uso)."),
+    ("4. 🎯 ¿Qué problema resuelve?",
+     "Explica la necesidad o fricción que se resuelve con lenguaje del cliente."),
+    ("5. 💡 Beneficio principal",
+     "El valor más claro y tangible (ahorro de tiempo, automatización, reducción de errores, etc.)."),
+    ("6. ⚙️ ¿En qué consiste la funcionalidad?",
+     "Descripción simple de cómo funciona, con ejemplos si ayuda."),
+    ("7. 🧩 Características clave",
+     "Lista (bullets) de los aspectos más diferenciadores o útiles."),
+    ("8. 🔎 ¿Cómo se usa y dónde se encuentra?",
+     "Pasos para acceder y utilizar la funcionalidad."),
+]
+
+# Esquema de respuesta (subconjunto OpenAPI que acepta response_schema de Gemini)
+ONEPAGER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "number": {"type": "integer"},
+                    "title": {"type": "string"},
+                    "paragraphs": {"type": "array", "items": {"type": "string"}},
+                    "bullets": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["number", "title", "paragraphs", "bullets"],
+            },
+        },
+    },
+    "required": ["sections"],
+}
+
+
+def parse_onepager_json(text):
+    """
+    Valida la respuesta estructurada de Gemini.
+
+    Args:
+        text (str): JSON con la forma de ONEPAGER_SCHEMA.
+
+    Returns:
+        dict: {"sections": [...]} con una entrada por sección, en orden y con
+            el título oficial de cada una.
+
+    Raises:
+        ValueError: Si el JSON es inválido o falta alguna sección.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Respuesta JSON inválida: {str(e)}")
+
+    by_number = {}
+    for section in data.get('sections', []):
+        number = section.get('number')
+        if isinstance(number, int) and 1 <= number <= len(SECTIONS) and number not in by_number:
+            by_number[number] = {
+                "number": number,
+                "title": SECTIONS[number - 1][0],
+                "paragraphs": [p.strip() for p in section.get('paragraphs') or [] if p and p.strip()],
+                "bullets": [b.strip() for b in section.get('bullets') or [] if b and b.strip()],
+            }
+
+    missing = [
+        number for number in range(1, len(SECTIONS) + 1)
+        if number not in by_number or not (by_number[number]['paragraphs'] or by_number[number]['bullets'])
+    ]
+    if missing:
+        raise ValueError(f"Secciones faltantes en el One Pager: {', '.join(map(str, missing))}")
+
+    return {"sections": [by_number[number] for number in range(1, len(SECTIONS) + 1)]}
+
+
+def load_onepager_data(content):
+    """
+    Interpreta un One Pager guardado: estructurado (JSON) o Markdown.
+
+    Args:
+        content (str): Salida de la etapa onepager.
+
+    Returns:
+        dict: Datos estructurados, o None si el contenido es Markdown.
+    """
+    if not content or not content.lstrip().startswith('{'):
+        return None
+    return parse_onepager_json(content)
+
+
+def onepager_to_markdown(data):
+    """
+    Convierte un One Pager estructurado a Markdown (para leerlo o editarlo).
+
+    Args:
+        data (dict): Salida de parse_onepager_json.
+
+    Returns:
+        str: One Pager en Markdown.
+    """
+    blocks = []
+    for section in data['sections']:
+        blocks.append(f"### {section['title']}")
+        blocks.extend(section['paragraphs'])
+        if section['bullets']:
+            blocks.append("\n".join(f"- {bullet}" for bullet in section['bullets']))
+    return "\n\n".join(blocks) + "\n"
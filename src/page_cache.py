@@ -0,0 +1,207 @@
+"""
+Caché en disco del Markdown extraído de páginas de Notion.
+Cada entrada se identifica por el ID de la página y su versión (last_edited_time
+de la página y de sus bloques de primer nivel, ver page_version): si la página no
+cambió, el Markdown se devuelve sin volver a recorrer el árbol de bloques.
+El tamaño total está acotado (se eliminan primero las entradas menos usadas).
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import logging
+import threading
+
+
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", "cache/pages")
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+# Serializa la eviction entre los hilos que guardan páginas a la vez
+_evict_lock = threading.Lock()
+
+
+def _page_dir(page_id):
+    """Directorio de las entradas de una página (IDs con o sin guiones)."""
+    return os.path.join(PAGE_CACHE_DIR, page_id.replace('-', ''))
+
+
+def page_version(last_edited_time, blocks):
+    """
+    Calcula la versión de una página a partir de su last_edited_time y de sus
+    bloques de primer nivel.
+
+    Editar el contenido de un bloque (un toggle, las filas de una tabla) no
+    siempre cambia el last_edited_time de la página, pero sí el del bloque de
+    primer nivel que lo contiene. Un cambio que no llega a ningún bloque de
+    primer nivel (el original de un synced block en otra página) no se detecta:
+    para esos casos está invalidate_page.
+
+    Args:
+        last_edited_time (str): last_edited_time devuelto por pages.retrieve.
+        blocks (list): Bloques de primer nivel de la página (sin sus hijos).
+
+    Returns:
+        str: Versión de la página, o None si no se conoce su last_edited_time.
+    """
+    if not last_edited_time:
+        return None
+
+    fingerprint = hashlib.sha256()
+    for block in blocks:
+        fingerprint.update(f"{block['id']}:{block.get('last_edited_time')}\n".encode('utf-8'))
+    return f"{last_edited_time}:{fingerprint.hexdigest()[:16]}"
+
+
+def cache_key(page_id, version):
+    """
+    Calcula la clave de una versión de la página.
+
+    Args:
+        page_id (str): ID de la página de Notion.
+        version (str): Versión de la página (ver page_version).
+
+    Returns:
+        str: Hash SHA-256 hexadecimal.
+    """
+    raw = f"{page_id.replace('-', '')}:{version}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _entry_path(page_id, version):
+    """Ruta del archivo de una versión de la página."""
+    return os.path.join(_page_dir(page_id), f"{cache_key(page_id, version)}.md")
+
+
+def get_cached_page(page_id, version):
+    """
+    Devuelve el Markdown cacheado de una página si no cambió desde que se guardó.
+
+    Args:
+        page_id (str): ID de la página de Notion.
+        version (str): Versión actual de la página (ver page_version).
+
+    Returns:
+        str: Markdown cacheado, o None si no hay entrada para esa versión.
+    """
+    if not version:
+        return None
+
+    path = _entry_path(page_id, version)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+
+    # Actualizar la fecha de acceso para la eviction LRU (puede haberse eliminado recién)
+    try:
+        os.utime(path, None)
+    except FileNotFoundError:
+        pass
+    logging.info(f"Caché de página: HIT {page_id} ({version})")
+    return content
+
+
+def store_page(page_id, version, content):
+    """
+    Guarda el Markdown de una versión de la página y descarta sus versiones anteriores.
+    Solo se debe llamar con el render de un árbol descargado sin errores.
+
+    Args:
+        page_id (str): ID de la página de Notion.
+        version (str): Versión extraída (ver page_version).
+        content (str): Markdown renderizado.
+    """
+    if not version:
+        return
+
+    invalidate_page(page_id)
+    os.makedirs(_page_dir(page_id), exist_ok=True)
+
+    path = _entry_path(page_id, version)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+    logging.info(f"Caché de página: guardada {page_id} ({len(content)} caracteres)")
+    evict(PAGE_CACHE_MAX_BYTES)
+
+
+def invalidate_page(page_id):
+    """
+    Elimina todas las entradas cacheadas de una página.
+
+    Args:
+        page_id (str): ID de la página de Notion.
+
+    Returns:
+        bool: True si había entradas para esa página.
+    """
+    directory = _page_dir(page_id)
+    if not os.path.isdir(directory):
+        return False
+    shutil.rmtree(directory, ignore_errors=True)
+    logging.info(f"Caché de página invalidada: {page_id}")
+    return True
+
+
+def evict(max_bytes=PAGE_CACHE_MAX_BYTES):
+    """
+    Elimina las entradas menos usadas hasta que el caché quepa en max_bytes.
+
+    Args:
+        max_bytes (int): Tamaño máximo total del caché en bytes.
+
+    Returns:
+        int: Cantidad de entradas eliminadas.
+    """
+    if not os.path.isdir(PAGE_CACHE_DIR):
+        return 0
+
+    with _evict_lock:
+        entries = []
+        for root, _, files in os.walk(PAGE_CACHE_DIR):
+            for name in files:
+                # Las .tmp son escrituras en curso de otro hilo
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # Ya eliminada (invalidada, o eviction de otro proceso)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        # Las de acceso más antiguo primero
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    if removed:
+        logging.info(f"Caché de página: {removed} entradas eliminadas por tamaño")
+    return removed
+
+
+if __name__ == "__main__":
+    """Invalida el caché de una página: python page_cache.py <page_id>"""
+
+    if len(sys.argv) != 2:
+        print("Uso: python page_cache.py <page_id>")
+        exit(1)
+
+    if invalidate_page(sys.argv[1]):
+        print(f"Caché invalidado para {sys.argv[1]}")
+    else:
+        print(f"No había entradas en caché para {sys.argv[1]}")
@@ -0,0 +1,1100 @@
+"""
+Flujo automatizado end-to-end, ejecutado por main.py.
+Integra los 5 pasos completos: monitoreo → extracción → procesamiento → PDF → actualización.
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Importar todos los módulos del flujo
+from tracker import (
+    poll_release_tracker, commit_watermark, WATCHED_FUNCTIONALITIES, TARGET_STATUSES, RELEASE_TRACKER_DB_IDS
+)
+from extraer_dod import extract_dod_content, save_dod_to_file
+from extraer_onepager_guide import extract_onepager_guide, save_to_file as save_guide_to_file
+from generar_onepager_gemini import (
+    configure_gemini, build_request, generate_onepager, generate_onepager_async, generate_onepager_by_sections,
+    generate_onepager_json, save_onepager, stream_onepager, iter_sections
+)
+from generar_pdf import save_pdf
+from dod_images import extract_image_refs
+from subir_github import upload_enabled, upload_pdf, pdf_repo_path, is_pdf_url, resolve_pdf_url
+from actualizarnotion import update_release_tracker, append_pdf_to_page, DATA_NORMALIZATION_PAGE_ID
+from notion_api import notion_stage, log_request_counts, reset_request_counts
+from batch import run_in, run_batch, pools_active
+from render_service import render_pdf, render_pdf_async, render_pdf_from_sections
+from compactar_dod import compact_for_prompt, reset_compaction_totals, log_compaction_totals
+from gemini_scheduler import reset_scheduler_metrics, log_scheduler_metrics
+from state_store import (
+    load_last_statuses, save_last_statuses, register_transition, get_pending_transitions,
+    get_stage, complete_stage, find_stage_output, set_content_hash, complete_transition,
+    content_hash
+)
+
+
+
+os.makedirs("logs", exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('logs/main_automation.log'),
+        logging.StreamHandler()
+    ]
+)
+
+
+
+load_dotenv()
+
+TARGET_FUNCTIONALITY = "E137"
+TARGET_STATUS = "Regression"
+DEFAULT_SUBTITLE = "E137 - Data Normalization in Unions"
+
+# --force-regenerate: ignorar cachés de Gemini y One Pagers previos
+FORCE_REGENERATE = "--force-regenerate" in sys.argv
+
+# --stream (o ONEPAGER_STREAMING=1): el PDF se arma mientras Gemini genera el One Pager
+STREAMING = "--stream" in sys.argv or os.getenv("ONEPAGER_STREAMING", "").lower() in ("1", "true", "yes")
+
+# --batch (o BATCH_MODE=1): procesar las transiciones pendientes en paralelo (ver batch.py)
+BATCH_MODE = "--batch" in sys.argv or os.getenv("BATCH_MODE", "").lower() in ("1", "true", "yes")
+
+# --by-section (o GEMINI_SECTION_MODE=1): un prompt por sección del One Pager, en paralelo
+SECTION_MODE = "--by-section" in sys.argv or os.getenv("GEMINI_SECTION_MODE", "").lower() in ("1", "true", "yes")
+
+# --json (o GEMINI_JSON_MODE=1): respuesta estructurada por sección; el PDF no re-parsea Markdown
+JSON_MODE = "--json" in sys.argv or os.getenv("GEMINI_JSON_MODE", "").lower() in ("1", "true", "yes")
+
+# Pipelines en curso a la vez en el orquestador async (--async)
+ASYNC_MAX_PIPELINES = int(os.getenv("ASYNC_MAX_PIPELINES", 10))
+
+# PDF_LOCAL_COPY=0: con GITHUB_TOKEN el PDF se sube desde memoria sin escribirse en disco
+PDF_LOCAL_COPY = os.getenv("PDF_LOCAL_COPY", "1").lower() not in ("0", "false", "no")
+
+# Caracteres del hash del One Pager que identifican la versión del PDF
+PDF_VERSION_LENGTH = 12
+
+
+def extract_page_id_from_url(notion_url):
+    """
+    Extrae el ID de la página de una URL de Notion.
+    
+    Args:
+        notion_url (str): URL completa de Notion.
+        
+    Returns:
+        str: ID de la página o None si no se puede extraer.
+    """
+    try:
+        import re
+        
+        # Patrón para extraer ID de página de Notion
+        # Ejemplo: https://www.notion.so/...-28c98e9d3db980d6bbdec4ff92912fd1?source=copy_link
+        pattern = r'([a-f0-9]{32})'
+        match = re.search(pattern, notion_url)
+        
+        if match:
+            page_id = match.group(1)
+            logging.info(f"ID extraído de URL: {page_id}")
+            return page_id
+        else:
+            logging.error(f"No se pudo extraer ID de la URL: {notion_url}")
+            return None
+            
+    except Exception as e:
+        logging.error(f"Error al extraer ID de URL: {str(e)}")
+        return None
+
+
+
+
+def step_1_monitor_release_tracker(last_statuses=None, incremental=False, database_id=None):
+    """
+    Paso 1: Monitorear Release Tracker y detectar funcionalidades que entran a un estado objetivo.
+    
+    Args:
+        last_statuses (dict): page_id -> último estado conocido. Se actualiza in-place.
+        incremental (bool): Consultar solo registros editados desde el último watermark.
+        database_id (str): Database a consultar (default: NOTION_RELEASE_TRACKER_DB_ID).
+        
+    Returns:
+        list: Eventos de transición con Link Definition (lista vacía si no hay cambios),
+            o None si la consulta falló y no se debe persistir el estado visto.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("PASO 1: MONITOREO DEL RELEASE TRACKER")
+        logging.info("="*80)
+        
+        # Una sola consulta evalúa todas las funcionalidades vigiladas
+        events = poll_release_tracker(
+            last_statuses=last_statuses, incremental=incremental, database_id=database_id
+        )
+        
+        if events is None:
+            return None
+        
+        if not events:
+            logging.info(f"Ninguna funcionalidad entró a {', '.join(TARGET_STATUSES)}. Continuando monitoreo...")
+            return []
+        
+        ready_events = []
+        for event in events:
+            logging.info(f"¡CAMBIO DETECTADO! {event['feature']} - Estado = {event['status']}")
+            
+            if event['link_definition']:
+                logging.info(f"Link Definition obtenido: {event['link_definition']}")
+                ready_events.append(event)
+            else:
+                logging.error(f"No se pudo obtener el Link Definition de {event['feature']}")
+                # Olvidar el estado para volver a detectarlo cuando se agregue el link
+                if last_statuses is not None:
+                    last_statuses.pop(event['page_id'], None)
+        
+        return ready_events
+            
+    except Exception as e:
+        logging.error(f"Error en Paso 1: {str(e)}")
+        return None
+
+
+def get_dod_page_id(event):
+    """
+    Resuelve el ID de la página del DoD para un evento.
+    
+    Orden de prioridad:
+    1. NOTION_DOD_PAGE_ID_<FEATURE> (ej: NOTION_DOD_PAGE_ID_E140)
+    2. NOTION_DOD_PAGE_ID, solo para la funcionalidad original (E137, página duplicada)
+    3. ID extraído del Link Definition
+    
+    Args:
+        event (dict): Evento de transición del tracker.
+        
+    Returns:
+        str: ID de la página o None si no se puede resolver.
+    """
+    page_id = os.getenv(f"NOTION_DOD_PAGE_ID_{event['feature']}")
+    
+    if not page_id and event['feature'] == TARGET_FUNCTIONALITY:
+        page_id = os.getenv("NOTION_DOD_PAGE_ID")
+    
+    if not page_id:
+        page_id = extract_page_id_from_url(event['link_definition'])
+    
+    return page_id
+
+
+def step_2_extract_dod_content(event, output_path="output/dod_content.md"):
+    """
+    Paso 2: Extraer contenido del Definition of Done.
+    
+    Args:
+        event (dict): Evento de transición del tracker.
+        output_path (str): Ruta donde guardar el Markdown extraído.
+        
+    Returns:
+        str: Contenido extraído en Markdown o None si falla.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("PASO 2: EXTRACCIÓN DEL DEFINITION OF DONE")
+        logging.info("="*80)
+        
+        page_id = get_dod_page_id(event)
+        if not page_id:
+            logging.error(f"No se pudo resolver la página del DoD de {event['feature']}")
+            return None
+        
+        logging.info(f"Usando ID de página del DoD: {page_id}")
+        
+        # Extraer contenido del DoD
+        dod_content = run_in('notion', extract_dod_content, page_id)
+        
+        if dod_content:
+            # Guardar en archivo
+            save_dod_to_file(dod_content, output_path)
+            logging.info("Contenido del DoD extraído y guardado exitosamente")
+            return dod_content
+        else:
+            logging.error("No se pudo extraer el contenido del DoD")
+            return None
+            
+    except Exception as e:
+        logging.error(f"Error en Paso 2: {str(e)}")
+        return None
+
+
+def load_onepager_guide(guide_path="output/onepager_guide.md"):
+    """
+    Obtiene el One Pager Guide.
+    
+    Si NOTION_ONEPAGER_GUIDE_ID está configurado, se lee desde Notion a través del
+    caché de páginas (si la guía no cambió, solo se consultan la página y su primer
+    nivel de bloques). Si no, o si Notion falla, se usa el archivo local.
+    
+    Args:
+        guide_path (str): Ruta del archivo local de la guía.
+        
+    Returns:
+        str: Contenido de la guía en Markdown.
+    """
+    from generar_onepager_gemini import read_file_content
+    
+    guide_page_id = os.getenv("NOTION_ONEPAGER_GUIDE_ID")
+    if guide_page_id:
+        try:
+            guide_content = extract_onepager_guide(guide_page_id)
+            save_guide_to_file(guide_content, guide_path)
+            return guide_content
+        except Exception as e:
+            logging.warning(f"No se pudo leer la guía desde Notion, usando {guide_path}: {str(e)}")
+    
+    return read_file_content(guide_path)
+
+
+def step_3_generate_one_pager(dod_content, guide_content=None, output_path="output/onepager_generado.md"):
+    """
+    Paso 3: Generar One Pager con Gemini API.
+    
+    Args:
+        dod_content (str): Contenido del Definition of Done.
+        guide_content (str): Guía ya cargada (opcional; si no, se lee con load_onepager_guide).
+        output_path (str): Ruta donde guardar el One Pager.
+        
+    Returns:
+        str: One Pager generado en Markdown o None si falla.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("PASO 3: GENERACIÓN DEL ONE PAGER CON GEMINI")
+        logging.info("="*80)
+        
+        # Paso 1: Modelo de Gemini (configurado una sola vez por proceso)
+        model = configure_gemini()
+        
+        # Compactar el DoD antes de armar el prompt (imágenes, duplicados, tablas, presupuesto)
+        dod_content = compact_for_prompt(dod_content, model)
+        
+        # Paso 2: Leer guía del One Pager (cacheada por versión de la página)
+        guide_content = guide_content or load_onepager_guide()
+        
+        if JSON_MODE:
+            # Paso 3-4: Respuesta JSON con el esquema de las 8 secciones
+            onepager_content = run_in(
+                'gemini', generate_onepager_json,
+                model, dod_content, guide_content, use_cache=not FORCE_REGENERATE
+            )
+        elif SECTION_MODE:
+            # Paso 3-4: Un prompt por sección en paralelo (solo se reintentan las fallidas)
+            onepager_content = run_in(
+                'gemini', generate_onepager_by_sections,
+                model, dod_content, guide_content, use_cache=not FORCE_REGENERATE
+            )
+        else:
+            # Paso 3: Construir prompt (solo el DoD si el prefijo está en el caché de contexto)
+            prompt, context = build_request(dod_content, guide_content)
+            
+            # Paso 4: Generar One Pager con Gemini (cacheado por modelo + config + prompt)
+            onepager_content = run_in(
+                'gemini', generate_onepager, model, prompt, use_cache=not FORCE_REGENERATE, context=context
+            )
+        
+        if onepager_content:
+            # Guardar en archivo
+            save_onepager(onepager_content, output_path)
+            logging.info("One Pager generado y guardado exitosamente")
+            return onepager_content
+        else:
+            logging.error("No se pudo generar el One Pager")
+            return None
+            
+    except Exception as e:
+        logging.error(f"Error en Paso 3: {str(e)}")
+        return None
+
+
+def pdf_version(onepager_content):
+    """
+    Versión del PDF: prefijo del hash del One Pager del que se genera.
+    
+    Args:
+        onepager_content (str): Contenido del One Pager.
+        
+    Returns:
+        str: Identificador de la versión.
+    """
+    return content_hash(onepager_content)[:PDF_VERSION_LENGTH]
+
+
+def publish_pdf(pdf_bytes, feature, version, output_dir="output"):
+    """
+    Publica un PDF generado en memoria. Con GITHUB_TOKEN se sube directo al
+    repositorio; la copia en disco es opcional (PDF_LOCAL_COPY) salvo que no
+    haya subida directa. Las rutas son únicas por funcionalidad y versión, así
+    ejecuciones concurrentes no se pisan.
+    
+    Args:
+        pdf_bytes (bytes): Contenido del PDF.
+        feature (str): Funcionalidad (ej: E137).
+        version (str): Versión del One Pager (ver pdf_version).
+        output_dir (str): Directorio de la copia local.
+        
+    Returns:
+        str: URL del PDF subido, o ruta local (relativa a src/) si no hay subida directa.
+    """
+    local_path = None
+    if PDF_LOCAL_COPY or not upload_enabled():
+        local_path = save_pdf(pdf_bytes, os.path.join(output_dir, f"{feature}_OnePager_{version}.pdf"))
+    
+    if upload_enabled():
+        return upload_pdf(pdf_bytes, pdf_repo_path(feature, version))
+    return local_path
+
+
+def pdf_available(pdf_location):
+    """
+    Valida la salida guardada del paso de PDF antes de reutilizarla.
+    
+    Args:
+        pdf_location (str): URL del PDF subido o ruta local.
+        
+    Returns:
+        bool: True si el PDF está subido o el archivo local sigue existiendo.
+    """
+    return is_pdf_url(pdf_location) or os.path.exists(pdf_location)
+
+
+def step_4_generate_pdf(onepager_content, subtitle=DEFAULT_SUBTITLE, feature=TARGET_FUNCTIONALITY,
+                        output_dir="output", images=None):
+    """
+    Paso 4: Generar PDF del One Pager y publicarlo.
+    
+    Args:
+        onepager_content (str): Contenido del One Pager en Markdown.
+        subtitle (str): Subtítulo del PDF (título del registro en el tracker).
+        feature (str): Funcionalidad documentada.
+        output_dir (str): Directorio de la copia local del PDF.
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
+        
+    Returns:
+        str: URL o ruta local del PDF (ver publish_pdf), o None si falla.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("PASO 4: GENERACIÓN DEL PDF")
+        logging.info("="*80)
+        
+        # Generar PDF en memoria en el servicio de render (procesos con estilos y fuentes ya cargados)
+        pdf_bytes = render_pdf(onepager_content, None, subtitle, images)
+        
+        if pdf_bytes:
+            pdf_location = publish_pdf(pdf_bytes, feature, pdf_version(onepager_content), output_dir)
+            logging.info(f"PDF generado exitosamente: {pdf_location}")
+            logging.info(f"Tamaño del archivo: {len(pdf_bytes) / 1024:.2f} KB")
+            return pdf_location
+        else:
+            logging.error("No se pudo generar el PDF")
+            return None
+            
+    except Exception as e:
+        logging.error(f"Error en Paso 4: {str(e)}")
+        return None
+
+
+def step_3_4_stream_one_pager_to_pdf(dod_content, subtitle=DEFAULT_SUBTITLE, feature=TARGET_FUNCTIONALITY,
+                                     output_dir="output", images=None):
+    """
+    Pasos 3 y 4 en modo streaming: cada sección del One Pager se convierte a
+    elementos del PDF apenas Gemini termina de generarla.
+    
+    Args:
+        dod_content (str): Contenido del Definition of Done.
+        subtitle (str): Subtítulo del PDF (título del registro en el tracker).
+        feature (str): Funcionalidad documentada.
+        output_dir (str): Directorio de la copia local del PDF.
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
+        
+    Returns:
+        tuple: (One Pager en Markdown, URL o ruta local del PDF), o (None, None) si falla.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("PASOS 3-4: GENERACIÓN DEL ONE PAGER Y DEL PDF EN STREAMING")
+        logging.info("="*80)
+        
+        model = configure_gemini()
+        guide_content = load_onepager_guide()
+        prompt, context = build_request(compact_for_prompt(dod_content, model), guide_content)
+        
+        # Guardar el texto recibido mientras las secciones pasan al PDF
+        received = []
+        
+        def collect(chunks):
+            for chunk in chunks:
+                received.append(chunk)
+                yield chunk
+        
+        sections = iter_sections(collect(stream_onepager(model, prompt, use_cache=not FORCE_REGENERATE, context=context)))
+        # Las secciones pasan a un worker del servicio de render a medida que llegan
+        pdf_bytes = render_pdf_from_sections(sections, subtitle, images)
+        
+        onepager_content = "".join(received)
+        if not onepager_content or not pdf_bytes:
+            logging.error("No se pudo generar el One Pager en streaming")
+            return None, None
+        
+        save_onepager(onepager_content, os.path.join(output_dir, "onepager_generado.md"))
+        # La versión se conoce recién con el One Pager completo
+        pdf_path = publish_pdf(pdf_bytes, feature, pdf_version(onepager_content), output_dir)
+        logging.info(f"One Pager y PDF generados en streaming: {pdf_path}")
+        return onepager_content, pdf_path
+        
+    except Exception as e:
+        logging.error(f"Error en Pasos 3-4 (streaming): {str(e)}")
+        return None, None
+
+
+def step_5_update_notion(event, pdf_path="output/E137_OnePager.pdf"):
+    """
+    Paso 5: Actualizar Notion con el PDF.
+    
+    El Release Tracker y la página Data Normalization se actualizan en etapas
+    separadas ('notion_tracker' y 'notion_page'): si una falla, el reinicio
+    retoma solo esa y nunca vuelve a agregar el bloque del PDF a la página.
+    
+    Args:
+        event (dict): Evento de transición (page_id es el registro del Release Tracker).
+        pdf_path (str): URL del PDF subido o ruta local del PDF (relativa a src/).
+        
+    Returns:
+        bool: True si la actualización fue exitosa.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("PASO 5: ACTUALIZACIÓN EN NOTION")
+        logging.info("="*80)
+        
+        # URL del PDF en GitHub (la de la subida, o la del archivo que se commitea a mano)
+        pdf_url = resolve_pdf_url(pdf_path)
+        
+        if not pdf_url:
+            logging.error("No se pudo generar la URL del PDF")
+            return False
+        
+        logging.info(f"URL del PDF generada: {pdf_url}")
+        
+        success = run_stage(
+            event, 'notion_tracker',
+            lambda: run_in('notion', update_release_tracker, event['page_id'], pdf_url)
+        ) and run_stage(
+            event, 'notion_page',
+            lambda: run_in(
+                'notion', append_pdf_to_page,
+                DATA_NORMALIZATION_PAGE_ID, pdf_url, os.path.basename(pdf_path)
+            )
+        )
+        
+        if success:
+            logging.info("Notion actualizado exitosamente")
+            return True
+        else:
+            logging.error("Error al actualizar Notion")
+            return False
+            
+    except Exception as e:
+        logging.error(f"Error en Paso 5: {str(e)}")
+        return False
+
+
+def run_stage(event, stage, func, input_hash=None, is_valid=None):
+    """
+    Ejecuta una etapa del pipeline salvo que ya esté completada para la transición.
+    
+    Args:
+        event (dict): Evento de transición (con transition_id si viene del state store).
+        stage (str): Nombre de la etapa (ver state_store.STAGES).
+        func (callable): Función sin argumentos que ejecuta la etapa.
+        input_hash (str): Hash de la entrada de la etapa (opcional).
+        is_valid (callable): Valida una salida guardada antes de reutilizarla (opcional).
+        
+    Returns:
+        Salida de la etapa (guardada o recién calculada), o None si falla.
+    """
+    transition_id = event.get('transition_id')
+    
+    if transition_id:
+        done = get_stage(transition_id, stage)
+        if done and (is_valid is None or is_valid(done['output'])):
+            logging.info(f"[{event['feature']}] Etapa '{stage}' ya completada. Reutilizando resultado.")
+            return done['output']
+    
+    # Los requests a Notion de la etapa se cuentan bajo su nombre
+    with notion_stage(stage):
+        output = func()
+    
+    if output and transition_id:
+        complete_stage(transition_id, stage, output, input_hash)
+    
+    return output
+
+
+def run_feature_flow(event, output_dir="output", guide_content=None):
+    """
+    Ejecuta los pasos 2 a 5 para un evento de transición.
+    Las etapas ya completadas (según el state store) no se repiten.
+    
+    Args:
+        event (dict): Evento de transición del tracker o transición pendiente del state store.
+        output_dir (str): Directorio de los archivos generados (uno por funcionalidad en un lote).
+        guide_content (str): Guía del One Pager ya cargada (opcional).
+        
+    Returns:
+        bool: True si todos los pasos se ejecutaron exitosamente.
+    """
+    feature = event['feature']
+    
+    logging.info("="*80)
+    logging.info(f"PROCESANDO {feature}: {event['title']}")
+    logging.info("="*80)
+    
+    # PASO 2: Extracción del DoD
+    dod_content = run_stage(
+        event, 'extract',
+        lambda: step_2_extract_dod_content(event, os.path.join(output_dir, "dod_content.md"))
+    )
+    
+    if not dod_content:
+        logging.error(f"[{feature}] Fallo en extracción del DoD. Flujo detenido.")
+        return False
+    
+    dod_hash = content_hash(dod_content)
+    set_content_hash(event['page_id'], dod_hash)
+    images = extract_image_refs(dod_content)
+    
+    transition_id = event.get('transition_id')
+    subtitle = event['title'] or DEFAULT_SUBTITLE
+    
+    # PASOS 3-4 en streaming: solo si el One Pager todavía no se generó para esta transición
+    # ni se puede reutilizar de otra con el mismo DoD (en un lote cada etapa va a su pool)
+    streamed_onepager, streamed_pdf = None, None
+    if (STREAMING and not (SECTION_MODE or JSON_MODE) and not pools_active() and not (transition_id and get_stage(transition_id, 'onepager'))
+            and (FORCE_REGENERATE or not find_stage_output(event['page_id'], 'onepager', dod_hash))):
+        with notion_stage('onepager'):
+            streamed_onepager, streamed_pdf = step_3_4_stream_one_pager_to_pdf(
+                dod_content, subtitle, feature, output_dir, images
+            )
+    
+    # PASO 3: Generación del One Pager (se reutiliza si el DoD no cambió desde otra transición)
+    def generate():
+        if streamed_onepager:
+            return streamed_onepager
+        previous = None if FORCE_REGENERATE else find_stage_output(event['page_id'], 'onepager', dod_hash)
+        if previous:
+            logging.info(f"[{feature}] DoD sin cambios: reutilizando One Pager anterior")
+            return previous
+        return step_3_generate_one_pager(
+            dod_content, guide_content, os.path.join(output_dir, "onepager_generado.md")
+        )
+    
+    onepager_content = run_stage(event, 'onepager', generate, input_hash=dod_hash)
+    
+    if not onepager_content:
+        logging.error(f"[{feature}] Fallo en generación del One Pager. Flujo detenido.")
+        return False
+    
+    # PASO 4: Generación del PDF
+    pdf_path = run_stage(
+        event, 'pdf',
+        lambda: streamed_pdf or step_4_generate_pdf(onepager_content, subtitle, feature, output_dir, images),
+        input_hash=content_hash(onepager_content),
+        is_valid=pdf_available
+    )
+    
+    if not pdf_path:
+        logging.error(f"[{feature}] Fallo en generación del PDF. Flujo detenido.")
+        return False
+    
+    # PASO 5: Actualización en Notion (cada escritura es una etapa: nunca se duplican bloques)
+    success = step_5_update_notion(event, pdf_path)
+    
+    if not success:
+        logging.error(f"[{feature}] Fallo en actualización de Notion. Flujo detenido.")
+        return False
+    
+    if event.get('transition_id'):
+        complete_transition(event['transition_id'])
+    
+    logging.info(f"[{feature}] PDF generado: {pdf_path}")
+    return True
+
+
+def run_complete_flow(incremental=False):
+    """
+    Ejecuta el flujo completo end-to-end para cada transición pendiente.
+    
+    Los estados vistos y las transiciones detectadas se guardan en el state store,
+    así una transición nunca se procesa dos veces y las que fallaron se retoman
+    en la siguiente ejecución desde la etapa donde quedaron.
+    
+    Args:
+        incremental (bool): Consultar solo registros editados desde el último watermark.
+        
+    Returns:
+        bool: True si había al menos una transición pendiente y todas se completaron.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("INICIANDO FLUJO AUTOMATIZADO COMPLETO")
+        logging.info("="*80)
+        logging.info(f"Timestamp: {datetime.now()}")
+        logging.info(f"Objetivo: Detectar {', '.join(WATCHED_FUNCTIONALITIES)} en estado {', '.join(TARGET_STATUSES)}")
+        logging.info("="*80)
+        
+        reset_request_counts()
+        reset_compaction_totals()
+        reset_scheduler_metrics()
+        
+        # PASO 1: Monitoreo (una sola consulta para todas las funcionalidades)
+        last_statuses = load_last_statuses()
+        with notion_stage("tracker"):
+            events = step_1_monitor_release_tracker(last_statuses, incremental)
+        
+        # Un poll fallido no guarda estados ni avanza el watermark: las transiciones
+        # que alcanzó a ver se vuelven a detectar en la siguiente ejecución
+        if events is not None:
+            save_last_statuses(last_statuses)
+            
+            for event in events:
+                register_transition(event)
+            
+            # Las transiciones ya están persistidas: el watermark puede avanzar
+            if incremental:
+                commit_watermark()
+        
+        pending = get_pending_transitions()
+        
+        if not pending:
+            log_request_counts()
+            logging.info("No hay transiciones pendientes. Flujo detenido.")
+            return False
+        
+        logging.info(f"Transiciones pendientes: {len(pending)}")
+        
+        # PASOS 2-5 por cada transición pendiente
+        if BATCH_MODE and len(pending) > 1:
+            # La guía se lee una sola vez para todo el lote
+            with notion_stage("onepager"):
+                guide_content = load_onepager_guide()
+            results = run_batch(
+                pending,
+                lambda event: run_feature_flow(
+                    event, os.path.join("output", event['feature']), guide_content
+                )
+            )
+        else:
+            results = {event['transition_id']: run_feature_flow(event) for event in pending}
+        log_request_counts()
+        log_compaction_totals()
+        log_scheduler_metrics()
+        
+        if not all(results.values()):
+            failed = [event['feature'] for event in pending if not results[event['transition_id']]]
+            logging.error(f"Flujo fallido para: {', '.join(failed)} (se reintentará en la próxima ejecución)")
+            return False
+        
+        # ÉXITO COMPLETO
+        logging.info("\n" + "="*80)
+        logging.info("🎉 FLUJO COMPLETO EJECUTADO EXITOSAMENTE")
+        logging.info("="*80)
+        logging.info("Todos los pasos completados:")
+        logging.info("✅ Paso 1: Monitoreo del Release Tracker")
+        logging.info("✅ Paso 2: Extracción del Definition of Done")
+        logging.info("✅ Paso 3: Generación del One Pager con Gemini")
+        logging.info("✅ Paso 4: Generación del PDF")
+        logging.info("✅ Paso 5: Actualización en Notion")
+        logging.info("="*80)
+        logging.info(f"Funcionalidades procesadas: {', '.join(event['feature'] for event in pending)}")
+        logging.info("Release Tracker y Data Normalization actualizados")
+        logging.info("="*80)
+        
+        return True
+        
+    except Exception as e:
+        logging.error(f"Error crítico en el flujo completo: {str(e)}")
+        return False
+
+
+def run_monitoring_mode():
+    """
+    Ejecuta el flujo en modo monitoreo continuo (polling).
+    """
+    logging.info("="*80)
+    logging.info("INICIANDO MODO MONITOREO CONTINUO")
+    logging.info("="*80)
+    logging.info("Presiona Ctrl+C para detener el monitoreo")
+    logging.info("="*80)
+    
+    check_count = 0
+    interval = int(os.getenv("POLLING_INTERVAL", 300))
+    
+    try:
+        while True:
+            check_count += 1
+            logging.info(f"\n--- Verificación #{check_count} - {datetime.now()} ---")
+            
+            # El state store evita reprocesar transiciones: el monitoreo sigue indefinidamente
+            success = run_complete_flow(incremental=True)
+            
+            if success:
+                logging.info("Transiciones pendientes procesadas. Continuando monitoreo.")
+            
+            # Esperar antes de la próxima verificación
+            logging.info(f"Próxima verificación en {interval} segundos...")
+            time.sleep(interval)
+                
+    except KeyboardInterrupt:
+        logging.info("\n" + "="*80)
+        logging.info("MONITOREO DETENIDO POR EL USUARIO")
+        logging.info("="*80)
+        logging.info(f"Total de verificaciones realizadas: {check_count}")
+    except Exception as e:
+        logging.error(f"Error en modo monitoreo: {str(e)}")
+
+
+# ============================================================================
+# ORQUESTADOR ASYNC
+# ============================================================================
+# Las llamadas a Notion van a hilos con asyncio.to_thread (el cliente compartido
+# mantiene el límite de tasa y el conteo por etapa), Gemini usa su API async y el
+# render de PDFs va a un pool de procesos. Cada transición es una corrutina:
+# varias databases y varios pipelines comparten un único event loop.
+
+async def load_onepager_guide_async():
+    """
+    Lee el One Pager Guide sin bloquear el event loop.
+    
+    Returns:
+        str: Contenido de la guía en Markdown.
+    """
+    with notion_stage("onepager"):
+        return await asyncio.to_thread(load_onepager_guide)
+
+
+async def run_stage_async(event, stage, func, input_hash=None, is_valid=None):
+    """
+    Versión async de run_stage: func es una corrutina sin argumentos.
+    
+    Returns:
+        Salida de la etapa (guardada o recién calculada), o None si falla.
+    """
+    transition_id = event.get('transition_id')
+    
+    if transition_id:
+        done = get_stage(transition_id, stage)
+        if done and (is_valid is None or is_valid(done['output'])):
+            logging.info(f"[{event['feature']}] Etapa '{stage}' ya completada. Reutilizando resultado.")
+            return done['output']
+    
+    with notion_stage(stage):
+        output = await func()
+    
+    if output and transition_id:
+        complete_stage(transition_id, stage, output, input_hash)
+    
+    return output
+
+
+async def run_feature_flow_async(event, guide_task):
+    """
+    Ejecuta los pasos 2 a 5 de una transición en el event loop.
+    
+    La guía (guide_task, compartida entre pipelines) se descarga mientras se
+    extrae el DoD, y al final el Release Tracker y la página Data Normalization
+    se actualizan a la vez. Los archivos se generan en output/<funcionalidad>/.
+    
+    Args:
+        event (dict): Transición pendiente del state store.
+        guide_task (asyncio.Task): Tarea que devuelve el One Pager Guide.
+        
+    Returns:
+        bool: True si todos los pasos se ejecutaron exitosamente.
+    """
+    feature = event['feature']
+    output_dir = os.path.join("output", feature)
+    subtitle = event['title'] or DEFAULT_SUBTITLE
+    
+    try:
+        logging.info(f"[{feature}] Iniciando pipeline async: {event['title']}")
+        
+        # PASO 2: Extracción del DoD
+        dod_content = await run_stage_async(
+            event, 'extract',
+            lambda: asyncio.to_thread(step_2_extract_dod_content, event, os.path.join(output_dir, "dod_content.md"))
+        )
+        if not dod_content:
+            logging.error(f"[{feature}] Fallo en extracción del DoD. Flujo detenido.")
+            return False
+        
+        dod_hash = content_hash(dod_content)
+        set_content_hash(event['page_id'], dod_hash)
+        
+        # PASO 3: Generación del One Pager
+        async def generate():
+            previous = None if FORCE_REGENERATE else find_stage_output(event['page_id'], 'onepager', dod_hash)
+            if previous:
+                logging.info(f"[{feature}] DoD sin cambios: reutilizando One Pager anterior")
+                return previous
+            
+            model = configure_gemini()
+            prompt_dod = compact_for_prompt(dod_content, model)
+            guide_content = await guide_task
+            if JSON_MODE:
+                onepager = await asyncio.to_thread(
+                    generate_onepager_json, model, prompt_dod, guide_content,
+                    use_cache=not FORCE_REGENERATE
+                )
+            elif SECTION_MODE:
+                onepager = await asyncio.to_thread(
+                    generate_onepager_by_sections, model, prompt_dod, guide_content,
+                    use_cache=not FORCE_REGENERATE
+                )
+            else:
+                prompt, context = build_request(prompt_dod, guide_content)
+                onepager = await generate_onepager_async(
+                    model, prompt, use_cache=not FORCE_REGENERATE, context=context
+                )
+            if onepager:
+                save_onepager(onepager, os.path.join(output_dir, "onepager_generado.md"))
+            return onepager
+        
+        onepager_content = await run_stage_async(event, 'onepager', generate, input_hash=dod_hash)
+        if not onepager_content:
+            logging.error(f"[{feature}] Fallo en generación del One Pager. Flujo detenido.")
+            return False
+        
+        # PASO 4: Generación del PDF en memoria (CPU-bound, en el servicio de render) y publicación
+        async def generate_pdf():
+            pdf_bytes = await render_pdf_async(onepager_content, None, subtitle, extract_image_refs(dod_content))
+            return await asyncio.to_thread(
+                publish_pdf, pdf_bytes, feature, pdf_version(onepager_content), output_dir
+            )
+        
+        pdf_path = await run_stage_async(
+            event, 'pdf', generate_pdf,
+            input_hash=content_hash(onepager_content),
+            is_valid=pdf_available
+        )
+        if not pdf_path:
+            logging.error(f"[{feature}] Fallo en generación del PDF. Flujo detenido.")
+            return False
+        
+        # PASO 5: Actualización en Notion (tracker y Data Normalization en paralelo, cada
+        # escritura en su propia etapa para que un reinicio no duplique el bloque del PDF)
+        pdf_url = resolve_pdf_url(pdf_path)
+        if not pdf_url:
+            logging.error(f"[{feature}] No se pudo generar la URL del PDF. Flujo detenido.")
+            return False
+        
+        async def update_tracker():
+            return await asyncio.to_thread(update_release_tracker, event['page_id'], pdf_url)
+        
+        async def update_page():
+            return await asyncio.to_thread(
+                append_pdf_to_page, DATA_NORMALIZATION_PAGE_ID, pdf_url, os.path.basename(pdf_path)
+            )
+        
+        updated = await asyncio.gather(
+            run_stage_async(event, 'notion_tracker', update_tracker),
+            run_stage_async(event, 'notion_page', update_page)
+        )
+        if not all(updated):
+            logging.error(f"[{feature}] Fallo en actualización de Notion. Flujo detenido.")
+            return False
+        
+        complete_transition(event['transition_id'])
+        logging.info(f"[{feature}] PDF generado: {pdf_path}")
+        return True
+        
+    except Exception as e:
+        logging.error(f"[{feature}] Error en pipeline async: {str(e)}")
+        return False
+
+
+async def poll_database_async(database_id, last_statuses, incremental=False):
+    """
+    Consulta una database del Release Tracker y registra las transiciones detectadas.
+    Cada poll trabaja sobre su propia copia de last_statuses, así las databases
+    se consultan a la vez; al terminar se fusionan solo los cambios de este poll.
+    
+    Args:
+        database_id (str): Database a consultar.
+        last_statuses (dict): page_id -> último estado conocido (compartido entre databases).
+        incremental (bool): Consultar solo registros editados desde el último watermark.
+        
+    Returns:
+        int: Cantidad de transiciones nuevas.
+    """
+    snapshot = dict(last_statuses)
+    statuses = dict(snapshot)
+    with notion_stage("tracker"):
+        events = await asyncio.to_thread(step_1_monitor_release_tracker, statuses, incremental, database_id)
+    
+    # Un poll fallido no fusiona ni guarda estados ni avanza el watermark
+    if events is None:
+        return 0
+    
+    # Sin awaits entre la comparación y la fusión: ningún otro poll se intercala
+    changed = {page_id: status for page_id, status in statuses.items() if snapshot.get(page_id) != status}
+    for page_id in snapshot.keys() - statuses.keys():
+        last_statuses.pop(page_id, None)
+    last_statuses.update(changed)
+    
+    def persist():
+        save_last_statuses(changed)
+        for event in events:
+            register_transition(event)
+        # Las transiciones ya están persistidas: el watermark puede avanzar
+        if incremental:
+            commit_watermark(database_id)
+    
+    # Escrituras en SQLite fuera del event loop
+    await asyncio.to_thread(persist)
+    
+    return len(events)
+
+
+class PipelineScheduler:
+    """
+    Lanza una corrutina por transición pendiente, sin repetir las que ya están
+    en curso y con un máximo de ASYNC_MAX_PIPELINES ejecutándose a la vez.
+    """
+    
+    def __init__(self, max_pipelines=ASYNC_MAX_PIPELINES):
+        self.semaphore = asyncio.Semaphore(max_pipelines)
+        self.in_flight = {}
+    
+    def schedule_pending(self):
+        """
+        Lanza los pipelines de las transiciones pendientes que no están en curso.
+        
+        Returns:
+            list: Tareas lanzadas.
+        """
+        pending = [event for event in get_pending_transitions() if event['transition_id'] not in self.in_flight]
+        if not pending:
+            return []
+        
+        logging.info(f"Transiciones pendientes lanzadas: {len(pending)}")
+        
+        # Una sola lectura de la guía para las transiciones lanzadas juntas
+        guide_task = asyncio.create_task(load_onepager_guide_async())
+        
+        tasks = []
+        for event in pending:
+            task = asyncio.create_task(self._run(event, guide_task))
+            self.in_flight[event['transition_id']] = task
+            tasks.append(task)
+        return tasks
+    
+    async def _run(self, event, guide_task):
+        """Ejecuta un pipeline respetando el límite de concurrencia."""
+        try:
+            async with self.semaphore:
+                return await run_feature_flow_async(event, guide_task)
+        finally:
+            self.in_flight.pop(event['transition_id'], None)
+
+
+async def run_complete_flow_async(incremental=False):
+    """
+    Versión async de run_complete_flow: consulta todas las databases vigiladas
+    (NOTION_RELEASE_TRACKER_DB_IDS) y procesa las transiciones pendientes a la vez.
+    
+    Args:
+        incremental (bool): Consultar solo registros editados desde el último watermark.
+        
+    Returns:
+        bool: True si había al menos una transición pendiente y todas se completaron.
+    """
+    try:
+        logging.info("="*80)
+        logging.info("INICIANDO FLUJO AUTOMATIZADO (ASYNC)")
+        logging.info("="*80)
+        logging.info(f"Databases vigiladas: {len(RELEASE_TRACKER_DB_IDS)}")
+        
+        reset_request_counts()
+        reset_compaction_totals()
+        reset_scheduler_metrics()
+        
+        last_statuses = await asyncio.to_thread(load_last_statuses)
+        await asyncio.gather(*(
+            poll_database_async(database_id, last_statuses, incremental)
+            for database_id in RELEASE_TRACKER_DB_IDS
+        ))
+        
+        tasks = PipelineScheduler().schedule_pending()
+        results = await asyncio.gather(*tasks)
+        
+        log_request_counts()
+        log_compaction_totals()
+        log_scheduler_metrics()
+        
+        if not tasks:
+            logging.info("No hay transiciones pendientes. Flujo detenido.")
+            return False
+        
+        if not all(results):
+            logging.error(f"Flujo fallido para {results.count(False)} transiciones (se reintentarán)")
+            return False
+        
+        logging.info(f"🎉 {len(results)} transiciones procesadas exitosamente")
+        return True
+        
+    except Exception as e:
+        logging.error(f"Error crítico en el flujo async: {str(e)}")
+        return False
+
+
+async def watch_database_async(database_id, last_statuses, scheduler, interval):
+    """
+    Vigila una database indefinidamente: cada `interval` segundos consulta los
+    cambios y lanza los pipelines pendientes sin esperar a que terminen.
+    """
+    while True:
+        try:
+            if await poll_database_async(database_id, last_statuses, incremental=True):
+                scheduler.schedule_pending()
+        except Exception as e:
+            logging.error(f"Error al vigilar la database {database_id}: {str(e)}")
+        
+        await asyncio.sleep(interval)
+
+
+async def run_monitoring_mode_async():
+    """
+    Modo monitoreo continuo async: una tarea de polling por database y un
+    pipeline por transición, todo en el mismo event loop.
+    """
+    logging.info("="*80)
+    logging.info("INICIANDO MODO MONITOREO CONTINUO (ASYNC)")
+    logging.info("="*80)
+    
+    interval = int(os.getenv("POLLING_INTERVAL", 300))
+    last_statuses = await asyncio.to_thread(load_last_statuses)
+    
+    scheduler = PipelineScheduler()
+    
+    # Retomar las transiciones que quedaron pendientes de ejecuciones anteriores
+    scheduler.schedule_pending()
+    
+    await asyncio.gather(*(
+        watch_database_async(database_id, last_statuses, scheduler, interval)
+        for database_id in RELEASE_TRACKER_DB_IDS
+    ))
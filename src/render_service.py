@@ -0,0 +1,245 @@
+"""
+Servicio de render de PDFs sobre un pool de procesos.
+Cada worker carga una sola vez los estilos, las métricas de las fuentes y la
+plantilla del documento (ver _init_worker), y después atiende trabajos de render
+(contenido + metadatos) que devuelven la ruta del PDF o sus bytes. El layout de
+ReportLab, que es CPU-bound, corre fuera del proceso principal, así varios One
+Pagers (o varios idiomas del mismo) se renderizan en paralelo en distintos cores.
+En modo streaming las secciones le llegan al worker por una cola a medida que
+Gemini las genera (ver render_pdf_from_sections).
+El pool vive mientras vive el proceso y se reutiliza entre ejecuciones.
+"""
+
+import os
+import atexit
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import generar_pdf
+
+
+# 0 = renderizar en el proceso actual (sin pool)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.getenv("BATCH_PDF_WORKERS", min(4, os.cpu_count() or 1))))
+
+_pool = None
+_manager = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """Prepara un worker: estilos y plantilla cargados, fuentes y parser en memoria."""
+    generar_pdf.warm_up()
+    logging.info(f"Worker de render listo (pid {os.getpid()})")
+
+
+def make_render_job(content, output_path=None, subtitle=None, images=None):
+    """
+    Arma un trabajo de render.
+
+    Args:
+        content (str): One Pager en Markdown o JSON (ver generar_pdf.generate_pdf).
+        output_path (str): Ruta del PDF; None para recibir los bytes.
+        subtitle (str): Subtítulo del encabezado (default: el de generar_pdf).
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
+
+    Returns:
+        dict: Trabajo serializable para los workers.
+    """
+    return {"content": content, "output_path": output_path, "subtitle": subtitle, "images": images}
+
+
+def render_job(job):
+    """
+    Ejecuta un trabajo de render (en un worker o en el proceso actual).
+
+    Args:
+        job (dict): Salida de make_render_job.
+
+    Returns:
+        str o bytes: Ruta del PDF, o sus bytes si el trabajo no tiene output_path.
+    """
+    kwargs = {"images": job.get("images")}
+    if job.get("subtitle"):
+        kwargs["subtitle"] = job["subtitle"]
+    return generar_pdf.generate_pdf(job["content"], job.get("output_path"), **kwargs)
+
+
+def _queued_sections(queue):
+    """Secciones recibidas por la cola hasta el aviso de fin (o de cancelación)."""
+    while True:
+        kind, section = queue.get()
+        if kind == 'end':
+            return
+        if kind == 'abort':
+            raise RuntimeError("Generación de secciones cancelada")
+        yield section
+
+
+def _render_sections(sections, subtitle, images):
+    """PDF en memoria a partir de secciones que pueden ir llegando."""
+    kwargs = {"images": images}
+    if subtitle:
+        kwargs["subtitle"] = subtitle
+    return generar_pdf.generate_pdf_from_sections(sections, None, **kwargs)
+
+
+def render_sections_job(queue, subtitle=None, images=None):
+    """
+    Renderiza en un worker un PDF cuyas secciones llegan por una cola.
+
+    Args:
+        queue: Cola del Manager con tuplas ('section', markdown), ('end', None) o ('abort', None).
+        subtitle (str): Subtítulo del encabezado (default: el de generar_pdf).
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
+
+    Returns:
+        bytes: Contenido del PDF.
+    """
+    return _render_sections(_queued_sections(queue), subtitle, images)
+
+
+def get_render_pool():
+    """
+    Devuelve el pool de render compartido (se crea la primera vez).
+
+    Returns:
+        ProcessPoolExecutor: RENDER_WORKERS procesos ya inicializados con _init_worker,
+            o None si RENDER_WORKERS=0.
+    """
+    global _pool
+
+    if RENDER_WORKERS <= 0:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            # spawn: hacer fork con hilos activos puede heredar locks tomados. Cada worker
+            # reimporta el script principal, por eso main.py no carga nada fuera de __main__
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            atexit.register(shutdown_render_pool)
+            logging.info(f"Servicio de render iniciado: {RENDER_WORKERS} procesos")
+    return _pool
+
+
+def _get_manager():
+    """Manager para las colas de secciones del modo streaming (se crea la primera vez)."""
+    global _manager
+
+    with _pool_lock:
+        if _manager is None:
+            _manager = multiprocessing.get_context("spawn").Manager()
+    return _manager
+
+
+def shutdown_render_pool():
+    """Detiene los workers de render (se vuelven a crear si se pide otro render)."""
+    global _pool, _manager
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+        manager, _manager = _manager, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+    if manager is not None:
+        manager.shutdown()
+
+
+def submit_render(job):
+    """
+    Encola un trabajo de render.
+
+    Args:
+        job (dict): Salida de make_render_job.
+
+    Returns:
+        Future: Se completa con el resultado de render_job.
+    """
+    pool = get_render_pool()
+    if pool is not None:
+        return pool.submit(render_job, job)
+
+    future = Future()
+    try:
+        future.set_result(render_job(job))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def render_pdf(content, output_path=None, subtitle=None, images=None):
+    """
+    Renderiza un PDF en el servicio y espera el resultado.
+
+    Returns:
+        str o bytes: Ruta del PDF, o sus bytes si no se indica output_path.
+    """
+    return submit_render(make_render_job(content, output_path, subtitle, images)).result()
+
+
+async def render_pdf_async(content, output_path=None, subtitle=None, images=None):
+    """
+    Versión async de render_pdf: el event loop sigue libre mientras se renderiza.
+
+    Returns:
+        str o bytes: Ruta del PDF, o sus bytes si no se indica output_path.
+    """
+    return await asyncio.wrap_future(submit_render(make_render_job(content, output_path, subtitle, images)))
+
+
+def render_pdf_from_sections(sections, subtitle=None, images=None):
+    """
+    Renderiza en el servicio un PDF cuyas secciones van llegando (ej: el stream
+    de Gemini). Cada sección se envía al worker apenas se recibe, así el worker
+    la convierte a elementos mientras se generan las siguientes.
+
+    Args:
+        sections (iterable): Secciones de Markdown (lista o generador).
+        subtitle (str): Subtítulo del encabezado (default: el de generar_pdf).
+        images (list): Imágenes del DoD (ver dod_images.extract_image_refs).
+
+    Returns:
+        bytes: Contenido del PDF.
+    """
+    pool = get_render_pool()
+    if pool is None:
+        return _render_sections(sections, subtitle, images)
+
+    queue = _get_manager().Queue()
+    future = pool.submit(render_sections_job, queue, subtitle, images)
+    try:
+        for section in sections:
+            queue.put(('section', section))
+    except BaseException:
+        # El worker no debe quedar esperando secciones que no van a llegar
+        queue.put(('abort', None))
+        raise
+    queue.put(('end', None))
+    return future.result()
+
+
+def render_many(jobs):
+    """
+    Renderiza varios trabajos en paralelo.
+
+    Args:
+        jobs (list): Trabajos de make_render_job.
+
+    Returns:
+        list: Resultado de cada trabajo, en el mismo orden (la excepción si falló).
+    """
+    futures = [submit_render(job) for job in jobs]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logging.error(f"Error en el render: {str(e)}")
+            results.append(e)
+    return results
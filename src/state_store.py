@@ -0,0 +1,295 @@
+"""
+Estado persistente del pipeline en SQLite.
+Guarda, por page_id del Release Tracker, el último estado visto, las transiciones
+detectadas y las etapas completadas de cada una, para que un reinicio no vuelva
+a procesar la misma transición (ni repita llamadas a Gemini, PDFs o bloques en Notion).
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+from contextlib import closing
+from datetime import datetime, timezone
+
+
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state/pipeline_state.db")
+
+# Etapas del pipeline en orden de ejecución. Las escrituras en Notion no son
+# idempotentes: cada una es su propia etapa para que un reinicio no las repita
+STAGES = ("extract", "onepager", "pdf", "notion_tracker", "notion_page")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id      TEXT PRIMARY KEY,
+    last_status  TEXT,
+    content_hash TEXT,
+    updated_at   TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    transition_id   TEXT PRIMARY KEY,
+    page_id         TEXT NOT NULL,
+    feature         TEXT NOT NULL,
+    title           TEXT,
+    status          TEXT NOT NULL,
+    link_definition TEXT,
+    detected_at     TEXT NOT NULL,
+    completed_at    TEXT
+);
+
+CREATE TABLE IF NOT EXISTS stages (
+    transition_id TEXT NOT NULL,
+    stage         TEXT NOT NULL,
+    input_hash    TEXT,
+    output        TEXT,
+    output_hash   TEXT,
+    completed_at  TEXT NOT NULL,
+    PRIMARY KEY (transition_id, stage)
+);
+
+CREATE INDEX IF NOT EXISTS idx_transitions_pending ON transitions (completed_at);
+"""
+
+
+def _now():
+    """Fecha actual en ISO 8601 (UTC)."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def content_hash(content):
+    """
+    Calcula el hash SHA-256 de un contenido de texto.
+
+    Args:
+        content (str): Contenido a hashear.
+
+    Returns:
+        str: Hash hexadecimal, o None si no hay contenido.
+    """
+    if content is None:
+        return None
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _connect(db_path=None):
+    """
+    Abre una conexión a la base de estado, creando el esquema si no existe.
+    Cada operación usa su propia conexión para poder llamarse desde varios hilos.
+    """
+    db_path = db_path or STATE_DB_PATH
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def load_last_statuses(db_path=None):
+    """
+    Carga el último estado conocido de cada registro del Release Tracker.
+
+    Args:
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+
+    Returns:
+        dict: page_id -> último estado visto.
+    """
+    with closing(_connect(db_path)) as connection:
+        rows = connection.execute("SELECT page_id, last_status FROM pages").fetchall()
+    return {row['page_id']: row['last_status'] for row in rows}
+
+
+def save_last_statuses(last_statuses, db_path=None):
+    """
+    Persiste los estados vistos en el último poll (upsert por page_id).
+
+    Args:
+        last_statuses (dict): page_id -> estado actual.
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+    """
+    now = _now()
+    with closing(_connect(db_path)) as connection, connection:
+        connection.executemany(
+            """
+            INSERT INTO pages (page_id, last_status, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(page_id) DO UPDATE SET
+                last_status = excluded.last_status,
+                updated_at = excluded.updated_at
+            WHERE pages.last_status IS NOT excluded.last_status
+            """,
+            [(page_id, status, now) for page_id, status in last_statuses.items()]
+        )
+
+
+def register_transition(event, db_path=None):
+    """
+    Registra una transición detectada. Si ya existía, no la duplica.
+
+    El ID combina page_id, estado y last_edited_time del registro, de modo que
+    volver a detectar la misma edición devuelve la misma transición.
+
+    Args:
+        event (dict): Evento de transición de tracker.evaluate_watches.
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+
+    Returns:
+        str: ID de la transición.
+    """
+    edited = (event.get('record') or {}).get('last_edited_time', '')
+    transition_id = f"{event['page_id']}:{event['status']}:{edited}"
+
+    with closing(_connect(db_path)) as connection, connection:
+        cursor = connection.execute(
+            """
+            INSERT OR IGNORE INTO transitions
+                (transition_id, page_id, feature, title, status, link_definition, detected_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (transition_id, event['page_id'], event['feature'], event.get('title'),
+             event['status'], event.get('link_definition'), _now())
+        )
+
+    if cursor.rowcount:
+        logging.info(f"Transición registrada: {transition_id}")
+    else:
+        logging.info(f"Transición ya registrada previamente: {transition_id}")
+    return transition_id
+
+
+def get_pending_transitions(db_path=None):
+    """
+    Devuelve las transiciones que aún no completaron todas sus etapas.
+
+    Args:
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+
+    Returns:
+        list: Eventos (dict) con transition_id, page_id, feature, title, status
+            y link_definition, en orden de detección.
+    """
+    with closing(_connect(db_path)) as connection:
+        rows = connection.execute(
+            """
+            SELECT transition_id, page_id, feature, title, status, link_definition
+            FROM transitions WHERE completed_at IS NULL ORDER BY detected_at
+            """
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_stage(transition_id, stage, db_path=None):
+    """
+    Consulta si una etapa de una transición ya se completó.
+
+    Args:
+        transition_id (str): ID de la transición.
+        stage (str): Nombre de la etapa (ver STAGES).
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+
+    Returns:
+        dict: input_hash, output y output_hash de la etapa, o None si está pendiente.
+    """
+    with closing(_connect(db_path)) as connection:
+        row = connection.execute(
+            "SELECT input_hash, output, output_hash FROM stages WHERE transition_id = ? AND stage = ?",
+            (transition_id, stage)
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def find_stage_output(page_id, stage, input_hash, db_path=None):
+    """
+    Busca una etapa ya completada para el mismo registro y la misma entrada.
+    Permite reutilizar, por ejemplo, el One Pager de una transición anterior
+    cuando el DoD no cambió.
+
+    Args:
+        page_id (str): ID del registro en el Release Tracker.
+        stage (str): Nombre de la etapa (ver STAGES).
+        input_hash (str): Hash de la entrada de la etapa.
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+
+    Returns:
+        str: Salida guardada de la etapa, o None si no hay coincidencia.
+    """
+    if not input_hash:
+        return None
+
+    with closing(_connect(db_path)) as connection:
+        row = connection.execute(
+            """
+            SELECT s.output FROM stages s
+            JOIN transitions t ON t.transition_id = s.transition_id
+            WHERE t.page_id = ? AND s.stage = ? AND s.input_hash = ?
+            ORDER BY s.completed_at DESC LIMIT 1
+            """,
+            (page_id, stage, input_hash)
+        ).fetchone()
+    return row['output'] if row else None
+
+
+def complete_stage(transition_id, stage, output, input_hash=None, db_path=None):
+    """
+    Marca una etapa como completada y guarda su salida.
+
+    Args:
+        transition_id (str): ID de la transición.
+        stage (str): Nombre de la etapa (ver STAGES).
+        output: Salida de la etapa (texto, ruta o estructura serializable a JSON).
+        input_hash (str): Hash de la entrada de la etapa (opcional).
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+    """
+    if not isinstance(output, str):
+        output = json.dumps(output, ensure_ascii=False)
+
+    with closing(_connect(db_path)) as connection, connection:
+        connection.execute(
+            """
+            INSERT OR REPLACE INTO stages
+                (transition_id, stage, input_hash, output, output_hash, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (transition_id, stage, input_hash, output, content_hash(output), _now())
+        )
+
+
+def set_content_hash(page_id, hash_value, db_path=None):
+    """
+    Guarda el hash del último DoD extraído para un registro.
+
+    Args:
+        page_id (str): ID del registro en el Release Tracker.
+        hash_value (str): Hash del contenido.
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+    """
+    with closing(_connect(db_path)) as connection, connection:
+        connection.execute(
+            """
+            INSERT INTO pages (page_id, content_hash, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(page_id) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                updated_at = excluded.updated_at
+            """,
+            (page_id, hash_value, _now())
+        )
+
+
+def complete_transition(transition_id, db_path=None):
+    """
+    Marca una transición como procesada por completo.
+
+    Args:
+        transition_id (str): ID de la transición.
+        db_path (str): Ruta de la base SQLite (default: STATE_DB_PATH).
+    """
+    with closing(_connect(db_path)) as connection, connection:
+        connection.execute(
+            "UPDATE transitions SET completed_at = ? WHERE transition_id = ?",
+            (_now(), transition_id)
+        )
+    logging.info(f"Transición completada: {transition_id}")
@@ -1,10 +1,17 @@
 """
 Script para generar URL publica del PDF usando GitHub.
-Asume que el PDF ya esta en el repositorio.
+Con GITHUB_TOKEN, el PDF se sube directamente desde memoria con la API de
+contenidos de GitHub; sin token, se asume que el PDF ya esta en el repositorio.
 """
 
 import os
+import time
+import base64
+import hashlib
 import logging
+import threading
+
+import requests
 from dotenv import load_dotenv
 
 
@@ -23,6 +30,16 @@ load_dotenv()
 GITHUB_USER = os.getenv('GITHUB_USER', 'tu-usuario')
 GITHUB_REPO = os.getenv('GITHUB_REPO', 'Prueba')
 GITHUB_BRANCH = os.getenv('GITHUB_BRANCH', 'main')
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+# Carpeta del repositorio donde se suben los PDFs (una subcarpeta por funcionalidad)
+GITHUB_PDF_DIR = os.getenv('GITHUB_PDF_DIR', 'src/output/onepagers')
+
+GITHUB_API_URL = "https://api.github.com"
+# Reintentos cuando otra subida movio la rama entre la lectura y la escritura
+GITHUB_UPLOAD_RETRIES = 3
+
+_session = None
+_session_lock = threading.Lock()
 
 
 def generate_github_url(pdf_path="src/output/E137_OnePager.pdf"):
@@ -49,6 +66,130 @@ def generate_github_url(pdf_path="src/output/E137_OnePager.pdf"):
         raise
 
 
+def upload_enabled():
+    """
+    Indica si los PDFs se suben directamente a GitHub.
+
+    Returns:
+        bool: True si hay GITHUB_TOKEN configurado.
+    """
+    return bool(GITHUB_TOKEN)
+
+
+def pdf_repo_path(feature, version):
+    """
+    Ruta del PDF en el repositorio: una por funcionalidad y version, asi dos
+    ejecuciones concurrentes nunca se pisan.
+
+    Args:
+        feature (str): Funcionalidad (ej: E137).
+        version (str): Version del One Pager (ej: prefijo del hash del contenido).
+
+    Returns:
+        str: Ruta relativa a la raiz del repositorio.
+    """
+    return f"{GITHUB_PDF_DIR}/{feature}/{feature}_OnePager_{version}.pdf"
+
+
+def get_session():
+    """
+    Devuelve la sesion HTTP autenticada contra la API de GitHub (se crea la primera vez).
+
+    Returns:
+        requests.Session: Sesion con el token y los headers de la API.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update({
+                "Authorization": f"Bearer {GITHUB_TOKEN}",
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            })
+    return _session
+
+
+def git_blob_sha(content):
+    """SHA que GitHub asigna a un archivo con este contenido."""
+    return hashlib.sha1(f"blob {len(content)}\0".encode('utf-8') + content).hexdigest()
+
+
+def upload_pdf(pdf_bytes, repo_path, message=None):
+    """
+    Sube el PDF al repositorio con la API de contenidos de GitHub, sin pasar
+    por el disco. Si el archivo ya esta con el mismo contenido, no se sube.
+
+    Args:
+        pdf_bytes (bytes): Contenido del PDF.
+        repo_path (str): Ruta en el repositorio (ver pdf_repo_path).
+        message (str): Mensaje del commit (default: uno con el nombre del PDF).
+
+    Returns:
+        str: URL publica del PDF subido.
+    """
+    url = f"{GITHUB_API_URL}/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{repo_path}"
+    session = get_session()
+    payload = {
+        "message": message or f"Add One Pager {os.path.basename(repo_path)}",
+        "content": base64.b64encode(pdf_bytes).decode('ascii'),
+        "branch": GITHUB_BRANCH,
+    }
+
+    for attempt in range(GITHUB_UPLOAD_RETRIES):
+        response = session.get(url, params={"ref": GITHUB_BRANCH}, timeout=30)
+        if response.status_code == 200:
+            sha = response.json()["sha"]
+            if sha == git_blob_sha(pdf_bytes):
+                logging.info(f"PDF ya presente en GitHub: {repo_path}")
+                return generate_github_url(repo_path)
+            payload["sha"] = sha
+        elif response.status_code != 404:
+            response.raise_for_status()
+
+        response = session.put(url, json=payload, timeout=60)
+        # 409/422: la rama o el archivo cambiaron desde la lectura
+        if response.status_code in (409, 422) and attempt + 1 < GITHUB_UPLOAD_RETRIES:
+            logging.warning(f"Conflicto al subir {repo_path} ({response.status_code}). Reintentando...")
+            time.sleep(1 + attempt)
+            continue
+        response.raise_for_status()
+        break
+
+    logging.info(f"PDF subido a GitHub: {repo_path} ({len(pdf_bytes) / 1024:.2f} KB)")
+    return generate_github_url(repo_path)
+
+
+def is_pdf_url(pdf_location):
+    """
+    Indica si la salida del paso de PDF ya es una URL publica (PDF subido).
+
+    Args:
+        pdf_location (str): URL del PDF subido o ruta local relativa a src/.
+
+    Returns:
+        bool: True si es una URL.
+    """
+    return pdf_location.startswith(("https://", "http://"))
+
+
+def resolve_pdf_url(pdf_location):
+    """
+    URL publica del PDF a partir de la salida del paso de PDF.
+
+    Args:
+        pdf_location (str): URL del PDF subido o ruta local relativa a src/
+            (que se commitea a mano).
+
+    Returns:
+        str: URL publica del archivo en GitHub.
+    """
+    if is_pdf_url(pdf_location):
+        return pdf_location
+    return generate_github_url(f"src/{pdf_location}")
+
+
 def verify_pdf_exists(pdf_path="src/output/E137_OnePager.pdf"):
     """
     Verifica que el PDF existe localmente.
@@ -84,7 +225,22 @@ if __name__ == "__main__":
     
     pdf_path = "src/output/E137_OnePager.pdf"
     
-    if verify_pdf_exists(pdf_path):
+    if not verify_pdf_exists(pdf_path):
+        logging.error("No se pudo generar la URL. PDF no encontrado.")
+        exit(1)
+    
+    if upload_enabled():
+        # Con token el PDF se sube directamente, sin commit manual
+        local_path = pdf_path if os.path.exists(pdf_path) else pdf_path.replace("src/", "", 1)
+        with open(local_path, 'rb') as f:
+            url = upload_pdf(f.read(), pdf_path)
+        
+        logging.info("\n" + "="*80)
+        logging.info("PDF SUBIDO EXITOSAMENTE")
+        logging.info("="*80)
+        logging.info(f"URL publica: {url}")
+        logging.info("="*80)
+    else:
         url = generate_github_url(pdf_path)
         
         logging.info("\n" + "="*80)
@@ -99,7 +255,3 @@ if __name__ == "__main__":
         logging.info("   git push origin main")
         logging.info("2. Actualizar Notion con esta URL")
         logging.info("="*80)
-    else:
-        logging.error("No se pudo generar la URL. PDF no encontrado.")
-        exit(1)
-
@@ -1,9 +1,11 @@
 """
 Sistema de monitoreo del Release Tracker en Notion.
-Detecta cuando el Deployment Status de E137 cambia a "Regression".
+Detecta cuando alguna de las funcionalidades vigiladas (WATCHED_FUNCTIONALITIES)
+entra a uno de los estados objetivo (TARGET_STATUSES) del Deployment Status.
 
-Este script implementa polling periódico para monitorear cambios de estado
-en el Release Tracker de Notion y activar el flujo de procesamiento automático.
+Este script implementa polling periódico e incremental (solo los registros
+editados desde el último watermark, por database) para monitorear cambios de
+estado en el Release Tracker de Notion y activar el flujo de procesamiento automático.
 """
 
 # ============================================================================
@@ -11,11 +13,17 @@ en el Release Tracker de Notion y activar el flujo de procesamiento automático.
 # ============================================================================
 
 import os
+import re
+import json
 import time
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
-from notion_client import Client
+from notion_api import get_notion_client
+from notion_query import (
+    get_database_schema, find_property, build_title_filter,
+    build_status_filter, build_edited_since_filter, combine_filters, iter_database_pages
+)
 
 
 # ============================================================================
@@ -43,8 +51,8 @@ logging.basicConfig(
 # Cargar variables desde .env
 load_dotenv()
 
-# Inicializar cliente de Notion con API key
-notion = Client(auth=os.getenv("NOTION_API_KEY"))
+# Cliente de Notion compartido (limitador de tasa + reintentos)
+notion = get_notion_client()
 
 # Configuración del monitoreo
 RELEASE_TRACKER_DB_ID = os.getenv("NOTION_RELEASE_TRACKER_DB_ID")  # ID de la database
@@ -53,10 +61,186 @@ TARGET_FUNCTIONALITY = "E137"  # Funcionalidad a monitorear
 TARGET_STATUS = "Regression"  # Estado que dispara el flujo
 
 
+def parse_env_list(value, default):
+    """
+    Convierte una variable de entorno separada por comas en una lista.
+    
+    Args:
+        value (str): Valor crudo de la variable (ej: "E137, E140").
+        default (list): Valores por defecto si la variable está vacía.
+        
+    Returns:
+        list: Elementos sin espacios ni duplicados, en el orden original.
+    """
+    if not value:
+        return list(default)
+    items = [item.strip() for item in value.split(',')]
+    return list(dict.fromkeys(item for item in items if item))
+
+
+# Watch engine: funcionalidades y estados vigilados en una sola pasada
+# Ejemplo en .env: WATCHED_FUNCTIONALITIES=E137,E140,E152
+WATCHED_FUNCTIONALITIES = parse_env_list(os.getenv("WATCHED_FUNCTIONALITIES"), [TARGET_FUNCTIONALITY])
+TARGET_STATUSES = parse_env_list(os.getenv("TARGET_STATUSES"), [TARGET_STATUS])
+
+# Watermark de last_edited_time para polling incremental (sobrevive reinicios)
+WATERMARK_PATH = os.getenv("TRACKER_WATERMARK_PATH", "state/tracker_watermark.json")
+
+# Databases vigiladas. Ejemplo en .env: NOTION_RELEASE_TRACKER_DB_IDS=abc123,def456
+RELEASE_TRACKER_DB_IDS = parse_env_list(
+    os.getenv("NOTION_RELEASE_TRACKER_DB_IDS"),
+    [RELEASE_TRACKER_DB_ID] if RELEASE_TRACKER_DB_ID else []
+)
+
+# Watermark observado en el último poll de cada database, pendiente de confirmar con commit_watermark()
+_pending_watermarks = {}
+
+
 # ============================================================================
 # FUNCIONES
 # ============================================================================
 
+def is_deployment_status_property(prop_name, prop_data):
+    """Indica si una property corresponde al Deployment Status."""
+    return 'deployment' in prop_name.lower() and 'status' in prop_name.lower()
+
+
+def is_link_definition_property(prop_name, prop_data):
+    """Indica si una property corresponde al Link Definition."""
+    return 'link' in prop_name.lower() and 'definition' in prop_name.lower()
+
+
+def load_watermark(database_id=None):
+    """
+    Lee el último watermark confirmado para una database.
+    
+    Args:
+        database_id (str): ID de la database (default: RELEASE_TRACKER_DB_ID).
+        
+    Returns:
+        str: Fecha ISO del último last_edited_time procesado, o None.
+    """
+    database_id = database_id or RELEASE_TRACKER_DB_ID
+    try:
+        with open(WATERMARK_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get(database_id)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"No se pudo leer el watermark ({WATERMARK_PATH}): {str(e)}")
+        return None
+
+
+def save_watermark(watermark, database_id=None):
+    """
+    Persiste el watermark de una database de forma atómica.
+    
+    Args:
+        watermark (str): Fecha ISO del último last_edited_time procesado.
+        database_id (str): ID de la database (default: RELEASE_TRACKER_DB_ID).
+    """
+    database_id = database_id or RELEASE_TRACKER_DB_ID
+    
+    watermarks = {}
+    if os.path.exists(WATERMARK_PATH):
+        with open(WATERMARK_PATH, 'r', encoding='utf-8') as f:
+            watermarks = json.load(f)
+    watermarks[database_id] = watermark
+    
+    directory = os.path.dirname(WATERMARK_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    # Escribir a un temporal y renombrar para no dejar un JSON a medias
+    tmp_path = f"{WATERMARK_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, WATERMARK_PATH)
+
+
+def commit_watermark(database_id=None):
+    """
+    Confirma el watermark del último poll exitoso.
+    Se llama después de procesar los eventos para no saltarse registros si el flujo falla.
+    
+    Args:
+        database_id (str): Database a confirmar (default: todas las que tengan uno pendiente).
+        
+    Returns:
+        str: Último watermark confirmado, o None si no había nada pendiente.
+    """
+    database_ids = [database_id] if database_id else list(_pending_watermarks)
+    
+    watermark = None
+    for db_id in database_ids:
+        pending = _pending_watermarks.pop(db_id, None)
+        if pending:
+            save_watermark(pending, db_id)
+            watermark = pending
+            logging.info(f"Watermark actualizado ({db_id}): {pending}")
+    return watermark
+
+
+def track_watermark(records, watermark, database_id=None):
+    """
+    Recorre los registros registrando el mayor last_edited_time visto.
+    Al agotarse el generador, deja el resultado pendiente para commit_watermark().
+    
+    Args:
+        records (iterable): Registros del Release Tracker.
+        watermark (str): Watermark de partida.
+        database_id (str): Database consultada (default: RELEASE_TRACKER_DB_ID).
+        
+    Yields:
+        dict: Los mismos registros, sin modificar.
+    """
+    latest = watermark
+    for record in records:
+        edited = record.get('last_edited_time')
+        # Las fechas ISO 8601 de Notion (UTC) se ordenan lexicográficamente
+        if edited and (not latest or edited > latest):
+            latest = edited
+        yield record
+    
+    if latest:
+        _pending_watermarks[database_id or RELEASE_TRACKER_DB_ID] = latest
+
+
+def build_tracker_query(feature_codes, target_statuses=None, watermark=None, database_id=None):
+    """
+    Construye el filtro y las columnas a descargar del Release Tracker.
+    
+    Los nombres de las properties se resuelven desde el esquema de la database
+    (una sola consulta cacheada), así el filtro se evalúa en el servidor.
+    
+    Args:
+        feature_codes (list): Códigos de funcionalidad a buscar en el título.
+        target_statuses (list): Si se indica, solo registros en esos estados.
+        watermark (str): Si se indica, solo registros editados desde esa fecha.
+        database_id (str): Database a consultar (default: RELEASE_TRACKER_DB_ID).
+        
+    Returns:
+        tuple: (filter, filter_properties) listos para iter_database_pages.
+    """
+    schema = get_database_schema(notion, database_id or RELEASE_TRACKER_DB_ID)
+    
+    title_name, title_data = find_property(schema, lambda name, data: data['type'] == 'title')
+    status_name, status_data = find_property(schema, is_deployment_status_property)
+    link_name, link_data = find_property(schema, is_link_definition_property)
+    
+    title_filter = build_title_filter(title_name, feature_codes)
+    status_filter = None
+    if target_statuses and status_data:
+        status_filter = build_status_filter(status_name, target_statuses, status_data['type'])
+    
+    # Solo descargar las columnas que usa el tracker
+    filter_properties = [data['id'] for data in (title_data, status_data, link_data) if data]
+    
+    edited_filter = build_edited_since_filter(watermark)
+    
+    return combine_filters(title_filter, status_filter, edited_filter), filter_properties
+
+
 def query_release_tracker():
     """
     Consulta el Release Tracker y busca el registro de E137.
@@ -68,27 +252,15 @@ def query_release_tracker():
         # Log: Inicio de consulta
         logging.info(f"Consultando Release Tracker (DB ID: {RELEASE_TRACKER_DB_ID})")
         
-        # Consultar la database de Notion
-        results = notion.databases.query(database_id=RELEASE_TRACKER_DB_ID)
-        
-        # Log: Cantidad de registros encontrados
-        logging.info(f"Registros encontrados: {len(results['results'])}")
+        # El filtro por título se evalúa en Notion; se recorren todas las páginas
+        query_filter, filter_properties = build_tracker_query([TARGET_FUNCTIONALITY])
+        records = iter_database_pages(
+            notion, RELEASE_TRACKER_DB_ID,
+            filter=query_filter, filter_properties=filter_properties
+        )
         
-        # Recorrer cada registro en busca de E137
-        for record in results['results']:
-            # Obtener las properties (columnas) del registro
-            properties = record.get('properties', {})
-            
-            # Extraer el nombre/título del registro
-            name = ""
-            for prop_name, prop_data in properties.items():
-                # Buscar la property de tipo 'title'
-                if prop_data['type'] == 'title' and prop_data.get('title'):
-                    # Notion devuelve el título como array de fragmentos de texto
-                    # Ejemplo: [{'plain_text': 'E137 - '}, {'plain_text': 'Data...'}]
-                    # Los unimos en un solo string
-                    name = ''.join([t['plain_text'] for t in prop_data['title']])
-                    break  # Ya encontramos el título, salir del loop
+        for record in records:
+            name = get_record_title(record)
             
             # Verificar si este registro es E137
             if TARGET_FUNCTIONALITY in name:
@@ -121,7 +293,7 @@ def get_deployment_status(record):
         # Buscar específicamente "Deployment Status" (con ambas palabras)
         for prop_name, prop_data in properties.items():
             # Verificar que contenga TANTO "deployment" COMO "status"
-            if 'deployment' in prop_name.lower() and 'status' in prop_name.lower():
+            if is_deployment_status_property(prop_name, prop_data):
                 prop_type = prop_data['type']
                 
                 if prop_type == 'status' and prop_data.get('status'):
@@ -166,7 +338,7 @@ def get_link_definition(record):
         # Puede llamarse "Link Definition", "Definition Link", "DoD Link", etc.
         for prop_name, prop_data in properties.items():
             # Verificar si el nombre contiene "link" y "definition"
-            if 'link' in prop_name.lower() and 'definition' in prop_name.lower():
+            if is_link_definition_property(prop_name, prop_data):
                 # Verificar que sea tipo URL
                 if prop_data['type'] == 'url':
                     url = prop_data.get('url', '')
@@ -189,22 +361,194 @@ def get_link_definition(record):
         return None
 
 
+def get_record_title(record):
+    """
+    Extrae el título (property de tipo 'title') de un registro.
+    
+    Args:
+        record (dict): Registro de Notion.
+        
+    Returns:
+        str: Título del registro o cadena vacía si no tiene.
+    """
+    properties = record.get('properties', {})
+    for prop_data in properties.values():
+        if prop_data['type'] == 'title' and prop_data.get('title'):
+            # Notion devuelve el título como array de fragmentos de texto
+            return ''.join([t['plain_text'] for t in prop_data['title']])
+    return ""
+
+
+def compile_feature_pattern(feature_codes):
+    """
+    Compila una única regex que reconoce cualquiera de los códigos vigilados.
+    
+    Con una sola búsqueda por título, el costo de cada poll es O(registros)
+    sin importar cuántas funcionalidades se vigilen.
+    
+    Args:
+        feature_codes (list): Códigos de funcionalidad (ej: ["E137", "E140"]).
+        
+    Returns:
+        re.Pattern: Patrón con el código encontrado en el grupo 1.
+    """
+    # Los códigos más largos primero para que "E1370" no se resuelva como "E137"
+    codes = sorted(set(feature_codes), key=len, reverse=True)
+    alternatives = '|'.join(re.escape(code) for code in codes)
+    return re.compile(rf"(?<![A-Za-z0-9])({alternatives})(?![A-Za-z0-9])")
+
+
+def build_transition_event(record, feature, title, previous_status, current_status):
+    """
+    Construye el evento de transición que consume pipeline.run_complete_flow.
+    
+    Args:
+        record (dict): Registro de Notion.
+        feature (str): Código de la funcionalidad (ej: "E137").
+        title (str): Título del registro.
+        previous_status (str): Último estado conocido (None si no se conocía).
+        current_status (str): Estado actual.
+        
+    Returns:
+        dict: Evento con feature, page_id, title, estados, link_definition y record.
+    """
+    return {
+        'feature': feature,
+        'page_id': record['id'],
+        'title': title,
+        'previous_status': previous_status,
+        'status': current_status,
+        'link_definition': get_link_definition(record),
+        'record': record,
+    }
+
+
+def evaluate_watches(records, feature_codes=None, target_statuses=None, last_statuses=None):
+    """
+    Evalúa todas las funcionalidades vigiladas en una sola pasada sobre los registros.
+    
+    Args:
+        records (iterable): Registros devueltos por el Release Tracker.
+        feature_codes (list): Códigos vigilados (default: WATCHED_FUNCTIONALITIES).
+        target_statuses (list): Estados que disparan el flujo (default: TARGET_STATUSES).
+        last_statuses (dict): page_id -> último estado conocido. Se actualiza in-place.
+        
+    Returns:
+        list: Eventos de transición (uno por registro que entra a un estado objetivo).
+    """
+    feature_codes = feature_codes or WATCHED_FUNCTIONALITIES
+    target_statuses = set(target_statuses or TARGET_STATUSES)
+    if last_statuses is None:
+        last_statuses = {}
+    
+    pattern = compile_feature_pattern(feature_codes)
+    events = []
+    
+    for record in records:
+        title = get_record_title(record)
+        match = pattern.search(title)
+        if not match:
+            continue
+        
+        feature = match.group(1)
+        current_status = get_deployment_status(record)
+        if not current_status:
+            continue
+        
+        page_id = record['id']
+        previous_status = last_statuses.get(page_id)
+        last_statuses[page_id] = current_status
+        
+        if previous_status != current_status:
+            logging.info(f"[{feature}] Cambio de estado detectado: {previous_status} -> {current_status}")
+        
+        # Solo emitir cuando el registro ENTRA a un estado objetivo
+        if current_status in target_statuses and previous_status != current_status:
+            events.append(build_transition_event(record, feature, title, previous_status, current_status))
+    
+    logging.info(f"Eventos de transición emitidos: {len(events)}")
+    return events
+
+
+def poll_release_tracker(feature_codes=None, target_statuses=None, last_statuses=None, incremental=False,
+                         database_id=None):
+    """
+    Hace una única consulta al Release Tracker y evalúa todas las funcionalidades vigiladas.
+    
+    Args:
+        feature_codes (list): Códigos vigilados (default: WATCHED_FUNCTIONALITIES).
+        target_statuses (list): Estados que disparan el flujo (default: TARGET_STATUSES).
+        last_statuses (dict): page_id -> último estado conocido. Se actualiza in-place
+            solo si la consulta termina completa.
+        incremental (bool): Si es True, solo consulta registros editados desde el
+            último watermark confirmado (ver commit_watermark).
+        database_id (str): Database a consultar (default: RELEASE_TRACKER_DB_ID).
+        
+    Returns:
+        list: Eventos de transición detectados, o None si la consulta falla (en ese
+            caso no se debe guardar last_statuses ni confirmar el watermark).
+    """
+    database_id = database_id or RELEASE_TRACKER_DB_ID
+    
+    # Un poll fallido nunca debe confirmar el watermark de un poll anterior
+    _pending_watermarks.pop(database_id, None)
+    
+    try:
+        logging.info(f"Consultando Release Tracker (DB ID: {database_id})")
+        
+        feature_codes = feature_codes or WATCHED_FUNCTIONALITIES
+        target_statuses = target_statuses or TARGET_STATUSES
+        
+        # Sin estados previos no hay transiciones que seguir: basta con pedir
+        # al servidor los registros que ya están en un estado objetivo
+        status_pushdown = target_statuses if last_statuses is None else None
+        
+        watermark = load_watermark(database_id) if incremental else None
+        if watermark:
+            logging.info(f"Polling incremental: registros editados desde {watermark}")
+        
+        query_filter, filter_properties = build_tracker_query(
+            feature_codes, status_pushdown, watermark, database_id
+        )
+        
+        records = iter_database_pages(
+            notion, database_id,
+            filter=query_filter, filter_properties=filter_properties
+        )
+        if incremental:
+            records = track_watermark(records, watermark, database_id)
+        
+        # evaluate_watches consume el generador a medida que llegan las páginas, sobre
+        # una copia: si una página posterior falla, las transiciones ya vistas no
+        # deben quedar marcadas como conocidas sin haberse registrado
+        statuses = dict(last_statuses) if last_statuses is not None else None
+        events = evaluate_watches(records, feature_codes, target_statuses, statuses)
+        if last_statuses is not None:
+            last_statuses.update(statuses)
+        return events
+        
+    except Exception as e:
+        logging.error(f"Error al consultar Release Tracker: {str(e)}")
+        return None
+
+
 def monitor_release_tracker():
     """
     Monitorea el Release Tracker con polling periódico.
-    Detecta cuando E137 cambia a "Regression" y activa el flujo de procesamiento.
+    Detecta cuando alguna funcionalidad vigilada entra a un estado objetivo
+    y registra el evento de transición correspondiente.
     Se detiene con Ctrl+C.
     """
     # Banner inicial con información del monitoreo
     logging.info("="*80)
     logging.info("INICIANDO MONITOREO DEL RELEASE TRACKER")
     logging.info("="*80)
-    logging.info(f"Objetivo: Detectar {TARGET_FUNCTIONALITY} en estado {TARGET_STATUS}")
+    logging.info(f"Objetivo: Detectar {', '.join(WATCHED_FUNCTIONALITIES)} en estado {', '.join(TARGET_STATUSES)}")
     logging.info(f"Intervalo de polling: {POLLING_INTERVAL} segundos ({POLLING_INTERVAL/60} minutos)")
     logging.info("="*80)
     
     # Variables de control
-    last_status = None  # Último estado conocido (para detectar cambios)
+    last_statuses = {}  # page_id -> último estado conocido (para detectar cambios)
     check_count = 0     # Contador de verificaciones realizadas
     
     try:
@@ -215,53 +559,22 @@ def monitor_release_tracker():
             # Log del número de verificación y timestamp
             logging.info(f"\n--- Check #{check_count} - {datetime.now()} ---")
             
-            # PASO 1: Consultar el Release Tracker y buscar E137
-            record = query_release_tracker()
+            # Una sola consulta evalúa todas las funcionalidades vigiladas
+            events = poll_release_tracker(last_statuses=last_statuses, incremental=True)
+            # Un poll fallido no confirma el watermark
+            if events is not None:
+                commit_watermark()
             
-            if record:
-                # PASO 2: Obtener el estado actual del Deployment Status
-                current_status = get_deployment_status(record)
+            for event in events or []:
+                logging.info("="*80)
+                logging.info(f"CAMBIO DETECTADO: {event['feature']} -> {event['status']}")
+                logging.info("="*80)
                 
-                if current_status:
-                    # PASO 3: Verificar si es el estado objetivo (Regression)
-                    if current_status == TARGET_STATUS:
-                        # ¡CAMBIO DETECTADO! Estado objetivo alcanzado
-                        logging.info("="*80)
-                        logging.info(f"CAMBIO DETECTADO: Estado = {TARGET_STATUS}")
-                        logging.info("="*80)
-                        
-                        # PASO 4: Obtener el Link Definition
-                        link_definition = get_link_definition(record)
-                        
-                        if link_definition:
-                            logging.info(f"Link Definition: {link_definition}")
-                            logging.info("Activando flujo de procesamiento...")
-                            
-                            # TODO: Aquí se activaría el flujo completo
-                            # Por ahora, solo registramos el evento
-                            logging.info("Evento registrado. Flujo de procesamiento pendiente de implementar.")
-                            
-                            # En las próximas fases, aquí llamaremos a:
-                            # from main import process_full_flow
-                            # process_full_flow(record, link_definition)
-                            
-                        else:
-                            # Error: No se pudo obtener el Link Definition
-                            logging.error("No se pudo obtener el Link Definition")
-                        
-                        # Opcional: Detener el monitoreo después de detectar el cambio
-                        # break
-                    
-                    else:
-                        # Estado actual no es Regression - seguir esperando
-                        logging.info(f"Estado actual: {current_status} (esperando {TARGET_STATUS})")
-                    
-                    # Detectar si hubo un cambio de estado (aunque no sea Regression)
-                    if last_status != current_status:
-                        logging.info(f"Cambio de estado detectado: {last_status} -> {current_status}")
-                    
-                    # Guardar el estado actual como "último estado conocido"
-                    last_status = current_status
+                if event['link_definition']:
+                    logging.info(f"Link Definition: {event['link_definition']}")
+                    logging.info("Evento registrado. Ejecuta main.py --monitor para procesarlo.")
+                else:
+                    logging.error(f"No se pudo obtener el Link Definition de {event['feature']}")
             
             # Esperar el intervalo de polling antes de la próxima verificación
             logging.info(f"Proxima verificacion en {POLLING_INTERVAL} segundos...")
@@ -0,0 +1,15 @@
+"""
+Configuración de pytest: los módulos del proyecto viven en src/ y se importan
+por nombre, igual que cuando se ejecutan desde ese directorio.
+"""
+
+import os
+import sys
+import tempfile
+
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+# Los módulos crean logs/, cache/ y state/ relativos al directorio actual:
+# durante los tests van a un directorio temporal, fuera del repositorio
+os.chdir(tempfile.mkdtemp(prefix="onepager-tests-"))
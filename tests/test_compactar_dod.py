@@ -0,0 +1,101 @@
+"""
+Tests de la compactación del DoD (compactar_dod).
+"""
+
+import pytest
+
+import compactar_dod
+from compactar_dod import compact_dod, estimate_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimate_counter(monkeypatch):
+    """Contar tokens con la estimación local (sin llamar a Gemini)."""
+    monkeypatch.setattr(compactar_dod, "DOD_TOKEN_COUNTER", "estimate")
+
+
+def test_images_are_replaced_by_caption():
+    content = "Intro\n\n![Pantalla de uniones](output/images/a.png)\n\n![](b.png)"
+    compacted, report = compact_dod(content, budget=1000)
+
+    assert "[Imagen: Pantalla de uniones]" in compacted
+    assert "[Imagen]" in compacted
+    assert ".png" not in compacted
+    assert report["images_replaced"] == 2
+
+
+def test_long_tables_keep_header_and_note_omitted_rows(monkeypatch):
+    monkeypatch.setattr(compactar_dod, "DOD_TABLE_MAX_ROWS", 2)
+    rows = "\n".join(f"| fila {i} | valor |" for i in range(5))
+    compacted, report = compact_dod(f"| A | B |\n|---|---|\n{rows}", budget=1000)
+
+    lines = compacted.strip().split("\n")
+    assert lines[0] == "| A | B |"
+    assert lines[2:4] == ["| fila 0 | valor |", "| fila 1 | valor |"]
+    assert "3 filas omitidas" in lines[4]
+    assert report["tables_truncated"] == 1
+
+
+def test_long_cells_are_truncated(monkeypatch):
+    monkeypatch.setattr(compactar_dod, "DOD_TABLE_MAX_CELL_CHARS", 10)
+    compacted, report = compact_dod("| A |\n|---|\n| " + "x" * 50 + " |", budget=1000)
+
+    assert "| " + "x" * 10 + "… |" in compacted
+    # Sin filas omitidas la tabla no cuenta como recortada
+    assert report["tables_truncated"] == 0
+
+
+def test_duplicate_blocks_are_removed_but_headings_kept():
+    paragraph = "Este párrafo del DoD se repite varias veces en la página de Notion."
+    content = f"## Contexto\n\n{paragraph}\n\n## Contexto\n\n{paragraph}\n\ncorto\n\ncorto"
+    compacted, report = compact_dod(content, budget=1000)
+
+    assert compacted.count(paragraph) == 1
+    assert compacted.count("## Contexto") == 2
+    # Los bloques cortos no se deduplican
+    assert compacted.count("corto") == 2
+    assert report["duplicates_removed"] == 1
+
+
+def test_budget_truncates_in_order_with_marker():
+    blocks = [f"Bloque {i}: " + "palabra " * 40 for i in range(10)]
+    compacted, report = compact_dod("\n\n".join(blocks), budget=200)
+
+    assert compacted.startswith("Bloque 0")
+    assert "Bloque 9" not in compacted
+    assert "contenido del DoD truncado" in compacted
+    assert report["budget_tokens_omitted"] > 0
+    assert report["compacted_tokens"] < report["original_tokens"]
+
+
+def test_budget_uses_gemini_counter(monkeypatch):
+    class Model:
+        calls = 0
+
+        def count_tokens(self, text):
+            Model.calls += 1
+            # Gemini cuenta el doble de tokens que la estimación local
+            return type("Count", (), {"total_tokens": 2 * compactar_dod.estimate_tokens(text)})()
+
+    blocks = [f"Bloque {i}: " + "palabra " * 40 for i in range(10)]
+    estimated, _ = compact_dod("\n\n".join(blocks), budget=500)
+
+    monkeypatch.setattr(compactar_dod, "DOD_TOKEN_COUNTER", "gemini")
+    counted, _ = compact_dod("\n\n".join(blocks), budget=500, model=Model())
+
+    assert counted.count("Bloque") < estimated.count("Bloque")
+    # Original, presupuesto y compactado: una llamada cada uno
+    assert Model.calls == 3
+
+
+def test_small_dod_is_left_intact():
+    content = "## Objetivo\n\nNormalizar datos en uniones.\n"
+    compacted, report = compact_dod(content, budget=1000)
+
+    assert compacted == content
+    assert report["saved_tokens"] == 0
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 40) == 10
@@ -0,0 +1,74 @@
+"""
+Tests del caché de respuestas de Gemini (gemini_cache): TTL y eviction LRU.
+"""
+
+import os
+import time
+import threading
+
+import pytest
+
+import gemini_cache
+from gemini_cache import response_cache_key, get_cached_response, store_response, evict
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Directorio de caché temporal para cada test."""
+    path = str(tmp_path / "gemini")
+    monkeypatch.setattr(gemini_cache, "GEMINI_CACHE_DIR", path)
+    return path
+
+
+def test_cache_key_depends_on_model_config_and_prompt():
+    key = response_cache_key("models/a", {"temperature": 0.2}, "prompt")
+
+    assert key == response_cache_key("models/a", {"temperature": 0.2}, "prompt")
+    assert key != response_cache_key("models/b", {"temperature": 0.2}, "prompt")
+    assert key != response_cache_key("models/a", {"temperature": 0.7}, "prompt")
+    assert key != response_cache_key("models/a", {"temperature": 0.2}, "otro prompt")
+
+
+def test_store_and_hit():
+    assert get_cached_response("k") is None
+    store_response("k", "# One Pager", "models/a")
+    assert get_cached_response("k") == "# One Pager"
+
+
+def test_expired_entry_is_removed(cache_dir):
+    store_response("k", "viejo", "models/a")
+
+    assert get_cached_response("k", ttl=-1) is None
+    assert not os.path.exists(os.path.join(cache_dir, "k.json"))
+
+
+def test_evict_removes_least_recently_used(cache_dir):
+    for i in range(4):
+        store_response(f"k{i}", str(i))
+        # mtime distinto por entrada; k0 se usa al final y pasa a ser la más reciente
+        os.utime(os.path.join(cache_dir, f"k{i}.json"), (time.time() - 100 + i, time.time() - 100 + i))
+    get_cached_response("k0")
+
+    assert evict(max_entries=2) == 2
+    assert sorted(os.listdir(cache_dir)) == ["k0.json", "k3.json"]
+
+
+def test_concurrent_stores_respect_limit(cache_dir, monkeypatch):
+    monkeypatch.setattr(gemini_cache, "GEMINI_CACHE_MAX_ENTRIES", 10)
+    errors = []
+
+    def writer(thread):
+        for i in range(30):
+            try:
+                store_response(f"t{thread}-{i}", "texto")
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len([name for name in os.listdir(cache_dir) if name.endswith('.json')]) == 10
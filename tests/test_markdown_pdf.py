@@ -0,0 +1,167 @@
+"""
+Tests del compilador de Markdown a flowables (markdown_pdf).
+"""
+
+import pytest
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Paragraph, Table, XPreformatted
+from reportlab.platypus.flowables import HRFlowable
+
+from markdown_pdf import tokenize, format_inline, compile_markdown, BULLETS
+
+
+@pytest.fixture
+def styles():
+    """Hoja mínima con los estilos que usa el compilador (ver generar_pdf.create_styles)."""
+    base = getSampleStyleSheet()
+    return {
+        'CustomHeading': ParagraphStyle('CustomHeading', parent=base['Heading2']),
+        'CustomNormal': ParagraphStyle('CustomNormal', parent=base['Normal']),
+        'CustomBullet': ParagraphStyle('CustomBullet', parent=base['Normal'], leftIndent=20, bulletIndent=10),
+        'CustomCode': ParagraphStyle('CustomCode', parent=base['Code']),
+        'CustomTableCell': ParagraphStyle('CustomTableCell', parent=base['Normal']),
+    }
+
+
+# ============================================================================
+# format_inline
+# ============================================================================
+
+def test_format_inline_escapes_markup():
+    assert format_inline("a < b & c > d") == "a &lt; b &amp; c &gt; d"
+    assert format_inline("x </i> y") == "x &lt;/i&gt; y"
+
+
+def test_format_inline_converts_emphasis():
+    assert format_inline("**negrita**") == "<b>negrita</b>"
+    assert format_inline("__negrita__") == "<b>negrita</b>"
+    assert format_inline("*itálica* y _otra_") == "<i>itálica</i> y <i>otra</i>"
+    assert format_inline("~~tachado~~") == "<strike>tachado</strike>"
+
+
+def test_format_inline_nested_emphasis_is_escaped():
+    assert format_inline("**a <b> c**") == "<b>a &lt;b&gt; c</b>"
+
+
+def test_format_inline_code_is_not_formatted():
+    assert format_inline("`**x** < y`") == '<font face="Courier">**x** &lt; y</font>'
+
+
+def test_format_inline_link_quotes_url():
+    result = format_inline('[docs](https://example.com/?a=1&b=2)')
+    assert result.startswith('<a href="https://example.com/?a=1&amp;b=2"')
+    assert '<u>docs</u></a>' in result
+    # Con comillas dobles en la URL el atributo usa comillas simples
+    assert format_inline('[x](http://a/"b")').startswith('<a href=\'http://a/"b"\'')
+
+
+def test_format_inline_leaves_lone_markers():
+    assert format_inline("2 * 3 * 4") == "2 * 3 * 4"
+    assert format_inline("snake_case_name") == "snake_case_name"
+
+
+# ============================================================================
+# tokenize
+# ============================================================================
+
+def test_tokenize_headings_and_paragraphs():
+    blocks = list(tokenize("### 1. Título ###\n\nLínea uno\nLínea dos\n"))
+    assert blocks == [
+        ('heading', (3, '1. Título')),
+        ('paragraph', 'Línea uno'),
+        ('paragraph', 'Línea dos'),
+    ]
+
+
+def test_tokenize_nested_lists():
+    markdown = "- uno\n  - dos\n    - tres\n  - dos bis\n- uno bis\n1. numerado"
+    items = [data for kind, data in tokenize(markdown) if kind == 'list_item']
+    assert items == [
+        (0, '-', 'uno'),
+        (1, '-', 'dos'),
+        (2, '-', 'tres'),
+        (1, '-', 'dos bis'),
+        (0, '-', 'uno bis'),
+        (0, '1.', 'numerado'),
+    ]
+
+
+def test_tokenize_tabs_count_as_indentation():
+    items = [data for kind, data in tokenize("- uno\n\t- dos") if kind == 'list_item']
+    assert items == [(0, '-', 'uno'), (1, '-', 'dos')]
+
+
+def test_tokenize_list_continuation_lines():
+    items = list(tokenize("- item que\n  sigue acá\n- otro"))
+    assert items == [('list_item', (0, '-', 'item que sigue acá')), ('list_item', (0, '-', 'otro'))]
+
+
+def test_tokenize_paragraph_resets_list_levels():
+    items = [data for kind, data in tokenize("  - indentado\ntexto\n    - otro") if kind == 'list_item']
+    assert [level for level, _, _ in items] == [0, 0]
+
+
+def test_tokenize_code_block_keeps_content_verbatim():
+    blocks = list(tokenize("```python\n# no es heading\n- ni lista\n```\ndespués"))
+    assert blocks == [('code', '# no es heading\n- ni lista'), ('paragraph', 'después')]
+
+
+def test_tokenize_unclosed_code_block_runs_to_end():
+    assert list(tokenize("```\nsin cierre")) == [('code', 'sin cierre')]
+
+
+def test_tokenize_rule_is_not_a_list_item():
+    assert list(tokenize("---\n* * *")) == [('rule', None), ('rule', None)]
+
+
+def test_tokenize_table_rows_and_quotes():
+    blocks = list(tokenize("| a | b |\n| 1 | 2 |\n> cita\n> sigue"))
+    assert blocks == [('table', ['| a | b |', '| 1 | 2 |']), ('quote', 'cita sigue')]
+
+
+# ============================================================================
+# compile_markdown
+# ============================================================================
+
+def test_compile_table_with_header(styles):
+    elements = compile_markdown("| A | B |\n|---|:-:|\n| 1 | 2 |\n| 3 |", styles)
+    table = next(element for element in elements if isinstance(element, Table))
+    assert table.repeatRows == 1
+    # La fila separadora no es una fila de datos; las filas cortas se completan
+    assert len(table._cellvalues) == 3
+    assert all(len(row) == 2 for row in table._cellvalues)
+    assert styles['CustomTableHeader'].fontName == 'Helvetica-Bold'
+
+
+def test_compile_table_without_separator_has_no_header(styles):
+    elements = compile_markdown("| a | b |\n| 1 | 2 |", styles)
+    table = next(element for element in elements if isinstance(element, Table))
+    assert table.repeatRows == 0
+    assert len(table._cellvalues) == 2
+    assert all(cell.style.name == 'CustomTableCell' for row in table._cellvalues for cell in row)
+
+
+def test_compile_list_levels_use_derived_styles(styles):
+    elements = compile_markdown("- uno\n  - dos\n3. tres", styles)
+    assert [element.bulletText for element in elements] == [BULLETS[0], BULLETS[1], '3.']
+    assert elements[1].style.leftIndent > elements[0].style.leftIndent
+    assert 'CustomBullet1' in styles
+
+
+def test_compile_code_rule_and_unsafe_text(styles):
+    elements = compile_markdown("```\n<tag> & </i>\n```\n---\nx </i> y", styles)
+    assert isinstance(elements[0], XPreformatted)
+    assert isinstance(elements[1], HRFlowable)
+    assert isinstance(elements[2], Paragraph)
+
+
+def test_compile_heading_elements_callback(styles):
+    titles = []
+
+    def heading_elements(title):
+        titles.append(title)
+        return ['extra']
+
+    elements = compile_markdown("### 6. Sección\ntexto", styles, heading_elements)
+    assert titles == ['6. Sección']
+    assert elements[1] == 'extra'
@@ -0,0 +1,63 @@
+"""
+Tests de la lectura del árbol de bloques (notion_blocks).
+"""
+
+import pytest
+
+from notion_blocks import fetch_block_tree
+
+
+class FakeChildren:
+    """Simula notion.blocks.children.list sobre un árbol en memoria."""
+
+    def __init__(self, tree, failing=()):
+        self.tree = tree
+        self.failing = set(failing)
+
+    def list(self, block_id, page_size, start_cursor=None):
+        if block_id in self.failing:
+            raise RuntimeError("429 Too Many Requests")
+        children = self.tree[block_id]
+        start = int(start_cursor or 0)
+        end = start + page_size
+        return {
+            "results": children[start:end],
+            "has_more": end < len(children),
+            "next_cursor": str(end) if end < len(children) else None,
+        }
+
+
+class FakeNotion:
+    def __init__(self, tree, failing=()):
+        self.blocks = type("Blocks", (), {})()
+        self.blocks.children = FakeChildren(tree, failing)
+
+
+def block(block_id, has_children=False):
+    return {"id": block_id, "type": "toggle", "has_children": has_children}
+
+
+TREE = {
+    "page": [block("a", True), block("b")],
+    "a": [block("a1", True)],
+    "a1": [block("a1x")],
+}
+
+
+def test_fetch_block_tree_nests_children():
+    blocks = fetch_block_tree(FakeNotion(TREE), "page", max_workers=2)
+
+    assert [b['id'] for b in blocks] == ["a", "b"]
+    assert blocks[0]['children'][0]['children'][0]['id'] == "a1x"
+    assert 'children' not in blocks[1]
+
+
+def test_fetch_block_tree_follows_pagination():
+    tree = {"page": [block(f"b{i}") for i in range(250)]}
+
+    assert len(fetch_block_tree(FakeNotion(tree), "page")) == 250
+
+
+def test_failed_subtree_is_not_dropped_silently():
+    with pytest.raises(RuntimeError, match="429"):
+        fetch_block_tree(FakeNotion(TREE, failing={"a1"}), "page")
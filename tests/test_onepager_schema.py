@@ -0,0 +1,61 @@
+"""
+Tests de la validación del One Pager estructurado (onepager_schema).
+"""
+
+import json
+
+import pytest
+
+from onepager_schema import SECTIONS, parse_onepager_json, load_onepager_data
+
+
+def make_sections(numbers=range(1, len(SECTIONS) + 1)):
+    return [{"number": n, "title": f"título {n}", "paragraphs": [f"Texto {n}"], "bullets": []} for n in numbers]
+
+
+def test_parse_orders_sections_and_uses_official_titles():
+    sections = list(reversed(make_sections()))
+    data = parse_onepager_json(json.dumps({"sections": sections}))
+
+    assert [section['number'] for section in data['sections']] == list(range(1, len(SECTIONS) + 1))
+    assert [section['title'] for section in data['sections']] == [title for title, _ in SECTIONS]
+
+
+def test_parse_strips_empty_paragraphs_and_bullets():
+    sections = make_sections()
+    sections[6] = {"number": 7, "paragraphs": ["  ", None], "bullets": [" uno ", "", "dos"]}
+    data = parse_onepager_json(json.dumps({"sections": sections}))
+
+    assert data['sections'][6]['paragraphs'] == []
+    assert data['sections'][6]['bullets'] == ["uno", "dos"]
+
+
+def test_parse_ignores_duplicates_and_out_of_range_numbers():
+    sections = make_sections() + [
+        {"number": 1, "paragraphs": ["duplicada"]},
+        {"number": 99, "paragraphs": ["fuera de rango"]},
+        {"number": "2", "paragraphs": ["número como texto"]},
+    ]
+    data = parse_onepager_json(json.dumps({"sections": sections}))
+
+    assert len(data['sections']) == len(SECTIONS)
+    assert data['sections'][0]['paragraphs'] == ["Texto 1"]
+
+
+def test_parse_rejects_missing_or_empty_sections():
+    sections = make_sections(n for n in range(1, len(SECTIONS) + 1) if n != 3)
+    sections[0]['paragraphs'] = []
+
+    with pytest.raises(ValueError, match="1, 3"):
+        parse_onepager_json(json.dumps({"sections": sections}))
+
+
+def test_parse_rejects_invalid_json():
+    with pytest.raises(ValueError, match="JSON inválida"):
+        parse_onepager_json("{no es json")
+
+
+def test_load_onepager_data_distinguishes_markdown():
+    assert load_onepager_data("### 1. Tipo\nTexto") is None
+    assert load_onepager_data("") is None
+    assert len(load_onepager_data(json.dumps({"sections": make_sections()}))['sections']) == len(SECTIONS)
@@ -0,0 +1,89 @@
+"""
+Tests del caché de páginas de Notion (page_cache): versiones, invalidación y eviction.
+"""
+
+import os
+import time
+
+import pytest
+
+import page_cache
+from page_cache import page_version, get_cached_page, store_page, invalidate_page, evict
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Directorio de caché temporal para cada test."""
+    path = str(tmp_path / "pages")
+    monkeypatch.setattr(page_cache, "PAGE_CACHE_DIR", path)
+    return path
+
+
+def entries(cache_dir):
+    return sorted(name for _, _, files in os.walk(cache_dir) for name in files)
+
+
+def test_page_version_tracks_top_level_blocks():
+    blocks = [{"id": "a", "last_edited_time": "t1"}, {"id": "b", "last_edited_time": "t1"}]
+    version = page_version("p1", blocks)
+
+    assert version == page_version("p1", [dict(block) for block in blocks])
+    # Editar el contenido anidado de un bloque cambia su last_edited_time, no el de la página
+    assert version != page_version("p1", [blocks[0], {"id": "b", "last_edited_time": "t2"}])
+    assert version != page_version("p1", blocks[:1])
+    assert version != page_version("p2", blocks)
+    assert page_version(None, blocks) is None
+
+
+def test_store_and_hit():
+    assert get_cached_page("page-1", "v1") is None
+    store_page("page-1", "v1", "# DoD")
+
+    assert get_cached_page("page-1", "v1") == "# DoD"
+    assert get_cached_page("page1", "v1") == "# DoD"
+    assert get_cached_page("page-1", "v2") is None
+    assert get_cached_page("page-1", None) is None
+
+
+def test_new_version_replaces_previous(cache_dir):
+    store_page("page-1", "v1", "viejo")
+    store_page("page-1", "v2", "nuevo")
+
+    assert get_cached_page("page-1", "v1") is None
+    assert get_cached_page("page-1", "v2") == "nuevo"
+    assert len(entries(cache_dir)) == 1
+
+
+def test_invalidate_page(cache_dir):
+    store_page("page-1", "v1", "uno")
+    store_page("page-2", "v1", "dos")
+
+    assert invalidate_page("page-1") is True
+    assert invalidate_page("page-1") is False
+    assert get_cached_page("page-1", "v1") is None
+    assert get_cached_page("page-2", "v1") == "dos"
+
+
+def test_evict_removes_least_recently_used_over_max_bytes(cache_dir, monkeypatch):
+    monkeypatch.setattr(page_cache, "PAGE_CACHE_MAX_BYTES", 10 ** 6)
+    for i in range(4):
+        store_page(f"page-{i}", "v1", "x" * 100)
+        path = page_cache._entry_path(f"page-{i}", "v1")
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    # page-0 se lee al final y pasa a ser la más reciente
+    get_cached_page("page-0", "v1")
+
+    assert evict(max_bytes=250) == 2
+    assert get_cached_page("page-0", "v1") is not None
+    assert get_cached_page("page-3", "v1") is not None
+    assert get_cached_page("page-1", "v1") is None
+    assert get_cached_page("page-2", "v1") is None
+
+
+def test_store_respects_max_bytes(cache_dir, monkeypatch):
+    monkeypatch.setattr(page_cache, "PAGE_CACHE_MAX_BYTES", 250)
+    for i in range(5):
+        store_page(f"page-{i}", "v1", "x" * 100)
+
+    assert len(entries(cache_dir)) == 2
+    assert get_cached_page("page-4", "v1") is not None
@@ -0,0 +1,105 @@
+"""
+Tests del state store (state_store): transiciones idempotentes y etapas.
+"""
+
+import pytest
+
+import state_store
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Base SQLite temporal para cada test."""
+    path = str(tmp_path / "state" / "pipeline_state.db")
+    monkeypatch.setattr(state_store, "STATE_DB_PATH", path)
+    return path
+
+
+def make_event(page_id="page-1", status="Regression", edited="2025-10-18T10:00:00.000Z"):
+    return {
+        "page_id": page_id,
+        "feature": "E137",
+        "title": "E137 - Data Normalization in Unions",
+        "status": status,
+        "link_definition": "https://www.notion.so/dod",
+        "record": {"last_edited_time": edited},
+    }
+
+
+def test_register_transition_is_idempotent(db_path):
+    first = state_store.register_transition(make_event())
+    second = state_store.register_transition(make_event())
+
+    assert first == second
+    assert [event['transition_id'] for event in state_store.get_pending_transitions()] == [first]
+
+
+def test_new_edit_is_a_new_transition(db_path):
+    first = state_store.register_transition(make_event(edited="2025-10-18T10:00:00.000Z"))
+    second = state_store.register_transition(make_event(edited="2025-10-19T10:00:00.000Z"))
+
+    assert first != second
+    assert len(state_store.get_pending_transitions()) == 2
+
+
+def test_completed_transition_is_not_pending_nor_registered_again(db_path):
+    transition_id = state_store.register_transition(make_event())
+    state_store.complete_transition(transition_id)
+
+    assert state_store.get_pending_transitions() == []
+    # Volver a detectar la misma edición no la reabre
+    state_store.register_transition(make_event())
+    assert state_store.get_pending_transitions() == []
+
+
+def test_pending_transition_keeps_event_fields(db_path):
+    transition_id = state_store.register_transition(make_event())
+    event = state_store.get_pending_transitions()[0]
+
+    assert event == {
+        "transition_id": transition_id,
+        "page_id": "page-1",
+        "feature": "E137",
+        "title": "E137 - Data Normalization in Unions",
+        "status": "Regression",
+        "link_definition": "https://www.notion.so/dod",
+    }
+
+
+def test_stages_are_recorded_per_transition(db_path):
+    transition_id = state_store.register_transition(make_event())
+    assert state_store.get_stage(transition_id, 'extract') is None
+
+    state_store.complete_stage(transition_id, 'extract', "# DoD", input_hash="abc")
+    state_store.complete_stage(transition_id, 'notion_page', True)
+
+    stage = state_store.get_stage(transition_id, 'extract')
+    assert stage['output'] == "# DoD"
+    assert stage['input_hash'] == "abc"
+    assert stage['output_hash'] == state_store.content_hash("# DoD")
+    # Las salidas que no son texto se guardan como JSON
+    assert state_store.get_stage(transition_id, 'notion_page')['output'] == "true"
+
+
+def test_find_stage_output_reuses_same_page_and_input(db_path):
+    first = state_store.register_transition(make_event(edited="1"))
+    state_store.complete_stage(first, 'onepager', "One Pager v1", input_hash="dod-hash")
+    state_store.register_transition(make_event(edited="2"))
+
+    assert state_store.find_stage_output("page-1", 'onepager', "dod-hash") == "One Pager v1"
+    assert state_store.find_stage_output("page-1", 'onepager', "otro-hash") is None
+    assert state_store.find_stage_output("page-2", 'onepager', "dod-hash") is None
+    assert state_store.find_stage_output("page-1", 'onepager', None) is None
+
+
+def test_last_statuses_round_trip(db_path):
+    state_store.save_last_statuses({"page-1": "QA", "page-2": "Regression"})
+    state_store.save_last_statuses({"page-1": "Regression"})
+
+    assert state_store.load_last_statuses() == {"page-1": "Regression", "page-2": "Regression"}
+
+
+def test_content_hash():
+    assert state_store.content_hash(None) is None
+    assert state_store.content_hash("a") == state_store.content_hash("a")
+    assert state_store.content_hash("a") != state_store.content_hash("b")
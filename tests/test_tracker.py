@@ -0,0 +1,65 @@
+"""
+Tests del poll del Release Tracker (tracker): transiciones y polls fallidos.
+"""
+
+import pytest
+
+import tracker
+
+
+def make_record(page_id, status, title="E137 - Data Normalization in Unions"):
+    return {
+        "id": page_id,
+        "last_edited_time": "2025-10-18T10:00:00.000Z",
+        "properties": {
+            "Name": {"type": "title", "title": [{"plain_text": title}]},
+            "Deployment Status": {"type": "status", "status": {"name": status}},
+            "Link Definition": {"type": "url", "url": "https://www.notion.so/dod"},
+        },
+    }
+
+
+@pytest.fixture(autouse=True)
+def offline_query(monkeypatch, tmp_path):
+    """Consulta sin red y watermark en un directorio temporal."""
+    monkeypatch.setattr(tracker, "build_tracker_query", lambda *args: (None, None))
+    monkeypatch.setattr(tracker, "WATERMARK_PATH", str(tmp_path / "watermark.json"))
+    tracker._pending_watermarks.clear()
+
+
+def serve(monkeypatch, records, fail_after=None):
+    """Simula iter_database_pages; con fail_after la consulta falla tras esa cantidad de registros."""
+    def iter_database_pages(*args, **kwargs):
+        for i, record in enumerate(records):
+            if i == fail_after:
+                raise RuntimeError("429 Too Many Requests")
+            yield record
+    monkeypatch.setattr(tracker, "iter_database_pages", iter_database_pages)
+
+
+def test_poll_emits_only_entries_into_target_status(monkeypatch):
+    serve(monkeypatch, [make_record("a", "Regression"), make_record("b", "QA")])
+    last_statuses = {"b": "Regression"}
+
+    events = tracker.poll_release_tracker(
+        feature_codes=["E137"], target_statuses=["Regression"], last_statuses=last_statuses, database_id="db"
+    )
+
+    assert [event['page_id'] for event in events] == ["a"]
+    assert events[0]['previous_status'] is None
+    assert last_statuses == {"a": "Regression", "b": "QA"}
+
+
+def test_failed_poll_returns_none_and_keeps_statuses(monkeypatch):
+    serve(monkeypatch, [make_record("a", "Regression"), make_record("b", "Regression")], fail_after=1)
+    last_statuses = {"b": "QA"}
+
+    events = tracker.poll_release_tracker(
+        feature_codes=["E137"], target_statuses=["Regression"], last_statuses=last_statuses,
+        incremental=True, database_id="db"
+    )
+
+    assert events is None
+    # La transición de "a" no se marca como vista: se detecta en el próximo poll
+    assert last_statuses == {"b": "QA"}
+    assert tracker._pending_watermarks == {}